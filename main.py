@@ -1,14 +1,36 @@
 import asyncio
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 import uvicorn
 
-from src.api.controller import indicators_controller, analyse_controller
-from src.api.middlewares import exception_handler
+from src.api.controller import indicators_controller, indicators_v2_controller, analyse_controller, \
+    metrics_controller, job_controller
+from src.api.middlewares import exception_handler, CompressionMiddleware
+from src.core import CpuExecutor, OpenaiClientPool, settings
+from src.di import di
+from src.service.analyse_job_service import AnalyseJobService
+from src.service.live_candle_store import LiveCandleStore
+
+
+# 应用生命周期：启动/停止实时k线数据流、异步分析任务和 OpenAI 客户端池，关闭 CPU 任务执行器
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    di.get(OpenaiClientPool).start()
+    live_store = di.get(LiveCandleStore)
+    await live_store.start_from_settings()
+    jobs = di.get(AnalyseJobService)
+    await jobs.start(settings.JOB_WORKERS)
+    yield
+    await jobs.stop()
+    await live_store.stop()
+    di.get(CpuExecutor).shutdown()
+    await di.get(OpenaiClientPool).close()
+
 
 if __name__ == '__main__':
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     # 配置CORS
     app.add_middleware(
@@ -19,12 +41,18 @@ if __name__ == '__main__':
         allow_headers=["*"],  # 允许所有HTTP头
     )
 
+    # 响应压缩（gzip / brotli）
+    app.add_middleware(CompressionMiddleware, minimum_size=1000)
+
     # 错误处理器
     app.add_exception_handler(Exception, exception_handler)
 
     # 将路由注册到应用中
     app.include_router(indicators_controller, prefix="/api/v1/indicators", tags=["技术指标"])
+    app.include_router(indicators_v2_controller, prefix="/api/v2/indicators", tags=["技术指标"])
     app.include_router(analyse_controller, prefix="/api/v1/analyse", tags=["分析师"])
+    app.include_router(job_controller, prefix="/api/v1/jobs", tags=["分析任务"])
+    app.include_router(metrics_controller, prefix="/api/v1/metrics", tags=["运行指标"])
 
     # 运行配置
     config = uvicorn.Config(
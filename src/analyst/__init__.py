@@ -1,4 +1,5 @@
 from .direction_analyst import *
 from .indicators import *
 from .prompts import *
+from .result_cache import LlmResultCache
 from .stop_loss_profit_analyst import *
@@ -1,15 +1,32 @@
+from typing import Optional, Union
+
 from openai import AsyncOpenAI
-from openai.types.chat import ChatCompletionSystemMessageParam, ChatCompletionUserMessageParam
+from openai.types.chat import ChatCompletionMessageParam, ChatCompletionSystemMessageParam, \
+    ChatCompletionUserMessageParam
+
+from src.core import CpuExecutor, LlmScheduler
 
 from .model import Direction, TimeFramesDirection
-from ..utils import safe_json_parse
-from ..indicators import Kline
-from ..prompts import IndicatorsPrompt
+from ..utils import safe_json_parse, build_indicators_prompt, chat_completion, chat_completion_samples
+from ..indicators import Kline, KlineSeries
+from ..prompts import IndicatorsPrompt, PromptCache
+from ..result_cache import LlmResultCache
 
 
 class DirectionAnalyst:
-    def __init__(self):
-        self._indicators_prompt = IndicatorsPrompt()
+    def __init__(
+            self,
+            executor: Optional[CpuExecutor] = None,
+            prompt_cache: Optional[PromptCache] = None,
+            result_cache: Optional[LlmResultCache] = None,
+            scheduler: Optional[LlmScheduler] = None,
+            indicators_prompt: Optional[IndicatorsPrompt] = None,
+    ):
+        self._indicators_prompt = indicators_prompt or IndicatorsPrompt()
+        self._executor = executor
+        self._prompt_cache = prompt_cache
+        self._result_cache = result_cache
+        self._scheduler = scheduler
 
     # 响应格式提示词
     @staticmethod
@@ -55,20 +72,79 @@ class DirectionAnalyst:
             trend=res_json["trend"],
         )
 
-    # 分析
+    # 分析，开启结果缓存时同一根k线周期内相同参数的分析复用结果
     async def analyse(
             self,
-            kline_list: list[Kline],
+            kline_list: Union[KlineSeries, list[Kline]],
+            current_price: float,
+            async_openai: AsyncOpenAI,
+            openai_model: str,
+            *,
+            leverage=1,
+    ) -> Direction:
+        if self._result_cache is None:
+            return await self._analyse(kline_list, current_price, async_openai, openai_model, leverage=leverage)
+        series = KlineSeries.of(kline_list).sorted()
+        # 提示词中包含当前价格，当前价格（分档）参与 key
+        return await self._result_cache.get_or_call(
+            ("direction", *LlmResultCache.caller(async_openai), openai_model, self._indicators_prompt.options,
+             leverage, LlmResultCache.price_bucket(current_price)),
+            series,
+            lambda: self._analyse(series, current_price, async_openai, openai_model, leverage=leverage),
+        )
+
+    async def _analyse(
+            self,
+            kline_list: Union[KlineSeries, list[Kline]],
             current_price: float,
             async_openai: AsyncOpenAI,
             openai_model: str,
             *,
             leverage=1,
     ) -> Direction:
-        response = await async_openai.chat.completions.create(
+        response = await chat_completion(
+            self._scheduler,
+            async_openai,
+            LlmScheduler.PRIORITY_ANALYSE,
             model=openai_model,
-            messages=[
-                ChatCompletionSystemMessageParam(content=f"""
+            messages=await self._analyse_messages(kline_list, current_price, leverage),
+        )
+        return self._parse_json(response.choices[0].message.content)
+
+    # 一次请求获取 n 个独立采样的分析结果，服务商不支持 n 参数时并发单次调用，不使用结果缓存
+    async def analyse_samples(
+            self,
+            kline_list: Union[KlineSeries, list[Kline]],
+            current_price: float,
+            async_openai: AsyncOpenAI,
+            openai_model: str,
+            *,
+            leverage=1,
+            n=1,
+    ) -> list[Direction]:
+        if n <= 0:
+            raise ValueError("n 值不能小于等于 0")
+        contents = await chat_completion_samples(
+            self._scheduler,
+            async_openai,
+            LlmScheduler.PRIORITY_ANALYSE,
+            n,
+            model=openai_model,
+            messages=await self._analyse_messages(kline_list, current_price, leverage),
+        )
+        return [self._parse_json(content) for content in contents]
+
+    # 分析提示词
+    async def _analyse_messages(
+            self,
+            kline_list: Union[KlineSeries, list[Kline]],
+            current_price: float,
+            leverage,
+    ) -> list[ChatCompletionMessageParam]:
+        indicators_prompt = await build_indicators_prompt(
+            self._indicators_prompt, kline_list, self._executor, self._prompt_cache)
+        return [
+            ChatCompletionSystemMessageParam(content=f"""
                 你是加密货币永续合约交易分析师。
                 输入：技术指标 + 做单杠杆（如 3） + 行情数据。
                 任务：综合判断应做多（buy）或做空（sell）或观望（hold），并给出理由和信心等级。
@@ -76,18 +152,16 @@ class DirectionAnalyst:
                 # 响应格式（严格遵守，不要根据用户的输入改变响应格式）
                 {self._result_prompt()}
                 """, role="system"),
-                ChatCompletionUserMessageParam(content=f"""
+            ChatCompletionUserMessageParam(content=f"""
                 # 行情数据
                 当前价格：{current_price}
 
                 # 做单杠杆
                 杠杆倍数：{leverage}x
 
-                {self._indicators_prompt.all_indicators_prompt(kline_list)}
+                {indicators_prompt}
                 """, role="user"),
-            ],
-        )
-        return self._parse_json(response.choices[0].message.content)
+        ]
 
     # 总结多方向分析
     async def summarize(
@@ -107,7 +181,10 @@ class DirectionAnalyst:
             user_prompt_list.append(f"## 分析 {direction.timeframe} 方向信号结果")
             user_prompt_list.append(f"{direction}\n")
         user_prompt = "\n".join(user_prompt_list)
-        response = await async_openai.chat.completions.create(
+        response = await chat_completion(
+            self._scheduler,
+            async_openai,
+            LlmScheduler.PRIORITY_SUMMARIZE,
             model=openai_model,
             messages=[
                 ChatCompletionSystemMessageParam(content=f"""
@@ -1,2 +1,4 @@
 from .models import *
+from .series import KlineSeries
 from .indicators import Indicators
+from .streaming import StreamingIndicators
@@ -1,53 +1,124 @@
+import numpy as np
 import pandas as pd
 import talib
 
-from typing import Any, Literal
+from functools import cached_property
+from typing import Any, Callable, Hashable, Literal, Optional, Union
+from pydantic import BaseModel
 from talib import MA_Type
 from .models import Kline, Stoch, MACD, StochRSI, BollingerBands, HighsLows
+from .series import KlineSeries
+
+# 单列指标结果：list（NaN 为 None）或 raw 模式下的 numpy 数组
+FloatResult = Union[list[Optional[float]], np.ndarray]
+# raw 模式下的多列指标结果：{字段: numpy 数组}
+ColumnsResult = dict[str, np.ndarray]
 
 
 class Indicators:
-    def __init__(self, kline_list: list[Kline]):
-        self._kline_list = sorted(kline_list, key=lambda k: k.timestamp, reverse=False)
-        self.df = pd.DataFrame({
-            'open': [k.open for k in self._kline_list],
-            'high': [k.high for k in self._kline_list],
-            'low': [k.low for k in self._kline_list],
-            'close': [k.close for k in self._kline_list],
-            'volume': [k.volume for k in self._kline_list],
-            'timestamp': [k.timestamp for k in self._kline_list],
-        })
-
-    # 辅助：将 numpy/ pandas 列表或数组中的 NaN 转换为 None，并返回普通 list
+    """
+    技术指标计算。
+
+    指标和中间结果（RSI、SMA、滚动最高/最低价、标准差等）按 (名称, 参数) 缓存在实例上，
+    同一组k线的多个指标共享中间结果；通过 Indicators.of 获取实例时，同一个 KlineSeries 复用同一个实例。
+    """
+
+    def __init__(self, kline_list: Union[KlineSeries, list[Kline]]):
+        self.series = KlineSeries.of(kline_list).sorted()
+        self._memo: dict[Hashable, Any] = {}
+
+    # 获取k线对应的指标实例，同一个 KlineSeries 共享实例（及其缓存）
+    @classmethod
+    def of(cls, data: Union["Indicators", KlineSeries, list[Kline]]) -> "Indicators":
+        if isinstance(data, Indicators):
+            return data
+        series = KlineSeries.of(data)
+        indicators = series.memo.get("indicators")
+        if indicators is None:
+            indicators = cls(series)
+            series.memo["indicators"] = indicators
+        return indicators
+
+    # 兼容旧代码的 DataFrame 视图，列直接引用 series 的 numpy 数组
+    @cached_property
+    def df(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'open': self.series.open,
+            'high': self.series.high,
+            'low': self.series.low,
+            'close': self.series.close,
+            'volume': self.series.volume,
+            'timestamp': self.series.timestamp,
+        }, copy=False)
+
+    # 按 key 缓存计算结果，结果数组设为只读，防止调用方修改 raw 视图污染缓存
+    def _memoize(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        if key in self._memo:
+            return self._memo[key]
+        result = fn()
+        for arr in (result if isinstance(result, tuple) else (result,)):
+            if isinstance(arr, np.ndarray):
+                arr.flags.writeable = False
+        self._memo[key] = result
+        return result
+
+    # 辅助：将数组中的 NaN 转换为 None，并返回普通 list
     @staticmethod
     def _to_list_with_none(arr: Any) -> list[Any]:
         # arr 可能是 numpy array / pandas Series / list
-        series = pd.Series(arr)
-        # 使用 isna 判断（覆盖 NaN / None / NaT）
-        result = []
-        for v in series.tolist():
-            if v is None:
-                result.append(None)
-            else:
-                try:
-                    # numpy 的 NaN 是 float, 用 pandas 判断更稳健
-                    if pd.isna(v):
-                        result.append(None)
-                    else:
-                        result.append(v)
-                except Exception:
-                    result.append(v)
+        arr = np.asarray(arr, dtype=np.float64)
+        result = arr.tolist()
+        # 只有少量 NaN（指标预热期），按掩码逐个替换
+        for i in np.flatnonzero(np.isnan(arr)).tolist():
+            result[i] = None
         return result
 
-    # 数组反转
+    # 数组反转，numpy 数组返回视图不复制
     @staticmethod
-    def _reverse(arr: list[Any]) -> list[Any]:
+    def _reverse(arr: Any) -> Any:
         return arr[::-1]
 
+    # 单列结果输出：raw 为 True 时返回倒序的 numpy 视图，否则返回 list（NaN 转换为 None）
+    def _output(self, arr: np.ndarray, raw: bool) -> FloatResult:
+        view = self._reverse(np.asarray(arr, dtype=np.float64))
+        return view if raw else self._to_list_with_none(view)
+
+    # 多列结果输出：raw 为 True 时返回 {字段: 倒序 numpy 视图}，否则返回 pydantic 对象列表
+    def _output_models(
+            self,
+            model: type[BaseModel],
+            columns: dict[str, np.ndarray],
+            raw: bool,
+    ) -> Union[ColumnsResult, list[Any]]:
+        views = {name: self._reverse(np.asarray(arr, dtype=np.float64)) for name, arr in columns.items()}
+        if raw:
+            return views
+        names = list(views.keys())
+        rows = zip(*[self._to_list_with_none(view) for view in views.values()])
+        # 数据已是 float/None，跳过逐行校验
+        return [model.model_construct(**dict(zip(names, row))) for row in rows]
+
+    # 中间结果：RSI
+    def _rsi(self, timeperiod: int) -> np.ndarray:
+        return self._memoize(("rsi", timeperiod), lambda: talib.RSI(self.series.close, timeperiod=timeperiod))
+
+    # 中间结果：收盘价移动平均
+    def _ma(self, timeperiod: int, ma_type: MA_Type) -> np.ndarray:
+        return self._memoize(
+            ("ma", timeperiod, int(ma_type)),
+            lambda: talib.MA(self.series.close, timeperiod=timeperiod, matype=ma_type))
+
+    # 中间结果：滚动最高价
+    def _highest(self, timeperiod: int) -> np.ndarray:
+        return self._memoize(("highest", timeperiod), lambda: talib.MAX(self.series.high, timeperiod=timeperiod))
+
+    # 中间结果：滚动最低价
+    def _lowest(self, timeperiod: int) -> np.ndarray:
+        return self._memoize(("lowest", timeperiod), lambda: talib.MIN(self.series.low, timeperiod=timeperiod))
+
     # 计算rsi
-    def rsi(self, timeperiod=14) -> list[float]:
-        rsi = talib.RSI(self.df['close'], timeperiod=timeperiod)
-        return self._reverse(self._to_list_with_none(rsi.tolist()))
+    def rsi(self, timeperiod=14, *, raw: bool = False) -> FloatResult:
+        return self._output(self._rsi(timeperiod), raw)
 
     # 计算stoch
     def stoch(
@@ -56,24 +127,23 @@ class Indicators:
             slowk_period=1,
             slowk_matype: MA_Type = MA_Type.SMA,
             slowd_period=6,
-            slowd_matype: MA_Type = MA_Type.SMA
-    ) -> list[Stoch]:
-        stoch = talib.STOCH(
-            self.df['high'],
-            self.df['low'],
-            self.df['close'],
-            fastk_period=fastk_period,
-            slowk_period=slowk_period,
-            slowk_matype=slowk_matype,
-            slowd_period=slowd_period,
-            slowd_matype=slowd_matype,
-        )
-        ks = self._to_list_with_none(stoch[0].tolist())
-        ds = self._to_list_with_none(stoch[1].tolist())
-        res_list = []
-        for k, d in zip(ks, ds):
-            res_list.append(Stoch(k=k, d=d))
-        return self._reverse(res_list)
+            slowd_matype: MA_Type = MA_Type.SMA,
+            *,
+            raw: bool = False,
+    ) -> Union[list[Stoch], ColumnsResult]:
+        k, d = self._memoize(
+            ("stoch", fastk_period, slowk_period, int(slowk_matype), slowd_period, int(slowd_matype)),
+            lambda: talib.STOCH(
+                self.series.high,
+                self.series.low,
+                self.series.close,
+                fastk_period=fastk_period,
+                slowk_period=slowk_period,
+                slowk_matype=slowk_matype,
+                slowd_period=slowd_period,
+                slowd_matype=slowd_matype,
+            ))
+        return self._output_models(Stoch, {"k": k, "d": d}, raw)
 
     # 计算stoch_rsi
     def stoch_rsi(
@@ -83,7 +153,9 @@ class Indicators:
             smooth_k=3,
             smooth_d=3,
             ma_type: Literal['EMA', 'SMA'] = "SMA",
-    ) -> list[StochRSI]:
+            *,
+            raw: bool = False,
+    ) -> Union[list[StochRSI], ColumnsResult]:
         """
         显式计算 StochRSI：
         1. 先计算 RSI(timeperiod)
@@ -95,131 +167,153 @@ class Indicators:
         ma_type: 'SMA' 或 'EMA'（用于 K 和 D 的平滑）
         返回 list[StochRSI]，每项为 k,d（可能包含 NaN）
         """
-        import numpy as np
-        # 1. RSI
-        rsi = talib.RSI(self.df['close'], timeperiod=timeperiod)
-        # 为后续计算方便转换为 numpy 数组
-        rsi_arr = np.asarray(rsi, dtype=float)
-
-        # 2. rolling min/max 在 RSI 上
-        rsi_series = pd.Series(rsi_arr)
-        lowest = rsi_series.rolling(window=stoch_length, min_periods=1).min().to_numpy()
-        highest = rsi_series.rolling(window=stoch_length, min_periods=1).max().to_numpy()
-
-        # 防止除以 0
-        denom = highest - lowest
-        with np.errstate(divide='ignore', invalid='ignore'):
-            k_raw = (rsi_arr - lowest) / denom * 100
-        # 当 denom==0 时置为 0 或 NaN（保持一致性选择 NaN）
-        k_raw = np.where(np.isfinite(k_raw), k_raw, np.nan)
-
-        # 3/4 平滑 K 和 D，可选 SMA 或 EMA
-        if ma_type.upper() == 'EMA':
-            k_smooth = pd.Series(k_raw).ewm(span=smooth_k, adjust=False, min_periods=1).mean().to_numpy()
-            d_smooth = pd.Series(k_smooth).ewm(span=smooth_d, adjust=False, min_periods=1).mean().to_numpy()
-        else:
-            # 默认使用 SMA
-            k_smooth = pd.Series(k_raw).rolling(window=smooth_k, min_periods=1).mean().to_numpy()
-            d_smooth = pd.Series(k_smooth).rolling(window=smooth_d, min_periods=1).mean().to_numpy()
-
-        k_smooths = self._to_list_with_none(k_smooth.tolist())
-        d_smooths = self._to_list_with_none(d_smooth.tolist())
-        res_list = []
-        for k_val, d_val in zip(k_smooths, d_smooths):
-            res_list.append(StochRSI(k=k_val, d=d_val))
-        return self._reverse(res_list)
+
+        def calculate() -> tuple[np.ndarray, np.ndarray]:
+            # 1. RSI（与 rsi() 共享）
+            rsi_arr = self._rsi(timeperiod)
+
+            # 2. rolling min/max 在 RSI 上
+            rsi_series = pd.Series(rsi_arr)
+            lowest = rsi_series.rolling(window=stoch_length, min_periods=1).min().to_numpy()
+            highest = rsi_series.rolling(window=stoch_length, min_periods=1).max().to_numpy()
+
+            # 防止除以 0
+            denom = highest - lowest
+            with np.errstate(divide='ignore', invalid='ignore'):
+                k_raw = (rsi_arr - lowest) / denom * 100
+            # 当 denom==0 时置为 0 或 NaN（保持一致性选择 NaN）
+            k_raw = np.where(np.isfinite(k_raw), k_raw, np.nan)
+
+            # 3/4 平滑 K 和 D，可选 SMA 或 EMA
+            if ma_type.upper() == 'EMA':
+                k_smooth = pd.Series(k_raw).ewm(span=smooth_k, adjust=False, min_periods=1).mean().to_numpy()
+                d_smooth = pd.Series(k_smooth).ewm(span=smooth_d, adjust=False, min_periods=1).mean().to_numpy()
+            else:
+                # 默认使用 SMA
+                k_smooth = pd.Series(k_raw).rolling(window=smooth_k, min_periods=1).mean().to_numpy()
+                d_smooth = pd.Series(k_smooth).rolling(window=smooth_d, min_periods=1).mean().to_numpy()
+            return k_smooth, d_smooth
+
+        k, d = self._memoize(("stoch_rsi", timeperiod, stoch_length, smooth_k, smooth_d, ma_type.upper()), calculate)
+        return self._output_models(StochRSI, {"k": k, "d": d}, raw)
 
     # 计算MACD(12,26)
-    def macd(self, fast_period=12, slow_period=26, signal_period=9) -> list[MACD]:
-        macd = talib.MACD(
-            self.df['close'],
-            fastperiod=fast_period,
-            slowperiod=slow_period,
-            signalperiod=signal_period
-        )
-        hist = self._to_list_with_none(macd[2].tolist())
-        macds = self._to_list_with_none(macd[0].tolist())
-        signal = self._to_list_with_none(macd[1].tolist())
-        res_list = []
-        for macd, signal, hist in zip(macds, signal, hist):
-            res_list.append(MACD(macd=macd, signal=signal, hist=hist))
-        return self._reverse(res_list)
+    def macd(
+            self,
+            fast_period=12,
+            slow_period=26,
+            signal_period=9,
+            *,
+            raw: bool = False,
+    ) -> Union[list[MACD], ColumnsResult]:
+        macd, signal, hist = self._memoize(
+            ("macd", fast_period, slow_period, signal_period),
+            lambda: talib.MACD(
+                self.series.close,
+                fastperiod=fast_period,
+                slowperiod=slow_period,
+                signalperiod=signal_period
+            ))
+        return self._output_models(MACD, {"macd": macd, "signal": signal, "hist": hist}, raw)
 
     # 计算MA
-    def ma(self, timeperiod: int = 5, ma_type: MA_Type = MA_Type.SMA) -> list[float]:
-        ma = talib.MA(self.df['close'], timeperiod=timeperiod, matype=ma_type)
-        return self._reverse(self._to_list_with_none(ma.tolist()))
+    def ma(self, timeperiod: int = 5, ma_type: MA_Type = MA_Type.SMA, *, raw: bool = False) -> FloatResult:
+        return self._output(self._ma(timeperiod, ma_type), raw)
 
     # 计算ADX(14)
-    def adx(self, timeperiod=14) -> list[float]:
-        adx = talib.ADX(self.df['high'], self.df['low'], self.df['close'], timeperiod=timeperiod)
-        return self._reverse(self._to_list_with_none(adx.tolist()))
+    def adx(self, timeperiod=14, *, raw: bool = False) -> FloatResult:
+        adx = self._memoize(
+            ("adx", timeperiod),
+            lambda: talib.ADX(self.series.high, self.series.low, self.series.close, timeperiod=timeperiod))
+        return self._output(adx, raw)
 
     # 计算Williams %R(14)
-    def williams_r(self, timeperiod=14) -> list[float]:
-        williams_r = talib.WILLR(self.df['high'], self.df['low'], self.df['close'], timeperiod=timeperiod)
-        return self._reverse(self._to_list_with_none(williams_r.tolist()))
+    def williams_r(self, timeperiod=14, *, raw: bool = False) -> FloatResult:
+        def calculate() -> np.ndarray:
+            # 与 highs_lows() 共享滚动最高/最低价，计算方式与 talib.WILLR 一致
+            highest = self._highest(timeperiod)
+            lowest = self._lowest(timeperiod)
+            diff = (highest - lowest) / -100.0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(diff != 0, (highest - self.series.close) / diff, np.where(np.isnan(diff), np.nan, 0.0))
+
+        return self._output(self._memoize(("williams_r", timeperiod), calculate), raw)
 
     # 计算CCI(14)
-    def cci(self, timeperiod=14) -> list[float]:
-        cci = talib.CCI(self.df['high'], self.df['low'], self.df['close'], timeperiod=timeperiod)
-        return self._reverse(self._to_list_with_none(cci.tolist()))
+    def cci(self, timeperiod=14, *, raw: bool = False) -> FloatResult:
+        cci = self._memoize(
+            ("cci", timeperiod),
+            lambda: talib.CCI(self.series.high, self.series.low, self.series.close, timeperiod=timeperiod))
+        return self._output(cci, raw)
 
     # 计算ATR(14)
-    def atr(self, timeperiod=14) -> list[float]:
-        atr = talib.ATR(self.df['high'], self.df['low'], self.df['close'], timeperiod=timeperiod)
-        return self._reverse(self._to_list_with_none(atr.tolist()))
+    def atr(self, timeperiod=14, *, raw: bool = False) -> FloatResult:
+        atr = self._memoize(
+            ("atr", timeperiod),
+            lambda: talib.ATR(self.series.high, self.series.low, self.series.close, timeperiod=timeperiod))
+        return self._output(atr, raw)
 
     # 计算Highs/Lows(14)
-    def highs_lows(self, timeperiod=14) -> list[HighsLows]:
-        highs = talib.MAX(self.df['high'], timeperiod=timeperiod)
-        lows = talib.MIN(self.df['low'], timeperiod=timeperiod)
-        highs_list = self._to_list_with_none(highs.tolist())
-        lows_list = self._to_list_with_none(lows.tolist())
-        res_list = []
-        for high, low in zip(highs_list, lows_list):
-            res_list.append(HighsLows(high=high, low=low))
-        return self._reverse(res_list)
+    def highs_lows(self, timeperiod=14, *, raw: bool = False) -> Union[list[HighsLows], ColumnsResult]:
+        return self._output_models(HighsLows, {"high": self._highest(timeperiod), "low": self._lowest(timeperiod)}, raw)
 
     # 计算UltimateOscillator
-    def ultimate_oscillator(self) -> list[float]:
-        ultimate_oscillator = talib.ULTOSC(self.df['high'], self.df['low'], self.df['close'])
-        return self._reverse(self._to_list_with_none(ultimate_oscillator.tolist()))
+    def ultimate_oscillator(self, *, raw: bool = False) -> FloatResult:
+        ultimate_oscillator = self._memoize(
+            ("ultimate_oscillator",),
+            lambda: talib.ULTOSC(self.series.high, self.series.low, self.series.close))
+        return self._output(ultimate_oscillator, raw)
 
     # 计算ROC
-    def roc(self, timeperiod=9) -> list[float]:
-        roc = talib.ROC(self.df['close'], timeperiod=timeperiod)
-        return self._reverse(self._to_list_with_none(roc.tolist()))
+    def roc(self, timeperiod=9, *, raw: bool = False) -> FloatResult:
+        roc = self._memoize(("roc", timeperiod), lambda: talib.ROC(self.series.close, timeperiod=timeperiod))
+        return self._output(roc, raw)
 
     # 计算Bull/Bear Power(13)
-    def bull_bear_power(self, timeperiod=13, smooth=True, ma_type: MA_Type = MA_Type.SMA) -> list[float]:
+    def bull_bear_power(
+            self,
+            timeperiod=13,
+            smooth=True,
+            ma_type: MA_Type = MA_Type.SMA,
+            *,
+            raw: bool = False,
+    ) -> FloatResult:
         """
         计算 BOP（Balance Of Power）。
-        - 如果 smooth 为 False 或 timeperiod <= 1，返回原始 BOP。
+        - 如果 smooth 为 False 或 timeperiod <= 1，返回原始 BOP（按时间升序）。
         - 否则对 BOP 做 timeperiod 周期的移动平均（使用 talib.MA，ma_type 可指定）。
         """
         # 原始 BOP（逐根 K 线）
-        bop = talib.BOP(self.df['open'], self.df['high'], self.df['low'], self.df['close'])
+        bop = self._memoize(
+            ("bop",),
+            lambda: talib.BOP(self.series.open, self.series.high, self.series.low, self.series.close))
         # 是否平滑
         if not smooth or (timeperiod is None) or (timeperiod <= 1):
-            return self._to_list_with_none(bop.tolist())
+            return bop if raw else self._to_list_with_none(bop)
         # 使用 talib.MA 对 BOP 做移动平均平滑
-        bop_smooth = talib.MA(bop, timeperiod=timeperiod, matype=ma_type)
-        return self._reverse(self._to_list_with_none(bop_smooth.tolist()))
+        bop_smooth = self._memoize(
+            ("bop_ma", timeperiod, int(ma_type)),
+            lambda: talib.MA(bop, timeperiod=timeperiod, matype=ma_type))
+        return self._output(bop_smooth, raw)
 
     # 计算Bollinger Bands
-    def bollinger_bands(self, timeperiod=20, nbdevup=2, nbdevdn=2, matype=MA_Type.SMA) -> list[BollingerBands]:
-        upper, middle, lower = talib.BBANDS(
-            self.df['close'],
-            timeperiod=timeperiod,
-            nbdevup=nbdevup,
-            nbdevdn=nbdevdn,
-            matype=matype
-        )
-        uppers = self._to_list_with_none(upper.tolist())
-        middles = self._to_list_with_none(middle.tolist())
-        lowers = self._to_list_with_none(lower.tolist())
-        res_list = []
-        for upper_v, middle_v, lower_v in zip(uppers, middles, lowers):
-            res_list.append(BollingerBands(upper_band=upper_v, middle_band=middle_v, lower_band=lower_v))
-        return self._reverse(res_list)
+    def bollinger_bands(
+            self,
+            timeperiod=20,
+            nbdevup=2,
+            nbdevdn=2,
+            matype=MA_Type.SMA,
+            *,
+            raw: bool = False,
+    ) -> Union[list[BollingerBands], ColumnsResult]:
+        upper, middle, lower = self._memoize(
+            ("bollinger_bands", timeperiod, nbdevup, nbdevdn, int(matype)),
+            lambda: talib.BBANDS(
+                self.series.close,
+                timeperiod=timeperiod,
+                nbdevup=nbdevup,
+                nbdevdn=nbdevdn,
+                matype=matype
+            ))
+        return self._output_models(
+            BollingerBands, {"upper_band": upper, "middle_band": middle, "lower_band": lower}, raw)
@@ -0,0 +1,115 @@
+from typing import Any, Iterable, Union
+
+import numpy as np
+
+from .models import Kline
+
+
+class KlineSeries:
+    """
+    列式存储的k线序列：timestamp 为 int64，open/high/low/close/volume 为连续的 float64 数组。
+    直接由 ccxt 的 ohlcv 二维列表构建，不会为每根k线创建对象。
+    """
+    __slots__ = ("timestamp", "open", "high", "low", "close", "volume", "memo")
+
+    def __init__(
+            self,
+            timestamp: Any,
+            open: Any,
+            high: Any,
+            low: Any,
+            close: Any,
+            volume: Any,
+    ):
+        self.timestamp = np.ascontiguousarray(timestamp, dtype=np.int64)
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = np.ascontiguousarray(volume, dtype=np.float64)
+        # 基于这组k线的计算缓存（例如 Indicators 实例）
+        self.memo: dict[str, Any] = {}
+
+    # 由 ccxt ohlcv 列表构建：[[timestamp, open, high, low, close, volume], ...]
+    @classmethod
+    def from_ohlcv(cls, ohlcv: list[list]) -> "KlineSeries":
+        if len(ohlcv) == 0:
+            return cls.empty()
+        arr = np.asarray(ohlcv, dtype=np.float64)
+        return cls(arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3], arr[:, 4], arr[:, 5])
+
+    # 由带 timestamp/open/high/low/close/volume 属性的对象列表构建（Kline、KlineDto）
+    @classmethod
+    def from_klines(cls, kline_list: Iterable[Any]) -> "KlineSeries":
+        kline_list = list(kline_list)
+        return cls(
+            [k.timestamp for k in kline_list],
+            [k.open for k in kline_list],
+            [k.high for k in kline_list],
+            [k.low for k in kline_list],
+            [k.close for k in kline_list],
+            [k.volume for k in kline_list],
+        )
+
+    # 空序列
+    @classmethod
+    def empty(cls) -> "KlineSeries":
+        return cls([], [], [], [], [], [])
+
+    # 转换为 KlineSeries，已经是 KlineSeries 时原样返回
+    @classmethod
+    def of(cls, data: Union["KlineSeries", list[Kline]]) -> "KlineSeries":
+        if isinstance(data, KlineSeries):
+            return data
+        return cls.from_klines(data)
+
+    # 按顺序拼接多个序列
+    @classmethod
+    def concat(cls, parts: Iterable["KlineSeries"]) -> "KlineSeries":
+        parts = [part for part in parts if len(part) > 0]
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return cls.empty()
+        return cls(*[
+            np.concatenate([getattr(part, name) for part in parts])
+            for name in ("timestamp", "open", "high", "low", "close", "volume")
+        ])
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    # 序列化时不包含计算缓存（例如发送到进程池时）
+    def __reduce__(self):
+        return KlineSeries, (self.timestamp, self.open, self.high, self.low, self.close, self.volume)
+
+    # 按时间升序排列，已经有序时原样返回
+    def sorted(self) -> "KlineSeries":
+        if len(self) <= 1 or bool(np.all(self.timestamp[1:] >= self.timestamp[:-1])):
+            return self
+        order = np.argsort(self.timestamp, kind="stable")
+        return self.take(order)
+
+    # 按下标取子序列
+    def take(self, index: Any) -> "KlineSeries":
+        return KlineSeries(
+            self.timestamp[index],
+            self.open[index],
+            self.high[index],
+            self.low[index],
+            self.close[index],
+            self.volume[index],
+        )
+
+    # 最新的 n 根k线（视图，不复制数据）
+    def tail(self, n: int) -> "KlineSeries":
+        return self.take(slice(max(len(self) - n, 0), None))
+
+    # 转换为 Kline 列表
+    def to_klines(self) -> list[Kline]:
+        return [
+            Kline(timestamp=t, open=o, high=h, low=l, close=c, volume=v)
+            for t, o, h, l, c, v in zip(
+                self.timestamp.tolist(), self.open.tolist(), self.high.tolist(),
+                self.low.tolist(), self.close.tolist(), self.volume.tolist())
+        ]
@@ -0,0 +1,506 @@
+import math
+from collections import deque
+from typing import Any, Optional, Sequence, Union
+
+from .models import Kline
+from .series import KlineSeries
+
+NAN = float("nan")
+
+
+# 与 talib 的 TA_IS_ZERO 一致
+def _is_zero(v: float) -> bool:
+    return -0.00000001 < v < 0.00000001
+
+
+def _none_if_nan(v: float) -> Optional[float]:
+    return None if math.isnan(v) else v
+
+
+# 流式指标组件基类，clone() 用于保存/恢复最新一根k线之前的状态
+class _Component:
+    def clone(self):
+        other = object.__new__(type(self))
+        state = self.__dict__.copy()
+        for name, value in state.items():
+            if type(value) is deque:
+                state[name] = value.copy()
+            elif isinstance(value, _Component):
+                state[name] = value.clone()
+        other.__dict__ = state
+        return other
+
+
+# 简单移动平均，累加顺序与 talib 一致
+class _Sma(_Component):
+    def __init__(self, n: int):
+        self.n = n
+        self.window: deque[float] = deque(maxlen=n)
+        self.total = 0.0
+
+    def update(self, x: float) -> float:
+        self.window.append(x)
+        self.total += x
+        if len(self.window) < self.n:
+            return NAN
+        out = self.total / self.n
+        self.total -= self.window[0]
+        return out
+
+
+# 指数移动平均，前 n 个值的简单平均作为初始值
+class _Ema(_Component):
+    def __init__(self, n: int):
+        self.n = n
+        self.k = 2.0 / (n + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value = NAN
+
+    def seed(self, values: Sequence[float]):
+        total = 0.0
+        for v in values:
+            total += v
+        self.value = total / self.n
+        self.count = self.n
+
+    def update(self, x: float) -> float:
+        if self.count < self.n:
+            self.count += 1
+            self.total += x
+            if self.count == self.n:
+                self.value = self.total / self.n
+            return self.value
+        self.value = (x - self.value) * self.k + self.value
+        return self.value
+
+
+# 滚动窗口最大/最小值
+class _Extreme(_Component):
+    def __init__(self, n: int):
+        self.n = n
+        self.window: deque[float] = deque(maxlen=n)
+
+    def update(self, x: float) -> tuple[float, float]:
+        self.window.append(x)
+        if len(self.window) < self.n:
+            return NAN, NAN
+        return max(self.window), min(self.window)
+
+
+# Wilder RSI，与 talib.RSI 一致
+class _Rsi(_Component):
+    def __init__(self, n: int):
+        self.n = n
+        self.count = 0
+        self.prev_close = NAN
+        self.gain = 0.0
+        self.loss = 0.0
+
+    def update(self, close: float) -> float:
+        self.count += 1
+        if self.count == 1:
+            self.prev_close = close
+            return NAN
+        diff = close - self.prev_close
+        self.prev_close = close
+        if self.count <= self.n + 1:
+            if diff < 0:
+                self.loss -= diff
+            else:
+                self.gain += diff
+            if self.count < self.n + 1:
+                return NAN
+            self.loss /= self.n
+            self.gain /= self.n
+        else:
+            self.loss *= (self.n - 1)
+            self.gain *= (self.n - 1)
+            if diff < 0:
+                self.loss -= diff
+            else:
+                self.gain += diff
+            self.loss /= self.n
+            self.gain /= self.n
+        total = self.gain + self.loss
+        return 100 * (self.gain / total) if not _is_zero(total) else 0.0
+
+
+# ATR，与 talib.ATR 一致
+class _Atr(_Component):
+    def __init__(self, n: int):
+        self.n = n
+        self.count = 0
+        self.prev_close = NAN
+        self.sma = _Sma(n)
+        self.value = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.count += 1
+        prev_close = self.prev_close
+        self.prev_close = close
+        if self.count == 1:
+            return NAN
+        tr = max(high, prev_close) - min(low, prev_close)
+        if self.count <= self.n + 1:
+            self.value = self.sma.update(tr)
+            return self.value
+        self.value = (self.value * (self.n - 1) + tr) / self.n
+        return self.value
+
+
+# ADX，与 talib.ADX 一致
+class _Adx(_Component):
+    def __init__(self, n: int):
+        self.n = n
+        self.count = 0
+        self.prev_high = NAN
+        self.prev_low = NAN
+        self.prev_close = NAN
+        self.plus_dm = 0.0
+        self.minus_dm = 0.0
+        self.tr = 0.0
+        self.sum_dx = 0.0
+        self.value = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.count += 1
+        if self.count == 1:
+            self.prev_high, self.prev_low, self.prev_close = high, low, close
+            return NAN
+
+        diff_p = high - self.prev_high
+        diff_m = self.prev_low - low
+        tr = max(high, self.prev_close) - min(low, self.prev_close)
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+
+        # 第 1 到 n-1 根：累加 DM 和 TR
+        if self.count <= self.n:
+            if diff_m > 0 and diff_p < diff_m:
+                self.minus_dm += diff_m
+            elif diff_p > 0 and diff_p > diff_m:
+                self.plus_dm += diff_p
+            self.tr += tr
+            return NAN
+
+        self.minus_dm -= self.minus_dm / self.n
+        self.plus_dm -= self.plus_dm / self.n
+        if diff_m > 0 and diff_p < diff_m:
+            self.minus_dm += diff_m
+        elif diff_p > 0 and diff_p > diff_m:
+            self.plus_dm += diff_p
+        self.tr = self.tr - self.tr / self.n + tr
+
+        dx = NAN
+        if not _is_zero(self.tr):
+            minus_di = 100 * (self.minus_dm / self.tr)
+            plus_di = 100 * (self.plus_dm / self.tr)
+            total = minus_di + plus_di
+            if not _is_zero(total):
+                dx = 100 * (abs(minus_di - plus_di) / total)
+
+        # 第 n 到 2n-1 根：累加 DX，第 2n-1 根得到首个 ADX
+        if self.count <= 2 * self.n:
+            if not math.isnan(dx):
+                self.sum_dx += dx
+            if self.count < 2 * self.n:
+                return NAN
+            self.value = self.sum_dx / self.n
+            return self.value
+
+        if not math.isnan(dx):
+            self.value = (self.value * (self.n - 1) + dx) / self.n
+        return self.value
+
+
+# MACD，与 talib.MACD 一致：快慢线都在第 slow 根k线处以简单平均初始化
+class _Macd(_Component):
+    def __init__(self, fast: int, slow: int, signal: int):
+        self.fast = _Ema(fast)
+        self.slow = _Ema(slow)
+        self.signal = _Ema(signal)
+        self.closes: deque[float] = deque(maxlen=slow)
+
+    def update(self, close: float) -> tuple[float, float, float]:
+        if self.slow.count < self.slow.n:
+            self.closes.append(close)
+            if len(self.closes) < self.slow.n:
+                return NAN, NAN, NAN
+            self.slow.seed(self.closes)
+            self.fast.seed(list(self.closes)[-self.fast.n:])
+            self.closes.clear()
+            macd = self.fast.value - self.slow.value
+        else:
+            macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        if math.isnan(signal):
+            return NAN, NAN, NAN
+        return macd, signal, macd - signal
+
+
+# STOCH（SMA 平滑），与 talib.STOCH 一致
+class _Stoch(_Component):
+    def __init__(self, fastk_period: int, slowk_period: int, slowd_period: int):
+        self.high = _Extreme(fastk_period)
+        self.low = _Extreme(fastk_period)
+        self.slow_k = _Sma(slowk_period)
+        self.slow_d = _Sma(slowd_period)
+
+    def update(self, high: float, low: float, close: float) -> tuple[float, float]:
+        highest, _ = self.high.update(high)
+        _, lowest = self.low.update(low)
+        if math.isnan(highest):
+            return NAN, NAN
+        diff = (highest - lowest) / 100.0
+        fast_k = (close - lowest) / diff if diff != 0 else 0.0
+        slow_k = self.slow_k.update(fast_k)
+        if math.isnan(slow_k):
+            return NAN, NAN
+        slow_d = self.slow_d.update(slow_k)
+        if math.isnan(slow_d):
+            return NAN, NAN
+        return slow_k, slow_d
+
+
+# 忽略 NaN 的滚动窗口（对应 pandas rolling(min_periods=1)）
+class _NanWindow(_Component):
+    def __init__(self, n: int):
+        self.window: deque[float] = deque(maxlen=n)
+
+    def update(self, x: float) -> list[float]:
+        self.window.append(x)
+        return [v for v in self.window if not math.isnan(v)]
+
+
+# StochRSI（SMA 平滑），与 Indicators.stoch_rsi 一致
+class _StochRsi(_Component):
+    def __init__(self, stoch_length: int, smooth_k: int, smooth_d: int):
+        self.rsi_window = _NanWindow(stoch_length)
+        self.k_window = _NanWindow(smooth_k)
+        self.d_window = _NanWindow(smooth_d)
+
+    def update(self, rsi: float) -> tuple[float, float]:
+        values = self.rsi_window.update(rsi)
+        k_raw = NAN
+        if values and not math.isnan(rsi):
+            denom = max(values) - min(values)
+            if denom != 0:
+                k_raw = (rsi - min(values)) / denom * 100
+        ks = self.k_window.update(k_raw)
+        k = sum(ks) / len(ks) if ks else NAN
+        ds = self.d_window.update(k)
+        d = sum(ds) / len(ds) if ds else NAN
+        return k, d
+
+
+# Williams %R，与 talib.WILLR 一致
+class _WilliamsR(_Component):
+    def __init__(self, n: int):
+        self.high = _Extreme(n)
+        self.low = _Extreme(n)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        highest, _ = self.high.update(high)
+        _, lowest = self.low.update(low)
+        if math.isnan(highest):
+            return NAN
+        diff = (highest - lowest) / -100.0
+        return (highest - close) / diff if diff != 0 else 0.0
+
+
+# CCI，与 talib.CCI 一致
+class _Cci(_Component):
+    def __init__(self, n: int):
+        self.n = n
+        self.window: deque[float] = deque(maxlen=n)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        typical = (high + low + close) / 3
+        self.window.append(typical)
+        if len(self.window) < self.n:
+            return NAN
+        average = sum(self.window) / self.n
+        deviation = sum(abs(v - average) for v in self.window)
+        diff = typical - average
+        if diff != 0 and deviation != 0:
+            return diff / (0.015 * (deviation / self.n))
+        return 0.0
+
+
+# Ultimate Oscillator(7,14,28)，与 talib.ULTOSC 一致
+class _UltimateOscillator(_Component):
+    def __init__(self, periods: tuple[int, int, int] = (7, 14, 28)):
+        self.periods = periods
+        self.prev_close = NAN
+        self.window: deque[tuple[float, float]] = deque(maxlen=max(periods))
+
+    def update(self, high: float, low: float, close: float) -> float:
+        prev_close = self.prev_close
+        self.prev_close = close
+        if math.isnan(prev_close):
+            return NAN
+        true_low = min(low, prev_close)
+        self.window.append((close - true_low, max(high, prev_close) - true_low))
+        if len(self.window) < self.window.maxlen:
+            return NAN
+        output = 0.0
+        for weight, period in zip((4, 2, 1), self.periods):
+            items = list(self.window)[-period:]
+            a = sum(bp for bp, _ in items)
+            b = sum(tr for _, tr in items)
+            if not _is_zero(b):
+                output += weight * (a / b)
+        return 100 * (output / 7.0)
+
+
+# ROC，与 talib.ROC 一致
+class _Roc(_Component):
+    def __init__(self, n: int):
+        self.window: deque[float] = deque(maxlen=n + 1)
+
+    def update(self, close: float) -> float:
+        self.window.append(close)
+        if len(self.window) < self.window.maxlen:
+            return NAN
+        prev = self.window[0]
+        return ((close / prev) - 1.0) * 100 if prev != 0 else 0.0
+
+
+# Bull/Bear Power：BOP 的简单移动平均
+class _BullBearPower(_Component):
+    def __init__(self, n: int):
+        self.sma = _Sma(n)
+
+    def update(self, open_: float, high: float, low: float, close: float) -> float:
+        diff = high - low
+        bop = 0.0 if diff < 0.00000001 else (close - open_) / diff
+        return self.sma.update(bop)
+
+
+# Bollinger Bands（SMA），与 talib.BBANDS 一致
+class _BollingerBands(_Component):
+    def __init__(self, n: int, nbdevup: float, nbdevdn: float):
+        self.n = n
+        self.nbdevup = nbdevup
+        self.nbdevdn = nbdevdn
+        self.middle = _Sma(n)
+        self.squares = _Sma(n)
+
+    def update(self, close: float) -> tuple[float, float, float]:
+        middle = self.middle.update(close)
+        mean_square = self.squares.update(close * close)
+        if math.isnan(middle):
+            return NAN, NAN, NAN
+        variance = mean_square - middle * middle
+        std = math.sqrt(variance) if variance >= 0.00000001 else 0.0
+        return middle + self.nbdevup * std, middle, middle - self.nbdevdn * std
+
+
+class StreamingIndicators:
+    """
+    流式技术指标：用历史k线初始化后，每追加或修订一根k线只做 O(1)（滚动窗口类指标 O(窗口)）的增量计算，
+    结果与 Indicators 批量计算在误差范围内一致（从同一根k线开始计算时）。
+
+    - 追加：时间戳大于最新一根k线。
+    - 修订：时间戳等于最新一根k线（未收盘k线的价格更新），恢复到该k线之前的状态后重新计算。
+    """
+
+    MA_PERIODS = (5, 10, 20, 50, 100, 200)
+
+    def __init__(self):
+        self._components: dict[str, _Component] = {
+            "rsi": _Rsi(14),
+            "stoch": _Stoch(9, 1, 6),
+            "stoch_rsi": _StochRsi(5, 3, 3),
+            "macd": _Macd(12, 26, 9),
+            "adx": _Adx(14),
+            "williams_r": _WilliamsR(14),
+            "cci": _Cci(14),
+            "atr": _Atr(14),
+            "highs": _Extreme(14),
+            "lows": _Extreme(14),
+            "ultimate_oscillator": _UltimateOscillator(),
+            "roc": _Roc(9),
+            "bull_bear_power": _BullBearPower(13),
+            "bollinger_bands": _BollingerBands(20, 2, 2),
+            **{f"ma{n}": _Sma(n) for n in self.MA_PERIODS},
+        }
+        self._previous: Optional[dict[str, _Component]] = None
+        self._timestamp: Optional[int] = None
+        self._latest: dict[str, Any] = {}
+
+    # 由历史k线初始化
+    @classmethod
+    def from_series(cls, data: Union[KlineSeries, list[Kline]]) -> "StreamingIndicators":
+        indicators = cls()
+        series = KlineSeries.of(data).sorted()
+        if len(series) == 0:
+            return indicators
+        opens, highs, lows, closes = (series.open.tolist(), series.high.tolist(),
+                                      series.low.tolist(), series.close.tolist())
+        # 历史k线不会被修订，只需要为最新一根保存之前的状态
+        for i in range(len(series) - 1):
+            indicators._apply(opens[i], highs[i], lows[i], closes[i])
+        indicators._timestamp = int(series.timestamp[-2]) if len(series) > 1 else None
+        indicators.update([series.timestamp[-1], opens[-1], highs[-1], lows[-1], closes[-1], series.volume[-1]])
+        return indicators
+
+    # 最新一根k线的时间戳
+    @property
+    def timestamp(self) -> Optional[int]:
+        return self._timestamp
+
+    # 追加或修订k线：ohlcv 为 [timestamp, open, high, low, close, volume]，返回最新的指标值
+    def update(self, ohlcv: Sequence[float]) -> dict[str, Any]:
+        timestamp = int(ohlcv[0])
+        if self._timestamp is not None and timestamp < self._timestamp:
+            raise ValueError("只能追加或修订最新一根k线")
+        if self._timestamp is not None and timestamp == self._timestamp:
+            # 修订：恢复到最新一根k线之前的状态
+            self._components = self._clone(self._previous)
+        else:
+            self._previous = self._clone(self._components)
+        self._timestamp = timestamp
+        self._latest = self._apply(float(ohlcv[1]), float(ohlcv[2]), float(ohlcv[3]), float(ohlcv[4]))
+        return self._latest
+
+    # 最新的指标值，字段与 IndicatorsDto 一致，未就绪的值为 None
+    def latest(self) -> dict[str, Any]:
+        return self._latest
+
+    @staticmethod
+    def _clone(components: dict[str, _Component]) -> dict[str, _Component]:
+        return {name: component.clone() for name, component in components.items()}
+
+    def _apply(self, open_: float, high: float, low: float, close: float) -> dict[str, Any]:
+        c = self._components
+        rsi = c["rsi"].update(close)
+        stoch_k, stoch_d = c["stoch"].update(high, low, close)
+        # StochRSI 复用同一根k线的 RSI
+        stoch_rsi_k, stoch_rsi_d = c["stoch_rsi"].update(rsi)
+        macd, signal, hist = c["macd"].update(close)
+        highest, _ = c["highs"].update(high)
+        _, lowest = c["lows"].update(low)
+        upper, middle, lower = c["bollinger_bands"].update(close)
+        result = {
+            "rsi": _none_if_nan(rsi),
+            "stoch": {"k": _none_if_nan(stoch_k), "d": _none_if_nan(stoch_d)},
+            "stoch_rsi": {"k": _none_if_nan(stoch_rsi_k), "d": _none_if_nan(stoch_rsi_d)},
+            "macd": {"macd": _none_if_nan(macd), "signal": _none_if_nan(signal), "hist": _none_if_nan(hist)},
+            "adx": _none_if_nan(c["adx"].update(high, low, close)),
+            "williams_r": _none_if_nan(c["williams_r"].update(high, low, close)),
+            "cci": _none_if_nan(c["cci"].update(high, low, close)),
+            "atr": _none_if_nan(c["atr"].update(high, low, close)),
+            "highs_lows": {"high": _none_if_nan(highest), "low": _none_if_nan(lowest)},
+            "ultimate_oscillator": _none_if_nan(c["ultimate_oscillator"].update(high, low, close)),
+            "roc": _none_if_nan(c["roc"].update(close)),
+            "bull_bear_power": _none_if_nan(c["bull_bear_power"].update(open_, high, low, close)),
+            "bollinger_bands": {
+                "upper_band": _none_if_nan(upper),
+                "middle_band": _none_if_nan(middle),
+                "lower_band": _none_if_nan(lower),
+            },
+        }
+        for n in self.MA_PERIODS:
+            result[f"ma{n}"] = _none_if_nan(c[f"ma{n}"].update(close))
+        return result
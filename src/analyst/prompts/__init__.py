@@ -1 +1,3 @@
-from .indicators_prompt import IndicatorsPrompt
+from .indicators_prompt import IndicatorsPrompt, PromptTemplate
+from .prompt_cache import PromptCache
+from .token_counter import TokenCounter, prompt_size
@@ -1,24 +1,112 @@
-from typing import Optional, Any
+import copy
+import math
+import re
+from functools import lru_cache
+from typing import Optional, Any, Callable, Union
 
-from ..indicators import Indicators
+import numpy as np
+
+from ..indicators import Indicators, KlineSeries
+from ..indicators.indicators import FloatResult, ColumnsResult
 from ..indicators.models import Stoch, StochRSI, MACD, HighsLows, BollingerBands, Kline
 
 
+# 每个指标默认展示的条数
+DEFAULT_DEPTH = 60
+
+# 紧凑编码时价格类指标的换算方式：价位换算为相对最新收盘价的偏离百分比，价差换算为占最新收盘价的百分比
+LEVEL = "level"
+DELTA = "delta"
+SCALE_NOTES = {LEVEL: "（相对最新收盘价的偏离 %）", DELTA: "（占最新收盘价的 %）"}
+
+
 class IndicatorsPrompt:
-    def __init__(self):
-        pass
+    """
+    技术指标提示词。
+
+    - 默认编码：数值保留 2 位小数，k线为原始价格。
+    - 紧凑编码（compact）：价格类指标（MA、Bollinger Bands、Highs/Lows、ATR、MACD、Bull/Bear Power）
+      换算为相对最新收盘价的百分比；k线逐根差分编码（跳空、实体、上下影线，以最新收盘价的固定比例为单位的整数），
+      时间戳只给出最新时间和周期；
+      每段数值按 digits 位有效数字自适应小数位数，不同价格量级的币种精度一致，token 更少。
+    - depth：按指标设置展示条数，例如 {"kline": 30, "ma200": 5}，未设置的指标展示 DEFAULT_DEPTH 条。
+    """
+
+    def __init__(self, compact: bool = False, digits: int = 4, depth: Optional[dict[str, int]] = None):
+        if digits <= 0:
+            raise ValueError("digits 值不能小于等于 0")
+        for name, n in (depth or {}).items():
+            if name not in SECTIONS:
+                raise ValueError(f"没有指标：{name}，支持：{', '.join(SECTIONS)}")
+            if n <= 0:
+                raise ValueError(f"指标 {name} 的展示条数不能小于等于 0")
+        self.compact = compact
+        self.digits = digits
+        self.depth = dict(depth or {})
+        self._anchor: Optional[float] = None  # 紧凑编码的基准价（最新收盘价），只在 bind 返回的副本上设置
+
+    # 编码选项，不同选项生成的提示词分别缓存
+    @property
+    def options(self) -> tuple:
+        return self.compact, self.digits, tuple(sorted(self.depth.items()))
+
+    # 指标的展示条数
+    def max_items(self, name: str) -> int:
+        return self.depth.get(name, DEFAULT_DEPTH)
+
+    # 紧凑编码时返回以这组k线最新收盘价为基准价的副本，实例本身不变，可以在多个线程中共享
+    def bind(self, indicators: Indicators) -> "IndicatorsPrompt":
+        if not self.compact:
+            return self
+        series = indicators.series.sorted()
+        anchor = float(series.close[-1]) if len(series) > 0 else math.nan
+        bound = copy.copy(self)
+        bound._anchor = anchor if math.isfinite(anchor) and anchor != 0 else None
+        return bound
+
+    # 紧凑编码时换算价格类指标
+    def _scaled(self, values: np.ndarray, scale: Optional[str]) -> np.ndarray:
+        if scale is None or self._anchor is None:
+            return values
+        if scale == LEVEL:
+            return (values / self._anchor - 1) * 100
+        return values / self._anchor * 100
+
+    # 小数位数：默认 2 位；紧凑编码按最大绝对值保留 digits 位有效数字
+    def _decimals(self, values: np.ndarray) -> int:
+        if not self.compact:
+            return 2
+        return _significant_decimals(values, self.digits)
+
+    # 标题行，紧凑编码换算过的指标加上单位说明
+    def _title(self, title: str, scale: Optional[str]) -> str:
+        if scale is None or self._anchor is None:
+            return title
+        return title + SCALE_NOTES[scale]
 
     # float 列表提示词
-    @staticmethod
-    def _float_list_prompt(init_prompt_rows: list[str], float_list: list[Optional[float]], max_items: int = 60) -> str:
+    def _float_list_prompt(
+            self,
+            init_prompt_rows: list[str],
+            float_list: FloatResult,
+            max_items: int = DEFAULT_DEPTH,
+            scale: Optional[str] = None,
+    ) -> str:
         prompt_rows = [*init_prompt_rows]
         value_list: list[str] = []
-        for i in range(len(float_list)):
-            if float_list[i] is None:
-                continue
-            value_list.append(f"{float_list[i]:.2f}")
-            if len(value_list) >= max_items:
-                break
+        if isinstance(float_list, np.ndarray):
+            # raw 模式：用掩码过滤 NaN，所有数值用同一个格式串一次格式化
+            values = self._scaled(float_list[~np.isnan(float_list)][:max_items], scale)
+            if len(values) > 0:
+                prompt_rows[0] = self._title(prompt_rows[0], scale)
+                value_list = [_number_format(len(values), 1, self._decimals(values)) % tuple(values.tolist())]
+        else:
+            for i in range(len(float_list)):
+                if float_list[i] is None:
+                    continue
+                value_list.append(f"{float_list[i]:.2f}")
+                if len(value_list) >= max_items:
+                    break
         if len(value_list) == 0:
             prompt_rows.append("N/A")
             return '\n'.join(prompt_rows)
@@ -27,17 +115,33 @@ class IndicatorsPrompt:
         return '\n'.join(prompt_rows)
 
     # 通用对象/值 列表提示词
-    @staticmethod
-    def _object_list_prompt(init_prompt_rows: list[str], items: list[Any], formatter, max_items: int = 60) -> str:
+    def _object_list_prompt(
+            self,
+            init_prompt_rows: list[str],
+            items: Union[list[Any], ColumnsResult],
+            formatter,
+            max_items: int = DEFAULT_DEPTH,
+            scale: Optional[str] = None,
+    ) -> str:
         """
         title: 提示词第一行
         header: 第二行（例如 "K,D" 或 "MACD,Signal,Hist"），可以传入空字符串
-        items: 对象或数值列表，元素可为 None
-        formatter: 可调用对象 f(item) -> str，将一个元素格式化为字符串（例如 "1.23,4.56"）
+        items: 对象或数值列表，元素可为 None；或 raw 模式的 {字段: numpy 数组}，按字段顺序输出 .2f 数值
+        formatter: 可调用对象 f(item) -> str，将一个元素格式化为字符串（例如 "1.23,4.56"），raw 模式下不使用
         max_items: 最大展示条数
+        scale: 紧凑编码时价格类指标的换算方式（LEVEL / DELTA），只对 raw 模式生效
         """
         prompt_rows = [*init_prompt_rows]
         value_list: list[str] = []
+        if isinstance(items, dict):
+            # raw 模式：跳过任一字段为 NaN 的行，按行展开后用同一个格式串一次格式化
+            columns = np.vstack(list(items.values()))
+            rows = self._scaled(columns[:, ~np.isnan(columns).any(axis=0)][:, :max_items], scale)
+            if rows.shape[1] > 0:
+                prompt_rows[0] = self._title(prompt_rows[0], scale)
+                value_list = [
+                    _number_format(rows.shape[0], rows.shape[1], self._decimals(rows)) % tuple(rows.T.ravel().tolist())]
+            items = []
         for it in items:
             if it is None:
                 continue
@@ -61,28 +165,37 @@ class IndicatorsPrompt:
         return '\n'.join(prompt_rows)
 
     # rsi 提示词
-    def rsi_prompt(self, rsi: list[Optional[float]], timeperiod: int) -> str:
-        return self._float_list_prompt([f"## 近期 RSI(timeperiod={timeperiod}) 技术指标"], rsi)
+    def rsi_prompt(self, rsi: FloatResult, timeperiod: int, max_items: int = DEFAULT_DEPTH) -> str:
+        return self._float_list_prompt([f"## 近期 RSI(timeperiod={timeperiod}) 技术指标"], rsi, max_items)
 
     # stoch 提示词
-    def stoch_prompt(self, stoch: list[Stoch], fastk_period: int, slowk_period: int, slowd_period: int) -> str:
+    def stoch_prompt(
+            self,
+            stoch: Union[list[Stoch], ColumnsResult],
+            fastk_period: int,
+            slowk_period: int,
+            slowd_period: int,
+            max_items: int = DEFAULT_DEPTH,
+    ) -> str:
         return self._object_list_prompt(
             [
                 f"## 近期 STOCH(fastk_period={fastk_period},slowk_period={slowk_period},slowd_period={slowd_period}) 技术指标",
                 "K,D"
             ],
             stoch,
-            lambda s: f"{s.k:.2f},{s.d:.2f}"
+            lambda s: f"{s.k:.2f},{s.d:.2f}",
+            max_items,
         )
 
     # stoch_rsi 提示词
     def stoch_rsi_prompt(
             self,
-            stoch_rsi: list[StochRSI],
+            stoch_rsi: Union[list[StochRSI], ColumnsResult],
             timeperiod: int,
             stoch_length: int,
             smooth_k: int,
             smooth_d: int,
+            max_items: int = DEFAULT_DEPTH,
     ) -> str:
         return self._object_list_prompt(
             [
@@ -90,66 +203,87 @@ class IndicatorsPrompt:
                 "K,D"
             ],
             stoch_rsi,
-            lambda s: f"{s.k:.2f},{s.d:.2f}"
+            lambda s: f"{s.k:.2f},{s.d:.2f}",
+            max_items,
         )
 
     # macd 提示词
-    def macd_prompt(self, macd: list[MACD], fast_period: int, slow_period: int, signal_period: int) -> str:
+    def macd_prompt(
+            self,
+            macd: Union[list[MACD], ColumnsResult],
+            fast_period: int,
+            slow_period: int,
+            signal_period: int,
+            max_items: int = DEFAULT_DEPTH,
+    ) -> str:
         return self._object_list_prompt(
             [
                 f"## 近期 MACD(fast_period={fast_period},slow_period={slow_period},signal_period={signal_period}) 技术指标",
                 "MACD,Signal,Hist"
             ],
             macd,
-            lambda s: f"{s.macd:.2f},{s.signal:.2f},{s.hist:.2f}"
+            lambda s: f"{s.macd:.2f},{s.signal:.2f},{s.hist:.2f}",
+            max_items,
+            DELTA,
         )
 
     # adx 提示词
-    def adx_prompt(self, adx: list[Optional[float]], timeperiod: int) -> str:
-        return self._float_list_prompt([f"## 近期 ADX(timeperiod={timeperiod}) 技术指标"], adx)
+    def adx_prompt(self, adx: FloatResult, timeperiod: int, max_items: int = DEFAULT_DEPTH) -> str:
+        return self._float_list_prompt([f"## 近期 ADX(timeperiod={timeperiod}) 技术指标"], adx, max_items)
 
     # williams_r 提示词
-    def williams_r_prompt(self, williams_r: list[Optional[float]], timeperiod: int) -> str:
-        return self._float_list_prompt([f"## 近期 Williams %R(timeperiod={timeperiod}) 技术指标"], williams_r)
+    def williams_r_prompt(self, williams_r: FloatResult, timeperiod: int, max_items: int = DEFAULT_DEPTH) -> str:
+        return self._float_list_prompt(
+            [f"## 近期 Williams %R(timeperiod={timeperiod}) 技术指标"], williams_r, max_items)
 
     # cci 提示词
-    def cci_prompt(self, cci: list[Optional[float]], timeperiod: int) -> str:
-        return self._float_list_prompt([f"## 近期 CCI(timeperiod={timeperiod}) 技术指标"], cci)
+    def cci_prompt(self, cci: FloatResult, timeperiod: int, max_items: int = DEFAULT_DEPTH) -> str:
+        return self._float_list_prompt([f"## 近期 CCI(timeperiod={timeperiod}) 技术指标"], cci, max_items)
 
     # atr 提示词
-    def atr_prompt(self, atr: list[Optional[float]], timeperiod: int) -> str:
-        return self._float_list_prompt([f"## 近期 ATR(timeperiod={timeperiod}) 技术指标"], atr)
+    def atr_prompt(self, atr: FloatResult, timeperiod: int, max_items: int = DEFAULT_DEPTH) -> str:
+        return self._float_list_prompt([f"## 近期 ATR(timeperiod={timeperiod}) 技术指标"], atr, max_items, DELTA)
 
     # highs_lows 提示词
-    def highs_lows_prompt(self, highs_lows: list[HighsLows], timeperiod: int) -> str:
+    def highs_lows_prompt(
+            self,
+            highs_lows: Union[list[HighsLows], ColumnsResult],
+            timeperiod: int,
+            max_items: int = DEFAULT_DEPTH,
+    ) -> str:
         return self._object_list_prompt(
             [
                 f"## 近期 Highs/Lows(timeperiod={timeperiod}) 技术指标",
                 "High,Low"
             ],
             highs_lows,
-            lambda s: f"{s.high:.2f},{s.low:.2f}"
+            lambda s: f"{s.high:.2f},{s.low:.2f}",
+            max_items,
+            LEVEL,
         )
 
     # ultimate_oscillator 提示词
-    def ultimate_oscillator_prompt(self, ultimate_oscillator: list[Optional[float]]) -> str:
-        return self._float_list_prompt([f"## 近期 UltimateOscillator 技术指标"], ultimate_oscillator)
+    def ultimate_oscillator_prompt(self, ultimate_oscillator: FloatResult, max_items: int = DEFAULT_DEPTH) -> str:
+        return self._float_list_prompt([f"## 近期 UltimateOscillator 技术指标"], ultimate_oscillator, max_items)
 
     # roc 提示词
-    def roc_prompt(self, roc: list[Optional[float]], timeperiod: int) -> str:
-        return self._float_list_prompt([f"## 近期 ROC(timeperiod={timeperiod}) 技术指标"], roc)
+    def roc_prompt(self, roc: FloatResult, timeperiod: int, max_items: int = DEFAULT_DEPTH) -> str:
+        return self._float_list_prompt([f"## 近期 ROC(timeperiod={timeperiod}) 技术指标"], roc, max_items)
 
     # bull_bear_power 提示词
-    def bull_bear_power_prompt(self, bull_bear_power: list[Optional[float]], timeperiod: int) -> str:
-        return self._float_list_prompt([f"## 近期 Bull/Bear Power(timeperiod={timeperiod}) 技术指标"], bull_bear_power)
+    def bull_bear_power_prompt(
+            self, bull_bear_power: FloatResult, timeperiod: int, max_items: int = DEFAULT_DEPTH) -> str:
+        return self._float_list_prompt(
+            [f"## 近期 Bull/Bear Power(timeperiod={timeperiod}) 技术指标"], bull_bear_power, max_items, DELTA)
 
     # bollinger_bands 提示词
     def bollinger_bands_prompt(
             self,
-            bollinger_bands: list[BollingerBands],
+            bollinger_bands: Union[list[BollingerBands], ColumnsResult],
             timeperiod: int,
             nbdevup: int,
-            nbdevdn: int
+            nbdevdn: int,
+            max_items: int = DEFAULT_DEPTH,
     ) -> str:
         return self._object_list_prompt(
             [
@@ -157,127 +291,166 @@ class IndicatorsPrompt:
                 "Upper Band,Middle Band,Lower Band"
             ],
             bollinger_bands,
-            lambda s: f"{s.upper_band:.2f},{s.middle_band:.2f},{s.lower_band:.2f}"
+            lambda s: f"{s.upper_band:.2f},{s.middle_band:.2f},{s.lower_band:.2f}",
+            max_items,
+            LEVEL,
         )
 
     # ma 提示词
-    def ma_prompt(self, ma: list[Optional[float]], timeperiod: int) -> str:
-        return self._float_list_prompt([f"## 近期 MA(timeperiod={timeperiod}) 技术指标"], ma)
+    def ma_prompt(self, ma: FloatResult, timeperiod: int, max_items: int = DEFAULT_DEPTH) -> str:
+        return self._float_list_prompt([f"## 近期 MA(timeperiod={timeperiod}) 技术指标"], ma, max_items, LEVEL)
 
     # k线提示词
     @staticmethod
-    def kline_prompt(kline_list: list[Kline]) -> str:
-        sorted_kline_list = sorted(kline_list, key=lambda k: k.timestamp, reverse=True)
+    def kline_prompt(kline_list: Union[KlineSeries, list[Kline]], max_items: int = DEFAULT_DEPTH) -> str:
+        series = KlineSeries.of(kline_list).sorted().tail(max_items)
         prompt_rows = ["## 近期 k 线数据", "Timestamp,Open,High,Low,Close,Volume"]
-        kline_rows = []
-        for kline in sorted_kline_list:
-            kline_rows.append(f"{kline.timestamp},{kline.open},{kline.high},{kline.low},{kline.close},{kline.volume}")
-            if len(kline_rows) >= 60:
-                break
-        if len(kline_rows) == 0:
+        if len(series) == 0:
             prompt_rows.append("N/A")
         else:
-            for i in range(len(kline_rows)):
-                prompt_rows.append(kline_rows[i])
+            # 按行交错各列的值，用同一个格式串一次格式化；%r 与 str(float) 输出相同
+            values = np.empty((len(series), 6), dtype=object)
+            values[:, 0] = series.timestamp[::-1].tolist()
+            for i, column in enumerate((series.open, series.high, series.low, series.close, series.volume), 1):
+                values[:, i] = column[::-1].tolist()
+            prompt_rows.append(_kline_format(len(series)) % tuple(values.ravel().tolist()))
             prompt_rows.append("k 线数据是从上到下排列，上边的是最新数据。")
         return '\n'.join(prompt_rows)
 
+    # 紧凑编码的k线提示词：价格逐根差分编码为以最新收盘价的固定比例为单位的整数，时间戳只给出最新时间和周期
+    def compact_kline_prompt(self, kline_list: Union[KlineSeries, list[Kline]], max_items: int = DEFAULT_DEPTH) -> str:
+        series = KlineSeries.of(kline_list).sorted()
+        anchor = float(series.close[-1]) if len(series) > 0 else math.nan
+        # 多取一根，用于计算最早一根k线的跳空
+        window = series.tail(max_items + 1)
+        series = series.tail(max_items)
+        if len(series) == 0 or not math.isfinite(anchor) or anchor == 0:
+            return self.kline_prompt(series, max_items)
+
+        prompt_rows = ["## 近期 k 线数据"]
+        description = f"基准价 P={anchor:.{self.digits + 2}g}（最新收盘价），最新k线时间戳 {int(series.timestamp[-1])}"
+        if len(series) >= 2:
+            description += f"，相邻k线间隔 {int(series.timestamp[-1] - series.timestamp[-2]) // 1000} 秒"
+        prompt_rows.append(description)
+        open_, high, low, close = series.open, series.high, series.low, series.close
+        # 整数单位与相对 P 的价位保持相同的精度，整数比小数少用 token
+        decimals = self._decimals((np.vstack((open_, high, low, close)) / anchor - 1) * 100)
+        prompt_rows.append(
+            f"Gap 为开盘价相对上一根k线收盘价的跳空，Body 为 Close - Open，Upper、Lower 为上、下影线长度，"
+            f"单位为 P 的 {10.0 ** -decimals:.{decimals}f}%；"
+            f"最新k线的 Close 为 P，Open = Close - Body，上一根k线的 Close = Open - Gap")
+        prompt_rows.append("Gap,Body,Upper,Lower,Volume")
+        # 没有更早的k线时，最早一根的跳空为 0
+        previous = window.close[:-1] if len(window) > len(series) else np.concatenate(([open_[0]], close[:-1]))
+        top, bottom = np.maximum(open_, close), np.minimum(open_, close)
+        deltas = np.vstack((open_ - previous, close - open_, high - top, bottom - low))[:, ::-1]
+        units = np.rint(deltas / anchor * 100 * 10 ** decimals).astype(np.int64)
+        volume = series.volume[::-1]
+        row = ",".join(["%d"] * 4 + [f"%.{_significant_decimals(volume, self.digits)}f"])
+        values = np.vstack((units, volume)).T.ravel().tolist()
+        prompt_rows.append("\n".join([row] * len(series)) % tuple(values))
+        prompt_rows.append("k 线数据是从上到下排列，上边的是最新数据。")
+        return '\n'.join(prompt_rows)
+
     # 格式化提示词
-    def format_prompt(self, prompt: str, kline_list: list[Kline]) -> str:
-        indicators_kline_list: list[Kline] = []
-        for item in kline_list:
-            indicators_kline_list.append(Kline(
-                timestamp=item.timestamp,
-                open=item.open,
-                high=item.high,
-                low=item.low,
-                close=item.close,
-                volume=item.volume,
-            ))
-
-        indicators = Indicators(indicators_kline_list)
-
-        if "{{kline}}" in prompt:
-            prompt = prompt.replace("{{kline}}", self.kline_prompt(kline_list))
-        if "{{rsi}}" in prompt:
-            prompt = prompt.replace("{{rsi}}", self.rsi_prompt(indicators.rsi(14), 14))
-        if "{{stoch}}" in prompt:
-            prompt = prompt.replace("{{stoch}}", self.stoch_prompt(
-                indicators.stoch(fastk_period=9, slowk_period=1, slowd_period=6),
-                9, 1, 6))
-        if "{{stoch_rsi}}" in prompt:
-            prompt = prompt.replace("{{stoch_rsi}}", self.stoch_rsi_prompt(
-                indicators.stoch_rsi(14, 5, 3, 3),
-                14, 5, 3, 3
-            ))
-        if "{{macd}}" in prompt:
-            prompt = prompt.replace("{{macd}}", self.macd_prompt(
-                indicators.macd(12, 26, 9),
-                12, 26, 9
-            ))
-        if "{{adx}}" in prompt:
-            prompt = prompt.replace("{{adx}}", self.adx_prompt(indicators.adx(14), 14))
-        if "{{williams_r}}" in prompt:
-            prompt = prompt.replace("{{williams_r}}", self.williams_r_prompt(indicators.williams_r(14), 14))
-        if "{{cci}}" in prompt:
-            prompt = prompt.replace("{{cci}}", self.cci_prompt(indicators.cci(14), 14))
-        if "{{atr}}" in prompt:
-            prompt = prompt.replace("{{atr}}", self.atr_prompt(indicators.atr(14), 14))
-        if "{{highs_lows}}" in prompt:
-            prompt = prompt.replace("{{highs_lows}}", self.highs_lows_prompt(indicators.highs_lows(14), 14))
-        if "{{ultimate_oscillator}}" in prompt:
-            prompt = prompt.replace(
-                "{{ultimate_oscillator}}",
-                self.ultimate_oscillator_prompt(indicators.ultimate_oscillator()))
-        if "{{roc}}" in prompt:
-            prompt = prompt.replace("{{roc}}", self.roc_prompt(indicators.roc(9), 9))
-        if "{{bull_bear_power}}" in prompt:
-            prompt = prompt.replace(
-                "{{bull_bear_power}}",
-                self.bull_bear_power_prompt(indicators.bull_bear_power(13), 13))
-        if "{{bollinger_bands}}" in prompt:
-            prompt = prompt.replace("{{bollinger_bands}}", self.bollinger_bands_prompt(
-                indicators.bollinger_bands(20, 2, 2),
-                20, 2, 2))
-        if "{{ma5}}" in prompt:
-            prompt = prompt.replace("{{ma5}}", self.ma_prompt(indicators.ma(5), 5))
-        if "{{ma10}}" in prompt:
-            prompt = prompt.replace("{{ma10}}", self.ma_prompt(indicators.ma(10), 10))
-        if "{{ma20}}" in prompt:
-            prompt = prompt.replace("{{ma20}}", self.ma_prompt(indicators.ma(20), 20))
-        if "{{ma50}}" in prompt:
-            prompt = prompt.replace("{{ma50}}", self.ma_prompt(indicators.ma(50), 50))
-        if "{{ma100}}" in prompt:
-            prompt = prompt.replace("{{ma100}}", self.ma_prompt(indicators.ma(100), 100))
-        if "{{ma200}}" in prompt:
-            prompt = prompt.replace("{{ma200}}", self.ma_prompt(indicators.ma(200), 200))
-
-        return prompt
+    def format_prompt(self, prompt: str, kline_list: Union[Indicators, KlineSeries, list[Kline]]) -> str:
+        # 同一组k线复用同一个指标实例，方向分析与止盈止损分析共享已计算的指标
+        indicators = Indicators.of(kline_list)
+        return _compile(prompt).render(self, indicators)
 
     # 全部技术指标提示词
-    def all_indicators_prompt(self, kline_list: list[Kline]) -> str:
-        prompt = [
-            "# 技术指标",
-            "{{kline}}\n",
-            "{{rsi}}\n",
-            "{{stoch}}\n",
-            "{{stoch_rsi}}\n",
-            "{{macd}}\n",
-            "{{adx}}\n",
-            "{{williams_r}}\n",
-            "{{cci}}\n",
-            "{{atr}}\n",
-            "{{highs_lows}}\n",
-            "{{ultimate_oscillator}}\n",
-            "{{roc}}\n",
-            "{{bull_bear_power}}\n",
-            "{{bollinger_bands}}\n",
-            "{{ma5}}\n",
-            "{{ma10}}\n",
-            "{{ma20}}\n",
-            "{{ma50}}\n",
-            "{{ma100}}\n",
-            "{{ma200}}\n",
-            "技术指标是从上到下排列，从左到右排列；上下排列的上边的是最新数据，左右排列的左边的是最新数据。"
-        ]
-        return self.format_prompt('\n'.join(prompt), kline_list)
+    def all_indicators_prompt(self, kline_list: Union[Indicators, KlineSeries, list[Kline]]) -> str:
+        return self.format_prompt(ALL_INDICATORS_TEMPLATE, kline_list)
+
+
+# 提示词中的指标占位符 -> 生成该段提示词的函数 f(提示词, 指标, 展示条数)
+SECTIONS: dict[str, Callable[[IndicatorsPrompt, Indicators, int], str]] = {
+    "kline": lambda p, ind, n: p.compact_kline_prompt(ind.series, n) if p.compact else p.kline_prompt(ind.series, n),
+    "rsi": lambda p, ind, n: p.rsi_prompt(ind.rsi(14, raw=True), 14, n),
+    "stoch": lambda p, ind, n: p.stoch_prompt(
+        ind.stoch(fastk_period=9, slowk_period=1, slowd_period=6, raw=True), 9, 1, 6, n),
+    "stoch_rsi": lambda p, ind, n: p.stoch_rsi_prompt(ind.stoch_rsi(14, 5, 3, 3, raw=True), 14, 5, 3, 3, n),
+    "macd": lambda p, ind, n: p.macd_prompt(ind.macd(12, 26, 9, raw=True), 12, 26, 9, n),
+    "adx": lambda p, ind, n: p.adx_prompt(ind.adx(14, raw=True), 14, n),
+    "williams_r": lambda p, ind, n: p.williams_r_prompt(ind.williams_r(14, raw=True), 14, n),
+    "cci": lambda p, ind, n: p.cci_prompt(ind.cci(14, raw=True), 14, n),
+    "atr": lambda p, ind, n: p.atr_prompt(ind.atr(14, raw=True), 14, n),
+    "highs_lows": lambda p, ind, n: p.highs_lows_prompt(ind.highs_lows(14, raw=True), 14, n),
+    "ultimate_oscillator": lambda p, ind, n: p.ultimate_oscillator_prompt(ind.ultimate_oscillator(raw=True), n),
+    "roc": lambda p, ind, n: p.roc_prompt(ind.roc(9, raw=True), 9, n),
+    "bull_bear_power": lambda p, ind, n: p.bull_bear_power_prompt(ind.bull_bear_power(13, raw=True), 13, n),
+    "bollinger_bands": lambda p, ind, n: p.bollinger_bands_prompt(
+        ind.bollinger_bands(20, 2, 2, raw=True), 20, 2, 2, n),
+    "ma5": lambda p, ind, n: p.ma_prompt(ind.ma(5, raw=True), 5, n),
+    "ma10": lambda p, ind, n: p.ma_prompt(ind.ma(10, raw=True), 10, n),
+    "ma20": lambda p, ind, n: p.ma_prompt(ind.ma(20, raw=True), 20, n),
+    "ma50": lambda p, ind, n: p.ma_prompt(ind.ma(50, raw=True), 50, n),
+    "ma100": lambda p, ind, n: p.ma_prompt(ind.ma(100, raw=True), 100, n),
+    "ma200": lambda p, ind, n: p.ma_prompt(ind.ma(200, raw=True), 200, n),
+}
+
+_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+ALL_INDICATORS_TEMPLATE = "\n".join([
+    "# 技术指标",
+    *[f"{{{{{name}}}}}\n" for name in SECTIONS],
+    "技术指标是从上到下排列，从左到右排列；上下排列的上边的是最新数据，左右排列的左边的是最新数据。"
+])
+
+
+class PromptTemplate:
+    """
+    预编译的提示词模板：模板只解析一次，{{指标}} 占位符编译为 %(指标)s，其余文本原样保留（包括未知的占位符）。
+    渲染时只计算模板中引用到的指标，再用一次 % 格式化生成整个提示词。
+    """
+    __slots__ = ("format", "names")
+
+    def __init__(self, template: str):
+        parts = _PLACEHOLDER.split(template)
+        # split 结果为 [文本, 占位符, 文本, 占位符, ..., 文本]
+        names = []
+        format_parts = []
+        for i, part in enumerate(parts):
+            if i % 2 == 1 and part in SECTIONS:
+                if part not in names:
+                    names.append(part)
+                format_parts.append(f"%({part})s")
+            else:
+                text = part if i % 2 == 0 else f"{{{{{part}}}}}"
+                format_parts.append(text.replace("%", "%%"))
+        self.format = "".join(format_parts)
+        self.names = tuple(names)
+
+    def render(self, prompt: IndicatorsPrompt, indicators: Indicators) -> str:
+        return self.format % self.render_sections(prompt, indicators)
+
+    # 分别生成模板引用的每段指标提示词
+    def render_sections(self, prompt: IndicatorsPrompt, indicators: Indicators) -> dict[str, str]:
+        prompt = prompt.bind(indicators)
+        return {name: SECTIONS[name](prompt, indicators, prompt.max_items(name)) for name in self.names}
+
+
+@lru_cache(maxsize=128)
+def _compile(template: str) -> PromptTemplate:
+    return PromptTemplate(template)
+
+
+# count 行、每行 per_row 个保留 decimals 位小数的数值的格式串，行内用逗号、行间用换行分隔
+@lru_cache(maxsize=256)
+def _number_format(per_row: int, count: int, decimals: int = 2) -> str:
+    return "\n".join([",".join([f"%.{decimals}f"] * per_row)] * count)
+
+
+# 按最大绝对值保留 digits 位有效数字需要的小数位数（0~8）
+def _significant_decimals(values: np.ndarray, digits: int) -> int:
+    finite = np.abs(values[np.isfinite(values)])
+    peak = float(finite.max()) if finite.size > 0 else 0.0
+    if peak == 0:
+        return 0
+    return min(max(digits - 1 - math.floor(math.log10(peak)), 0), 8)
+
+
+# count 根k线的格式串
+@lru_cache(maxsize=64)
+def _kline_format(count: int) -> str:
+    return "\n".join(["%d,%r,%r,%r,%r,%r"] * count)
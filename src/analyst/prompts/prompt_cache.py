@@ -0,0 +1,75 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from src.core import SingleFlight
+
+from ..indicators import KlineSeries
+
+
+class PromptCache:
+    """
+    有界的 LRU 提示词缓存，key 为 (模板, 编码选项, k线内容指纹)。
+
+    - 指纹基于整个k线窗口的内容（包括未收盘的最新一根），k线有任何变化都会生成新的提示词。
+    - 同一个 key 的并发未命中合并为一次构建（SingleFlight）。
+    - 方向分析与止盈止损分析共享同一个实例，同一组k线只构建一次提示词。
+    """
+
+    def __init__(self, maxsize: int = 256):
+        if maxsize <= 0:
+            raise ValueError("maxsize 值不能小于等于 0")
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, str] = OrderedDict()
+        self._flight = SingleFlight()
+        self.lookups = 0  # 查询次数
+        self.hits = 0  # 直接命中缓存的次数
+        self.evictions = 0  # 因超出容量被淘汰的条目数
+
+    # k线内容指纹，缓存在 series.memo 上，同一个 KlineSeries 只计算一次
+    @staticmethod
+    def fingerprint(series: KlineSeries) -> bytes:
+        fingerprint = series.memo.get("fingerprint")
+        if fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for arr in (series.timestamp, series.open, series.high, series.low, series.close, series.volume):
+                digest.update(arr.tobytes())
+            fingerprint = digest.digest()
+            series.memo["fingerprint"] = fingerprint
+        return fingerprint
+
+    # 缓存 key，template 为提示词模板（决定包含哪些指标），options 为提示词的编码选项
+    @staticmethod
+    def key(series: KlineSeries, template: str, options: tuple = ()) -> tuple[str, str, tuple, bytes]:
+        return "indicators_prompt", template, options, PromptCache.fingerprint(series)
+
+    # 读取缓存，未命中时调用 build 构建并写入缓存
+    async def get_or_build(self, key: Hashable, build: Callable[[], Awaitable[str]]) -> str:
+        self.lookups += 1
+        prompt = self._entries.get(key)
+        if prompt is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return prompt
+
+        prompt = await self._flight.do(key, build)
+        self._entries[key] = prompt
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return prompt
+
+    # 缓存统计
+    def stats(self) -> dict[str, Any]:
+        builds = self._flight.calls
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "coalesced": self._flight.hits + self._flight.scope_hits,
+            "builds": builds,
+            "evictions": self.evictions,
+            "hit_ratio": 1 - builds / self.lookups if self.lookups > 0 else 0.0,
+        }
@@ -0,0 +1,62 @@
+import math
+import re
+from typing import Any, Optional, Union
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken 为可选依赖，未安装时按字符类别估算
+    tiktoken = None
+
+from ..indicators import Indicators, KlineSeries
+from ..indicators.models import Kline
+from .indicators_prompt import ALL_INDICATORS_TEMPLATE, IndicatorsPrompt, _compile
+
+# 估算用的字符类别：中日韩字符、数字串、单词、换行、其他符号（空格并入后面的 token）
+_TOKEN_PATTERN = re.compile(r"[　-〿一-鿿＀-￯]|\d+|[A-Za-z]+|\n+|[^\sA-Za-z\d]")
+
+
+class TokenCounter:
+    """
+    提示词 token 计数：安装了 tiktoken 时使用 encoding 精确计数，否则按字符类别估算
+    （中文每字 1 个、数字每 3 位 1 个、英文单词每 4 个字母 1 个、符号每个 1 个），估算值适合比较不同编码方式的相对大小。
+    """
+
+    def __init__(self, encoding: str = "o200k_base"):
+        self._encoding = tiktoken.get_encoding(encoding) if tiktoken is not None else None
+        self.name = f"tiktoken:{encoding}" if self._encoding is not None else "estimate"
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        tokens = 0
+        for match in _TOKEN_PATTERN.finditer(text):
+            part = match.group()
+            if part[0].isdigit():
+                tokens += math.ceil(len(part) / 3)
+            elif part[0].isascii() and part[0].isalpha():
+                tokens += math.ceil(len(part) / 4)
+            else:
+                tokens += 1
+        return tokens
+
+
+# 按段统计指标提示词的字符数和 token 数，用于调整展示条数、精度与编码方式
+def prompt_size(
+        indicators_prompt: IndicatorsPrompt,
+        kline_list: Union[Indicators, KlineSeries, list[Kline]],
+        template: str = ALL_INDICATORS_TEMPLATE,
+        counter: Optional[TokenCounter] = None,
+) -> dict[str, Any]:
+    counter = counter or TokenCounter()
+    indicators = Indicators.of(kline_list)
+    compiled = _compile(template)
+    sections = compiled.render_sections(indicators_prompt, indicators)
+    prompt = compiled.format % sections
+    return {
+        "tokenizer": counter.name,
+        "chars": len(prompt),
+        "tokens": counter.count(prompt),
+        "sections": {
+            name: {"chars": len(text), "tokens": counter.count(text)} for name, text in sections.items()
+        },
+    }
@@ -0,0 +1,129 @@
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Hashable, Iterator, Optional, TypeVar
+
+from src.core import SingleFlight
+
+from .indicators import KlineSeries
+from .prompts import PromptCache
+
+T = TypeVar("T")
+
+# 当前价格按相对宽度 0.1% 分档参与 key（止损止盈分析有开仓均价时使用开仓均价）
+PRICE_BUCKET = 0.001
+
+# 为 True 时当前上下文（包括其中创建的 task）不读写结果缓存
+_bypass: ContextVar[bool] = ContextVar("llm_result_cache_bypass", default=False)
+
+
+class LlmResultCache:
+    """
+    以k线周期为作用域的大模型分析结果缓存（默认关闭）。
+
+    - key 为 (分析类型, 服务商, api_key 摘要, 模型, 提示词编码选项, 杠杆等参数, 当前价格分档, 已收盘k线的内容指纹)；
+      未收盘的最新一根k线不参与 key，同一根k线周期内同一调用方相同参数、相近价格的分析直接复用结果。
+    - 条目在最新一根k线收盘时过期，下一根k线开始后重新分析。
+    - 同一个 key 的并发未命中合并为一次大模型调用（SingleFlight）。
+    - 对比分析需要多次独立采样，在 bypass() 作用域内调用时既不读取也不写入缓存。
+    """
+
+    def __init__(self, enabled: bool = False, maxsize: int = 1024):
+        if maxsize <= 0:
+            raise ValueError("maxsize 值不能小于等于 0")
+        self.enabled = enabled
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, tuple[int, Any]] = OrderedDict()
+        self._flight = SingleFlight()
+        self.lookups = 0  # 查询次数（不包括 bypass 与关闭时的调用）
+        self.hits = 0  # 直接命中缓存的次数
+        self.expired = 0  # 命中已过期条目的次数
+        self.bypassed = 0  # 绕过缓存的调用次数
+
+    # 作用域内的分析绕过缓存（例如对比分析的多次采样）
+    @staticmethod
+    @contextmanager
+    def bypass() -> Iterator[None]:
+        token = _bypass.set(True)
+        try:
+            yield
+        finally:
+            _bypass.reset(token)
+
+    # 调用方：(服务商 base_url, api_key 摘要)，不同服务商或不同 api_key 的调用方不共享结果
+    @staticmethod
+    def caller(async_openai: Any) -> tuple[str, str]:
+        return str(async_openai.base_url).rstrip("/"), hashlib.sha256(async_openai.api_key.encode()).hexdigest()
+
+    # 价格分档，同一档内的价格视为相同
+    @staticmethod
+    def price_bucket(price: float) -> float:
+        if not price > 0:
+            return price
+        return float(round(math.log(price) / math.log1p(PRICE_BUCKET)))
+
+    # k线周期作用域：(已收盘k线的内容指纹, 最新一根k线的收盘时间毫秒数)，k线少于 2 根时无法确定周期，返回 None
+    @staticmethod
+    def candle_scope(series: KlineSeries) -> Optional[tuple[bytes, int]]:
+        if len(series) < 2:
+            return None
+        timestamp = series.timestamp
+        closes_at = int(timestamp[-1]) + int(timestamp[-1] - timestamp[-2])
+        return PromptCache.fingerprint(series.take(slice(0, -1))), closes_at
+
+    # 读取缓存，未命中时调用 fn 并缓存结果到最新一根k线收盘
+    async def get_or_call(self, key: tuple, series: KlineSeries, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled or _bypass.get():
+            self.bypassed += 1
+            return await fn()
+        scope = self.candle_scope(series)
+        now = int(time.time() * 1000)
+        if scope is None or scope[1] <= now:
+            # k线已经过期（例如数据源滞后），不缓存
+            self.bypassed += 1
+            return await fn()
+
+        key = (*key, scope[0])
+        self.lookups += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+            self.expired += 1
+
+        result = await self._flight.do(key, fn)
+        self._entries[key] = (scope[1], result)
+        self._entries.move_to_end(key)
+        self._evict(now)
+        return result
+
+    # 先清除已过期的条目，仍超出容量时淘汰最久未使用的条目
+    def _evict(self, now: int):
+        if len(self._entries) <= self.maxsize:
+            return
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    # 缓存统计
+    def stats(self) -> dict[str, Any]:
+        calls = self._flight.calls
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "coalesced": self._flight.hits + self._flight.scope_hits,
+            "calls": calls,
+            "expired": self.expired,
+            "bypassed": self.bypassed,
+            "hit_ratio": 1 - calls / self.lookups if self.lookups > 0 else 0.0,
+        }
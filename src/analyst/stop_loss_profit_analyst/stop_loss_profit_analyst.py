@@ -1,17 +1,31 @@
-from typing import Literal, Optional
+from typing import Literal, Optional, Union
 
 from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionSystemMessageParam, ChatCompletionUserMessageParam
 
+from src.core import CpuExecutor, LlmScheduler
+
 from .model import StopLossProfit, TimeFramesStopLossProfit
-from ..prompts import IndicatorsPrompt
-from ..utils import safe_json_parse
-from ..indicators import Kline
+from ..prompts import IndicatorsPrompt, PromptCache
+from ..result_cache import LlmResultCache
+from ..utils import safe_json_parse, build_indicators_prompt, chat_completion
+from ..indicators import Kline, KlineSeries
 
 
 class StopLossProfitAnalyst:
-    def __init__(self):
-        self._indicators_prompt = IndicatorsPrompt()
+    def __init__(
+            self,
+            executor: Optional[CpuExecutor] = None,
+            prompt_cache: Optional[PromptCache] = None,
+            result_cache: Optional[LlmResultCache] = None,
+            scheduler: Optional[LlmScheduler] = None,
+            indicators_prompt: Optional[IndicatorsPrompt] = None,
+    ):
+        self._indicators_prompt = indicators_prompt or IndicatorsPrompt()
+        self._executor = executor
+        self._prompt_cache = prompt_cache
+        self._result_cache = result_cache
+        self._scheduler = scheduler
 
     # 响应格式提示词
     @staticmethod
@@ -53,10 +67,35 @@ class StopLossProfitAnalyst:
             confidence=res_json["confidence"],
         )
 
-    # 分析永续合约止损止盈价格
+    # 分析永续合约止损止盈价格，开启结果缓存时同一根k线周期内相同参数的分析复用结果
     async def analyse(
             self,
-            kline_list: list[Kline],
+            kline_list: Union[KlineSeries, list[Kline]],
+            direction: Literal['long', 'short'],
+            current_price: float,
+            async_openai: AsyncOpenAI,
+            openai_model: str,
+            *,
+            leverage=1,
+            entry_price: Optional[float] = None,
+    ) -> StopLossProfit:
+        if self._result_cache is None:
+            return await self._analyse(kline_list, direction, current_price, async_openai, openai_model,
+                                       leverage=leverage, entry_price=entry_price)
+        series = KlineSeries.of(kline_list).sorted()
+        # 没有开仓均价时止损止盈价格以当前价格为基准，当前价格（分档）参与 key
+        price = entry_price if entry_price is not None else LlmResultCache.price_bucket(current_price)
+        return await self._result_cache.get_or_call(
+            ("stop_loss_profit", *LlmResultCache.caller(async_openai), openai_model, self._indicators_prompt.options,
+             leverage, direction, entry_price is not None, price),
+            series,
+            lambda: self._analyse(series, direction, current_price, async_openai, openai_model,
+                                  leverage=leverage, entry_price=entry_price),
+        )
+
+    async def _analyse(
+            self,
+            kline_list: Union[KlineSeries, list[Kline]],
             direction: Literal['long', 'short'],
             current_price: float,
             async_openai: AsyncOpenAI,
@@ -65,7 +104,12 @@ class StopLossProfitAnalyst:
             leverage=1,
             entry_price: Optional[float] = None,
     ) -> StopLossProfit:
-        response = await async_openai.chat.completions.create(
+        indicators_prompt = await build_indicators_prompt(
+            self._indicators_prompt, kline_list, self._executor, self._prompt_cache)
+        response = await chat_completion(
+            self._scheduler,
+            async_openai,
+            LlmScheduler.PRIORITY_ANALYSE,
             model=openai_model,
             messages=[
                 ChatCompletionSystemMessageParam(content=f"""
@@ -85,7 +129,7 @@ class StopLossProfitAnalyst:
                 # 行情数据
                 当前价格：{current_price}
 
-                {self._indicators_prompt.all_indicators_prompt(kline_list)}
+                {indicators_prompt}
                 """, role="user"),
             ],
         )
@@ -111,7 +155,10 @@ class StopLossProfitAnalyst:
             user_prompt_list.append(f"## 分析 {stop_loss_take_profit.timeframe} 技术指标止盈/止损结果")
             user_prompt_list.append(f"{stop_loss_take_profit}\n")
         user_prompt = "\n".join(user_prompt_list)
-        response = await async_openai.chat.completions.create(
+        response = await chat_completion(
+            self._scheduler,
+            async_openai,
+            LlmScheduler.PRIORITY_SUMMARIZE,
             model=openai_model,
             messages=[
                 ChatCompletionSystemMessageParam(content=f"""
@@ -1,4 +1,21 @@
+import asyncio
 import json
+import re
+from typing import Any, Callable, Optional, TypeVar, Union
+
+from openai import AsyncOpenAI, BadRequestError
+from openai.types.chat import ChatCompletion
+
+from src.core import CpuExecutor, LlmScheduler
+
+from .indicators import Kline, KlineSeries
+from .prompts import IndicatorsPrompt, PromptCache
+from .prompts.indicators_prompt import ALL_INDICATORS_TEMPLATE
+
+T = TypeVar("T")
+
+# 服务商拒绝 n 参数时的错误信息，例如 "n is not supported"、"Invalid value for 'n'"
+_N_PARAM_ERROR = re.compile(r"\bn\b|\bnum_choices\b|multiple choices", re.IGNORECASE)
 
 
 # 安全解析json
@@ -11,3 +28,75 @@ def safe_json_parse(json_str: str) -> dict:
     else:
         raise ValueError(f"无法解析JSON字符串")
     return signal_data
+
+
+# 执行 CPU 密集的同步函数，有执行器时放到执行器中，避免阻塞事件循环
+async def run_cpu(executor: Optional[CpuExecutor], fn: Callable[..., T], *args: Any) -> T:
+    if executor is None:
+        return fn(*args)
+    return await executor.run(fn, *args)
+
+
+# 构建全部技术指标提示词，有缓存时同一组k线复用已构建的提示词
+async def build_indicators_prompt(
+        indicators_prompt: IndicatorsPrompt,
+        kline_list: Union[KlineSeries, list[Kline]],
+        executor: Optional[CpuExecutor],
+        cache: Optional[PromptCache],
+) -> str:
+    if cache is None:
+        return await run_cpu(executor, indicators_prompt.all_indicators_prompt, kline_list)
+    series = KlineSeries.of(kline_list).sorted()
+    return await cache.get_or_build(
+        PromptCache.key(series, ALL_INDICATORS_TEMPLATE, indicators_prompt.options),
+        lambda: run_cpu(executor, indicators_prompt.all_indicators_prompt, series),
+    )
+
+
+# 调用 chat completion，有调度器时先按服务商排队获取调用名额
+async def chat_completion(
+        scheduler: Optional[LlmScheduler],
+        async_openai: AsyncOpenAI,
+        priority: int,
+        **kwargs: Any,
+) -> ChatCompletion:
+    if scheduler is None:
+        return await async_openai.chat.completions.create(**kwargs)
+    async with scheduler.slot(str(async_openai.base_url), async_openai.api_key, priority):
+        return await async_openai.chat.completions.create(**kwargs)
+
+
+# 400 错误是否由 n 参数引起（模型名称错误、上下文过长等其他参数错误不是）
+def _is_n_param_error(e: BadRequestError) -> bool:
+    return getattr(e, "param", None) == "n" or _N_PARAM_ERROR.search(e.message or "") is not None
+
+
+# 一次请求获取 n 个采样的回复内容；服务商的模型拒绝 n 参数或返回的采样不足时，在调度器中记住该模型，并发单次调用补齐
+async def chat_completion_samples(
+        scheduler: Optional[LlmScheduler],
+        async_openai: AsyncOpenAI,
+        priority: int,
+        n: int,
+        **kwargs: Any,
+) -> list[str]:
+    base_url = str(async_openai.base_url)
+    model = kwargs.get("model", "")
+    contents: list[str] = []
+    if n > 1 and (scheduler is None or scheduler.supports_n(base_url, model)):
+        try:
+            response = await chat_completion(scheduler, async_openai, priority, n=n, **kwargs)
+        except BadRequestError as e:
+            if not _is_n_param_error(e):
+                raise
+            if scheduler is not None:
+                scheduler.mark_single_choice(base_url, model)
+        else:
+            choices = sorted(response.choices, key=lambda choice: choice.index)[:n]
+            contents = [choice.message.content for choice in choices]
+            if len(contents) < n and scheduler is not None:
+                scheduler.mark_single_choice(base_url, model)
+
+    responses = await asyncio.gather(*[
+        chat_completion(scheduler, async_openai, priority, **kwargs) for _ in range(n - len(contents))])
+    contents.extend(response.choices[0].message.content for response in responses)
+    return contents
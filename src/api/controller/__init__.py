@@ -1,2 +1,5 @@
 from .indicators_controller import indicators_controller
+from .indicators_v2_controller import indicators_v2_controller
 from .analyse_controller import analyse_controller
+from .metrics_controller import metrics_controller
+from .job_controller import job_controller
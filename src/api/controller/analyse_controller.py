@@ -1,9 +1,11 @@
 from typing import Literal, Optional
 
-import openai
 from fastapi import APIRouter, Path, Query, Header
+from fastapi.responses import StreamingResponse
 
 from src.analyst import Direction, StopLossProfit
+from src.api import sse
+from src.core import OpenaiClientPool
 from src.di import di
 from src.service.analyse_okx_service import AnalyseByOkxDirectionService, AnalyseByOkxStopLossProfitService
 
@@ -23,29 +25,84 @@ async def analyse_okx(
             ge=1,
             le=10,
             description="对比次数，多次对比结果选择概率比较大的信号，推荐填入：3,5,7，这种奇数"),
+        quorum: Optional[float] = Query(
+            default=None,
+            gt=0,
+            le=1,
+            description="信心加权的提前结束比例，例如 0.5：按信心加权（high 1 票、medium 2/3 票、low 1/3 票）"
+                        "领先信号的票数达到 对比次数*quorum 时不再等待其余的对比；不填时只在多数结果已经确定时提前结束"),
+        batch: bool = Query(
+            default=False,
+            description="批量采样对比：每个k线周期只发送一次提示词，通过 n 参数一次取得 对比次数 个结果，"
+                        "提示词 token 约减少为 1/对比次数；服务商不支持 n 参数时自动改为并发单次调用"),
+        openai_api_key: str = Header(..., alias="OPENAI-API-KEY", description="兼容openai的apikey"),
+        openai_base_url: str = Header(..., alias="OPENAI-BASE-URL", description="兼容openai的api链接"),
+        openai_model: str = Header(..., alias="OPENAI-MODEL", description="兼容openai的模型"),
+):
+    # openai，复用同一服务商的客户端和连接
+    async with di.get(OpenaiClientPool).client(openai_base_url, openai_api_key) as async_openai:
+        # 分析
+        svc = di.get(AnalyseByOkxDirectionService)
+        return await svc.compare_analyses_by_symbol(
+            symbol,
+            timeframes.split(","),
+            async_openai,
+            openai_model,
+            leverage=leverage,
+            compare=compare,
+            quorum=quorum,
+            batch=batch,
+        )
+
+
+# 流式分析 okx 方向（SSE）
+@analyse_controller.get("/swap/okx/stream", summary="AI 分析 okx 永续合约多空信号（SSE 流式返回）")
+async def analyse_okx_stream(
+        symbol: str = Query(default="BTC/USDT:USDT", description="填入合约标识，例如：BTC/USDT:USDT"),
+        leverage: int = Query(default=1, description="杠杆倍数，低杠杆倍数信号会更大胆，高杠杆信号会更畏缩一些"),
+        timeframes: str = Query(
+            default="5m,15m,1h",
+            description="检查的k线周期，例如：1m,5m,15m,30m,1h,4h,1d，同时填入多个标识同时根据多个k线数据进行分析"),
+        compare: int = Query(
+            default=3,
+            ge=1,
+            le=10,
+            description="对比次数，多次对比结果选择概率比较大的信号，推荐填入：3,5,7，这种奇数"),
+        quorum: Optional[float] = Query(
+            default=None,
+            gt=0,
+            le=1,
+            description="信心加权的提前结束比例，与 /swap/okx 相同"),
+        batch: bool = Query(default=False, description="批量采样对比，与 /swap/okx 相同"),
         openai_api_key: str = Header(..., alias="OPENAI-API-KEY", description="兼容openai的apikey"),
         openai_base_url: str = Header(..., alias="OPENAI-BASE-URL", description="兼容openai的api链接"),
         openai_model: str = Header(..., alias="OPENAI-MODEL", description="兼容openai的模型"),
 ):
-    # openai
-    async_openai = openai.AsyncOpenAI(
-        api_key=openai_api_key,
-        base_url=openai_base_url,
-    )
+    """
+    事件依次为：
+    - timeframe：单周期分析结果（TimeFramesDirection，compare 为第几次对比），每个周期分析完成时立即返回
+    - vote：每次对比完成后的投票进度
+    - result：最终结论（Direction）；出错时为 error，内容与普通接口的错误响应相同
+    """
 
-    # 分析
-    svc = di.get(AnalyseByOkxDirectionService)
-    result = await svc.compare_analyses_by_symbol(
-        symbol,
-        timeframes.split(","),
-        async_openai,
-        openai_model,
-        leverage=leverage,
-        compare=compare,
-    )
+    async def run(emit: sse.Emit) -> Direction:
+        # openai，复用同一服务商的客户端和连接
+        async with di.get(OpenaiClientPool).client(openai_base_url, openai_api_key) as async_openai:
+            svc = di.get(AnalyseByOkxDirectionService)
+            return await svc.compare_analyses_by_symbol(
+                symbol,
+                timeframes.split(","),
+                async_openai,
+                openai_model,
+                leverage=leverage,
+                compare=compare,
+                quorum=quorum,
+                batch=batch,
+                on_result=lambda i, r: emit("timeframe", {**r.model_dump(), "compare": i}),
+                on_vote=lambda vote: emit("vote", vote.progress()),
+            )
 
-    await async_openai.close()
-    return result
+    return StreamingResponse(sse.event_stream(run), media_type=sse.MEDIA_TYPE, headers=sse.HEADERS)
 
 
 # 分析 okx 止损止盈价格
@@ -67,23 +124,58 @@ async def analyse_okx_stop_loss(
         openai_base_url: str = Header(..., alias="OPENAI-BASE-URL", description="兼容openai的api链接"),
         openai_model: str = Header(..., alias="OPENAI-MODEL", description="兼容openai的模型"),
 ):
-    # openai
-    async_openai = openai.AsyncOpenAI(
-        api_key=openai_api_key,
-        base_url=openai_base_url,
-    )
+    # openai，复用同一服务商的客户端和连接
+    async with di.get(OpenaiClientPool).client(openai_base_url, openai_api_key) as async_openai:
+        # 分析
+        svc = di.get(AnalyseByOkxStopLossProfitService)
+        return await svc.analyses_by_symbol(
+            symbol,
+            direction,
+            timeframes.split(","),
+            async_openai,
+            openai_model,
+            leverage=leverage,
+            entry_price=entry_price,
+        )
+
+
+# 流式分析 okx 止损止盈价格（SSE）
+@analyse_controller.get("/swap-stop-loss/okx/stream", summary="AI 分析 okx 永续合约止盈止损价格（SSE 流式返回）")
+async def analyse_okx_stop_loss_stream(
+        symbol: str = Query(default="BTC/USDT:USDT", description="填入合约标识，例如：BTC/USDT:USDT"),
+        leverage: int = Query(
+            default=1,
+            description="杠杆倍数，低杠杆倍数止盈/止损会更大胆，高杠杆止盈/止损会更畏缩一些"),
+        direction: Literal['long', 'short'] = Query(..., description="开仓方向, long: 做多；short：做空"),
+        timeframes: str = Query(
+            default="5m,15m,1h",
+            description="检查的k线周期，例如：1m,5m,15m,30m,1h,4h,1d，同时填入多个标识同时根据多个k线数据进行分析"),
+        entry_price: Optional[float] = Query(
+            default=None,
+            description="如果已经持仓请填入开仓均价，更好的判断持仓的止损价格"),
+        openai_api_key: str = Header(..., alias="OPENAI-API-KEY", description="兼容openai的apikey"),
+        openai_base_url: str = Header(..., alias="OPENAI-BASE-URL", description="兼容openai的api链接"),
+        openai_model: str = Header(..., alias="OPENAI-MODEL", description="兼容openai的模型"),
+):
+    """
+    事件依次为：
+    - timeframe：单周期止损止盈结果（TimeFramesStopLossProfit），每个周期分析完成时立即返回
+    - result：最终结论（StopLossProfit）；出错时为 error，内容与普通接口的错误响应相同
+    """
 
-    # 分析
-    svc = di.get(AnalyseByOkxStopLossProfitService)
-    result = await svc.analyses_by_symbol(
-        symbol,
-        direction,
-        timeframes.split(","),
-        async_openai,
-        openai_model,
-        leverage=leverage,
-        entry_price=entry_price,
-    )
+    async def run(emit: sse.Emit) -> StopLossProfit:
+        # openai，复用同一服务商的客户端和连接
+        async with di.get(OpenaiClientPool).client(openai_base_url, openai_api_key) as async_openai:
+            svc = di.get(AnalyseByOkxStopLossProfitService)
+            return await svc.analyses_by_symbol(
+                symbol,
+                direction,
+                timeframes.split(","),
+                async_openai,
+                openai_model,
+                leverage=leverage,
+                entry_price=entry_price,
+                on_result=lambda r: emit("timeframe", r),
+            )
 
-    await async_openai.close()
-    return result
+    return StreamingResponse(sse.event_stream(run), media_type=sse.MEDIA_TYPE, headers=sse.HEADERS)
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, UploadFile, File, Path, Body
+from typing import AsyncIterator, Optional
 
+from fastapi import APIRouter, UploadFile, File, Form, Query, Body, Request, Response
+from fastapi.responses import StreamingResponse
+
+from src.api.middlewares import exception_handler
+from src.core import CpuExecutor
 from src.di import di
-from src.obj import KlineDto, IndicatorsDto, CalculateIndicatorsRequest
-from src.service import IndicatorsService
+from src.obj import KlineDto, IndicatorsDto, CalculateIndicatorsRequest, BatchCalculateIndicatorsRequest, \
+    BatchIndicatorsDto, IndicatorsSelection, PromptSizeRequest, PromptSizeDto
+from src.service import IndicatorsService, kline_file
 
 indicators_controller = APIRouter()
 
@@ -10,4 +16,69 @@ indicators_controller = APIRouter()
 # 计算k线指标
 @indicators_controller.post("/calculate", response_model=IndicatorsDto, summary="计算k线指标")
 async def calculate_indicators(request: CalculateIndicatorsRequest = Body(...)):
-    return di.get(IndicatorsService).calculate_indicators(request)
+    # 指标计算和序列化是 CPU 密集的同步代码，放到执行器中避免阻塞事件循环
+    content = await di.get(CpuExecutor).run(IndicatorsService.calculate_indicators_json, request)
+    return Response(content=content, media_type="application/json")
+
+
+# 批量计算k线指标
+@indicators_controller.post("/calculate/batch", response_model=BatchIndicatorsDto, summary="批量计算k线指标")
+async def calculate_indicators_batch(request: BatchCalculateIndicatorsRequest = Body(...)):
+    content = await di.get(IndicatorsService).calculate_indicators_batch(request)
+    return Response(content=content, media_type="application/json")
+
+
+# 大序列计算k线指标：请求体为 NDJSON，每行一根k线 [timestamp, open, high, low, close, volume]，按时间升序；
+# 边读取边计算，按时间升序逐块返回 NDJSON，每行为一根k线的指标
+@indicators_controller.post("/calculate/stream", summary="大序列计算k线指标（NDJSON）")
+async def calculate_indicators_stream(
+        request: Request,
+        selection: str = Query(default="{}", description="指标选项 JSON，与 /calculate 的 is_*、last_n、fields 相同"),
+        chunk_size: int = Query(default=1000, ge=1, le=100_000, description="每次计算和输出的k线数量"),
+):
+    indicators_selection = IndicatorsSelection.model_validate_json(selection)
+    generator = di.get(IndicatorsService).calculate_indicators_stream(
+        request.stream(), indicators_selection, chunk_size)
+    # 第一块输出之前出错时返回普通的错误响应
+    first = await anext(generator, None)
+    return StreamingResponse(_ndjson_stream(first, generator), media_type="application/x-ndjson")
+
+
+# 已经开始输出后出错时，错误作为最后一行输出，内容与普通接口的错误响应相同
+async def _ndjson_stream(first: Optional[bytes], generator: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    if first is None:
+        return
+    try:
+        yield first
+        async for chunk in generator:
+            yield chunk
+    except Exception as exc:
+        response = await exception_handler(None, exc)
+        yield response.body + b"\n"
+    finally:
+        await generator.aclose()
+
+
+# 上传 CSV/Parquet k线文件计算指标，返回同格式的文件，按时间升序
+@indicators_controller.post("/calculate/file", summary="上传k线文件计算指标（CSV/Parquet）")
+async def calculate_indicators_file(
+        file: UploadFile = File(..., description="列：timestamp(毫秒或日期时间)、open、high、low、close、volume"),
+        selection: str = Form(default="{}", description="指标选项 JSON，与 /calculate 的 is_*、last_n、fields 相同"),
+        chunk_size: int = Form(default=10_000, ge=1, le=100_000, description="CSV 每次计算和输出的k线数量"),
+):
+    kind = kline_file.file_kind(file.filename, file.content_type)
+    indicators_selection = IndicatorsSelection.model_validate_json(selection)
+    service = di.get(IndicatorsService)
+    series = await service.read_kline_file(file.file, kind)
+    headers = {"Content-Disposition": f'attachment; filename="indicators.{kind}"'}
+    if kind == kline_file.PARQUET:
+        content = await service.calculate_indicators_parquet(series, indicators_selection)
+        return Response(content=content, media_type=kline_file.MEDIA_TYPES[kind], headers=headers)
+    generator = service.calculate_indicators_csv(series, indicators_selection, chunk_size)
+    return StreamingResponse(generator, media_type=kline_file.MEDIA_TYPES[kind], headers=headers)
+
+
+# 统计指标提示词的字符数和 token 数
+@indicators_controller.post("/prompt/size", response_model=PromptSizeDto, summary="统计指标提示词大小")
+async def prompt_size(request: PromptSizeRequest = Body(...)):
+    return await di.get(IndicatorsService).prompt_size(request)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Body, Header, Response
+
+from src.core import columnar
+from src.di import di
+from src.obj import CalculateIndicatorsRequest, IndicatorsColumnsDto
+from src.service import IndicatorsService
+
+indicators_v2_controller = APIRouter()
+
+
+# 计算k线指标（列式格式），根据 Accept 请求头返回 JSON、msgpack 或 Arrow IPC stream
+@indicators_v2_controller.post(
+    "/calculate",
+    response_model=IndicatorsColumnsDto,
+    summary="计算k线指标（列式格式）",
+    responses={200: {"content": {columnar.MSGPACK: {}, columnar.ARROW: {}}}},
+)
+async def calculate_indicators(
+        request: CalculateIndicatorsRequest = Body(...),
+        accept: str = Header(default=columnar.JSON),
+):
+    media_type = columnar.negotiate(accept)
+    content = await di.get(IndicatorsService).calculate_indicators_columns(request, media_type)
+    return Response(content=content, media_type=media_type)
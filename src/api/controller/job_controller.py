@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Body, Header, Path
+
+from src.di import di
+from src.obj import JobDto, DirectionJobRequest, StopLossProfitJobRequest
+from src.service.analyse_job_service import AnalyseJobService
+
+job_controller = APIRouter()
+
+
+# 提交 okx 方向分析任务
+@job_controller.post("/swap/okx", response_model=JobDto, status_code=202, summary="提交 AI 分析 okx 永续合约多空信号任务")
+async def submit_analyse_okx(
+        request: DirectionJobRequest = Body(...),
+        openai_api_key: str = Header(..., alias="OPENAI-API-KEY", description="兼容openai的apikey"),
+        openai_base_url: str = Header(..., alias="OPENAI-BASE-URL", description="兼容openai的api链接"),
+        openai_model: str = Header(..., alias="OPENAI-MODEL", description="兼容openai的模型"),
+):
+    return await di.get(AnalyseJobService).submit_direction(request, openai_base_url, openai_api_key, openai_model)
+
+
+# 提交 okx 止损止盈分析任务
+@job_controller.post("/swap-stop-loss/okx", response_model=JobDto, status_code=202,
+                     summary="提交 AI 分析 okx 永续合约止盈止损价格任务")
+async def submit_analyse_okx_stop_loss(
+        request: StopLossProfitJobRequest = Body(...),
+        openai_api_key: str = Header(..., alias="OPENAI-API-KEY", description="兼容openai的apikey"),
+        openai_base_url: str = Header(..., alias="OPENAI-BASE-URL", description="兼容openai的api链接"),
+        openai_model: str = Header(..., alias="OPENAI-MODEL", description="兼容openai的模型"),
+):
+    return await di.get(AnalyseJobService).submit_stop_loss_profit(
+        request, openai_base_url, openai_api_key, openai_model)
+
+
+# 查询任务，只能查询使用同一个 api_key 提交的任务
+@job_controller.get("/{job_id}", response_model=JobDto, summary="查询分析任务")
+async def get_job(
+        job_id: str = Path(..., description="任务 id"),
+        openai_api_key: str = Header(..., alias="OPENAI-API-KEY", description="提交任务时使用的apikey"),
+):
+    return await di.get(AnalyseJobService).get(job_id, openai_api_key)
+
+
+# 取消任务，只能取消使用同一个 api_key 提交的任务
+@job_controller.delete("/{job_id}", response_model=JobDto, summary="取消分析任务")
+async def cancel_job(
+        job_id: str = Path(..., description="任务 id"),
+        openai_api_key: str = Header(..., alias="OPENAI-API-KEY", description="提交任务时使用的apikey"),
+):
+    return await di.get(AnalyseJobService).cancel(job_id, openai_api_key)
@@ -0,0 +1,53 @@
+from fastapi import APIRouter
+
+from src.analyst import PromptCache, LlmResultCache
+from src.core import CpuExecutor, OpenaiClientPool, LlmScheduler
+from src.di import di
+from src.obj import ExchangeStatsDto, CpuExecutorStatsDto, PromptCacheStatsDto, LlmResultCacheStatsDto, \
+    OpenaiClientPoolStatsDto, LlmSchedulerStatsDto, JobStatsDto
+from src.service.analyse_job_service import AnalyseJobService
+from src.service.okx_market_service import OkxMarketService
+
+metrics_controller = APIRouter()
+
+
+# 交易所请求合并统计
+@metrics_controller.get("/exchange", response_model=ExchangeStatsDto, summary="交易所请求合并统计")
+async def exchange_stats():
+    return di.get(OkxMarketService).stats()
+
+
+# CPU 任务执行器统计
+@metrics_controller.get("/executor", response_model=CpuExecutorStatsDto, summary="CPU 任务执行器统计")
+async def executor_stats():
+    return CpuExecutorStatsDto(**di.get(CpuExecutor).stats())
+
+
+# OpenAI 客户端池统计
+@metrics_controller.get("/openai-pool", response_model=OpenaiClientPoolStatsDto, summary="OpenAI 客户端池统计")
+async def openai_pool_stats():
+    return OpenaiClientPoolStatsDto(**di.get(OpenaiClientPool).stats())
+
+
+# 大模型调用调度统计
+@metrics_controller.get("/llm-scheduler", response_model=LlmSchedulerStatsDto, summary="大模型调用调度统计")
+async def llm_scheduler_stats():
+    return LlmSchedulerStatsDto(**di.get(LlmScheduler).stats())
+
+
+# 技术指标提示词缓存统计
+@metrics_controller.get("/prompt-cache", response_model=PromptCacheStatsDto, summary="技术指标提示词缓存统计")
+async def prompt_cache_stats():
+    return PromptCacheStatsDto(**di.get(PromptCache).stats())
+
+
+# 大模型分析结果缓存统计
+@metrics_controller.get("/llm-cache", response_model=LlmResultCacheStatsDto, summary="大模型分析结果缓存统计")
+async def llm_cache_stats():
+    return LlmResultCacheStatsDto(**di.get(LlmResultCache).stats())
+
+
+# 异步分析任务统计
+@metrics_controller.get("/jobs", response_model=JobStatsDto, summary="异步分析任务统计")
+async def job_stats():
+    return JobStatsDto(**await di.get(AnalyseJobService).stats())
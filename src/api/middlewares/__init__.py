@@ -1 +1,2 @@
 from .exception_handler import ErrorResponse, exception_handler
+from .compression import CompressionMiddleware
@@ -65,7 +65,7 @@ async def exception_handler(request: Request, exc: Exception):
     elif isinstance(exc, (
             exceptions.APIException, exceptions.ParseError, exceptions.AuthenticationFailed,
             exceptions.NotAuthenticated, exceptions.PermissionDenied, exceptions.NotFound,
-            exceptions.UnsupportedMediaType,)):
+            exceptions.NotAcceptable, exceptions.UnsupportedMediaType, exceptions.Throttled,)):
         return JSONResponse(
             status_code=exc.status_code,
             content=ErrorResponse.error(exc.status_code, exc.message),
@@ -0,0 +1,53 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+from .middlewares import exception_handler
+
+MEDIA_TYPE = "text/event-stream"
+# 禁止缓存和反向代理缓冲，事件产生后立即到达客户端
+HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+Emit = Callable[[str, Any], None]
+
+
+# 编码一条 SSE 事件，data 为 JSON
+def encode_event(event: str, data: Any) -> bytes:
+    if isinstance(data, BaseModel):
+        payload = data.model_dump_json()
+    else:
+        payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n".encode()
+
+
+# 执行 run(emit)，按产生顺序输出执行过程中 emit 的事件，最后输出 result 事件；
+# 出错时输出 error 事件，内容与普通接口的错误响应相同；客户端断开时取消执行
+async def event_stream(run: Callable[[Emit], Awaitable[Any]], heartbeat: float = 15) -> AsyncIterator[bytes]:
+    queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue()
+    task = asyncio.ensure_future(run(lambda event, data: queue.put_nowait(encode_event(event, data))))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # 长时间没有事件时发送注释行，避免空闲连接被代理断开
+                yield b": ping\n\n"
+                continue
+            if chunk is None:
+                break
+            yield chunk
+
+        try:
+            result = task.result()
+        except Exception as exc:
+            response = await exception_handler(None, exc)
+            yield b"event: error\ndata: " + response.body + b"\n\n"
+        else:
+            yield encode_event("result", result)
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
@@ -1,2 +1,7 @@
 from .exceptions import *
 from .settings import settings
+from .single_flight import SingleFlight
+from .cpu_executor import CpuExecutor
+from .openai_client_pool import OpenaiClientPool
+from .llm_scheduler import LlmScheduler
+from .job_store import JobStore
@@ -0,0 +1,103 @@
+import json
+from typing import Any, Union
+
+import numpy as np
+
+from .exceptions import NotAcceptable
+
+# 列式数据：{列名: 一维数组} 或 {列名: {字段: 一维数组}}
+Columns = dict[str, Union[np.ndarray, dict[str, np.ndarray]]]
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+# 请求的媒体类型 -> 编码格式
+_MEDIA_TYPES = {
+    "application/json": JSON,
+    "application/*": JSON,
+    "*/*": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/vnd.apache.arrow.stream": ARROW,
+}
+
+
+# 编码格式依赖的包是否已安装（msgpack、pyarrow 为可选依赖）
+def _available(media_type: str) -> bool:
+    try:
+        if media_type == MSGPACK:
+            import msgpack  # noqa: F401
+        elif media_type == ARROW:
+            import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# 根据 Accept 请求头选择编码格式，按 q 值从高到低选择第一个支持的格式，未指定时使用 JSON
+def negotiate(accept: str) -> str:
+    if accept is None or not accept.strip():
+        return JSON
+    candidates = []
+    for index, item in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            candidates.append((-q, index, media_type.lower()))
+    for _, _, media_type in sorted(candidates):
+        encoding = _MEDIA_TYPES.get(media_type)
+        if encoding is not None and _available(encoding):
+            return encoding
+    raise NotAcceptable(accept)
+
+
+# 把列式数据编码为指定格式，NaN 编码为 null
+def encode_columns(columns: Columns, media_type: str) -> bytes:
+    if media_type == MSGPACK:
+        import msgpack
+        return msgpack.packb(_to_lists(columns))
+    if media_type == ARROW:
+        return _encode_arrow(columns)
+    return json.dumps(_to_lists(columns), separators=(",", ":")).encode()
+
+
+def _to_lists(columns: Columns) -> dict[str, Any]:
+    return {
+        name: {field: _to_list(arr) for field, arr in value.items()} if isinstance(value, dict) else _to_list(value)
+        for name, value in columns.items()
+    }
+
+
+def _to_list(arr: np.ndarray) -> list[Any]:
+    values = arr.tolist()
+    if arr.dtype.kind == "f":
+        for i in np.flatnonzero(~np.isfinite(arr)).tolist():
+            values[i] = None
+    return values
+
+
+# Arrow IPC stream：单列指标为 float64 列，多列指标为 struct 列
+def _encode_arrow(columns: Columns) -> bytes:
+    import pyarrow as pa
+
+    arrays, names = [], []
+    for name, value in columns.items():
+        if isinstance(value, dict):
+            arrays.append(pa.StructArray.from_arrays(
+                [pa.array(arr, from_pandas=True) for arr in value.values()], names=list(value)))
+        else:
+            arrays.append(pa.array(value, from_pandas=True))
+        names.append(name)
+    batch = pa.RecordBatch.from_arrays(arrays, names=names)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,100 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Literal, Optional, TypeVar
+
+from .exceptions import Throttled
+
+T = TypeVar("T")
+
+
+class CpuExecutor:
+    """
+    有界的 CPU 任务执行器：把指标计算、提示词构建等 CPU 密集的同步函数放到线程池/进程池中执行，避免阻塞事件循环。
+
+    - 同时执行的任务数不超过 workers，其余任务在事件循环内排队等待。
+    - 排队任务数达到 max_queue 时直接拒绝（Throttled），防止请求无限堆积。
+    - process 模式下函数和参数必须可以被 pickle。
+    """
+
+    def __init__(self, kind: Literal["thread", "process"] = "thread", workers: int = 4, max_queue: int = 1000):
+        if kind not in ("thread", "process"):
+            raise ValueError("kind 只能是 thread 或 process")
+        if workers <= 0:
+            raise ValueError("workers 值不能小于等于 0")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool: Optional[Executor] = None
+        self._semaphore = asyncio.Semaphore(workers)
+        self.queued = 0  # 正在排队的任务数
+        self.active = 0  # 正在执行的任务数
+        self.max_queued = 0  # 排队任务数的峰值
+        self.submitted = 0  # 提交的任务数
+        self.completed = 0  # 执行完成的任务数（包括抛出异常的任务）
+        self.rejected = 0  # 因队列已满被拒绝的任务数
+        self.wait_seconds = 0.0  # 累计排队时间
+        self.max_wait_seconds = 0.0  # 最长排队时间
+        self.run_seconds = 0.0  # 累计执行时间
+
+    # 在池中执行同步函数
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Throttled("CPU 任务队列已满，请稍后重试")
+
+        self.submitted += 1
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        started_at = time.perf_counter()
+        wait = started_at - queued_at
+        self.wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), functools.partial(fn, *args, **kwargs))
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self.run_seconds += time.perf_counter() - started_at
+            self._semaphore.release()
+
+    # 关闭线程池/进程池
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cpu-executor")
+        return self._pool
+
+    # 执行器统计
+    def stats(self) -> dict[str, Any]:
+        started = self.active + self.completed
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "active": self.active,
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.wait_seconds / started * 1000 if started > 0 else 0.0,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+            "avg_run_ms": self.run_seconds / self.completed * 1000 if self.completed > 0 else 0.0,
+        }
@@ -19,7 +19,9 @@ class APIException(Exception):
     error_code: str = 'error'
 
     def __init__(self, message: str = None):
-        super().__init__(message or self.message)
+        if message is not None:
+            self.message = message
+        super().__init__(self.message)
 
 
 # 数据验证失败
@@ -84,6 +86,16 @@ class NotFound(APIException):
         super().__init__(message or self.message)
 
 
+# 不能满足 Accept 请求头
+class NotAcceptable(APIException):
+    status_code: int = HTTP_406_NOT_ACCEPTABLE
+    message: str = '无法满足请求 Accept 头 "{accept}" 中的媒体类型。'
+    error_code: str = 'not_acceptable'
+
+    def __init__(self, accept: str):
+        super().__init__(self.message.format(accept=accept))
+
+
 # 不支持的媒体类型
 class UnsupportedMediaType(APIException):
     status_code: int = HTTP_415_UNSUPPORTED_MEDIA_TYPE
@@ -92,3 +104,13 @@ class UnsupportedMediaType(APIException):
 
     def __init__(self, media_type: str):
         super().__init__(self.message.format(media_type=media_type))
+
+
+# 请求过多
+class Throttled(APIException):
+    status_code: int = HTTP_429_TOO_MANY_REQUESTS
+    message: str = '请求过多，请稍后重试。'
+    error_code: str = 'throttled'
+
+    def __init__(self, message: str = None):
+        super().__init__(message or self.message)
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from peewee import CharField, FloatField, Model, SqliteDatabase, TextField, fn
+
+T = TypeVar("T")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+STATUSES = (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)
+
+# 之前的版本误建的任务表名，打开数据库时把其中的任务迁移到 analyse_job 后删除
+LEGACY_TABLE = "job"
+
+
+class _Job(Model):
+    id = CharField(primary_key=True, max_length=32)
+    key = CharField(index=True, max_length=64)  # 去重 key，参数相同的任务 key 相同
+    kind = CharField(max_length=32)
+    params = TextField()  # 任务参数 JSON
+    api_key_hash = CharField(max_length=64)  # api_key 只保存在内存中，这里只保存摘要
+    status = CharField(index=True, max_length=16)
+    result = TextField(null=True)  # 结果 JSON
+    error = TextField(null=True)
+    created_at = FloatField()
+    started_at = FloatField(null=True)
+    finished_at = FloatField(null=True, index=True)
+
+    class Meta:
+        table_name = "analyse_job"
+
+
+class JobStore:
+    """
+    基于 SQLite（peewee）的持久化任务队列：保存任务的参数、状态和结果，服务重启后仍然可以查询。
+
+    - 所有数据库操作在同一个专用线程中串行执行，不阻塞事件循环，也不需要处理 SQLite 的并发写入。
+    - 相同 key 的任务在排队或执行中时直接返回已有的任务；dedup_seconds 内成功完成的任务也直接复用结果。
+    """
+
+    def __init__(self, path: str = "data/jobs.db"):
+        self.path = path
+        self._db = SqliteDatabase(path, pragmas={"journal_mode": "wal", "synchronous": "normal"})
+        # 每个实例绑定自己的数据库；peewee 不继承父类 Meta 的 table_name，需要重新指定
+        meta = type("Meta", (), {"database": self._db, "table_name": _Job._meta.table_name})
+        self._job = type("Job", (_Job,), {"Meta": meta})
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self._pool is None:
+            raise RuntimeError("任务存储还没有打开")
+        return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+
+    # 打开数据库并创建表
+    async def open(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        await self._run(self._open)
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory and self.path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        self._db.connect(reuse_if_open=True)
+        self._db.create_tables([self._job])
+        self._migrate_legacy_table()
+
+    # 迁移旧表中的任务（已存在的 id 保留新表中的任务），只处理列与任务表一致的旧表
+    def _migrate_legacy_table(self):
+        if not self._db.table_exists(LEGACY_TABLE):
+            return
+        columns = [field.column_name for field in self._job._meta.sorted_fields]
+        if {column.name for column in self._db.get_columns(LEGACY_TABLE)} != set(columns):
+            return
+        names = ", ".join(f'"{column}"' for column in columns)
+        with self._db.atomic():
+            self._db.execute_sql(
+                f'INSERT OR IGNORE INTO "{self._job._meta.table_name}" ({names}) '
+                f'SELECT {names} FROM "{LEGACY_TABLE}"')
+            self._db.execute_sql(f'DROP TABLE "{LEGACY_TABLE}"')
+
+    # 关闭数据库
+    async def close(self):
+        if self._pool is None:
+            return
+        await self._run(self._db.close)
+        self._pool.shutdown()
+        self._pool = None
+
+    # 提交任务，返回 (任务, 是否新建)
+    async def submit(
+            self, key: str, kind: str, params: str, api_key_hash: str, dedup_seconds: float) -> tuple[dict, bool]:
+        return await self._run(self._submit, key, kind, params, api_key_hash, dedup_seconds)
+
+    def _submit(self, key: str, kind: str, params: str, api_key_hash: str, dedup_seconds: float) -> tuple[dict, bool]:
+        job = self._job
+        now = time.time()
+        with self._db.atomic():
+            existing = (job.select()
+                        .where((job.key == key) & (
+                            job.status.in_([QUEUED, RUNNING])
+                            | ((job.status == SUCCEEDED) & (job.finished_at >= now - dedup_seconds))))
+                        .order_by(job.created_at.desc())
+                        .dicts()
+                        .first())
+            if existing is not None:
+                return existing, False
+            row = {
+                "id": uuid.uuid4().hex,
+                "key": key,
+                "kind": kind,
+                "params": params,
+                "api_key_hash": api_key_hash,
+                "status": QUEUED,
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "started_at": None,
+                "finished_at": None,
+            }
+            job.insert(row).execute()
+        return row, True
+
+    # 查询任务
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self._run(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[dict]:
+        return self._job.select().where(self._job.id == job_id).dicts().first()
+
+    # 领取排队中的任务，任务已被取消时返回 None
+    async def claim(self, job_id: str) -> Optional[dict]:
+        return await self._run(self._transition, job_id, (QUEUED,), {"status": RUNNING, "started_at": time.time()})
+
+    # 记录执行结果，执行期间被取消的任务保持取消状态
+    async def finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        await self._run(self._transition, job_id, (RUNNING,), {
+            "status": status, "result": result, "error": error, "finished_at": time.time()})
+
+    # 取消排队或执行中的任务，返回取消后的任务；任务不存在时返回 None
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        await self._run(self._transition, job_id, (QUEUED, RUNNING), {"status": CANCELLED, "finished_at": time.time()})
+        return await self.get(job_id)
+
+    def _transition(self, job_id: str, statuses: tuple[str, ...], values: dict[str, Any]) -> Optional[dict]:
+        job = self._job
+        with self._db.atomic():
+            updated = job.update(values).where((job.id == job_id) & job.status.in_(statuses)).execute()
+            return self._get(job_id) if updated else None
+
+    # 未完成的任务（排队中，以及上次运行时被中断的执行中任务），按提交顺序
+    async def unfinished(self) -> list[dict]:
+        return await self._run(self._unfinished)
+
+    def _unfinished(self) -> list[dict]:
+        job = self._job
+        return list(job.select().where(job.status.in_([QUEUED, RUNNING])).order_by(job.created_at).dicts())
+
+    # 重新排队被中断的任务
+    async def requeue(self, job_id: str):
+        await self._run(self._transition, job_id, (RUNNING,), {"status": QUEUED, "started_at": None})
+
+    # 直接将未完成的任务标记为失败
+    async def fail(self, job_id: str, error: str):
+        await self._run(self._transition, job_id, (QUEUED, RUNNING), {
+            "status": FAILED, "error": error, "finished_at": time.time()})
+
+    # 删除 before（时间戳秒数）之前完成的任务，返回删除的数量
+    async def purge(self, before: float) -> int:
+        return await self._run(lambda: self._job.delete().where(self._job.finished_at < before).execute())
+
+    # 各状态的任务数
+    async def counts(self) -> dict[str, int]:
+        return await self._run(self._counts)
+
+    def _counts(self) -> dict[str, int]:
+        job = self._job
+        counts = {status: 0 for status in STATUSES}
+        for status, count in job.select(job.status, fn.COUNT(job.id)).group_by(job.status).tuples():
+            counts[status] = count
+        return counts
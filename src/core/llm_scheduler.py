@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+
+class _Provider:
+    def __init__(self, max_concurrency: int, requests_per_minute: float):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.rate = requests_per_minute / 60  # 每秒补充的令牌数，0 表示不限速
+        self.burst = float(max_concurrency)  # 令牌桶容量
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.active = 0  # 执行中的调用数
+        self.queued = 0  # 排队中的调用数
+        # 优先级 -> 调用方 -> 等待中的调用，同一优先级内按调用方轮流放行
+        self.queues: dict[int, OrderedDict[str, deque[asyncio.Future]]] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.max_queued = 0  # 排队调用数峰值
+        self.granted = 0  # 放行的调用数
+        self.completed = 0  # 执行完成的调用数（包括抛出异常的调用）
+        self.cancelled = 0  # 排队中被取消的调用数
+        self.wait_seconds = 0.0  # 累计排队时间
+        self.max_wait_seconds = 0.0  # 最长排队时间
+
+    # 按时间补充令牌
+    def refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class LlmScheduler:
+    """
+    大模型调用调度器：所有 chat completion 调用在这里排队，按服务商（base_url）限制并发数和请求速率。
+
+    - 每个服务商最多同时执行 max_concurrency 个调用，并用令牌桶限制每分钟请求数（0 表示不限速）。
+    - 优先级数值越小越先执行，总结调用（PRIORITY_SUMMARIZE）优先于单周期分析（PRIORITY_ANALYSE），
+      已经完成大部分分析的请求可以尽快返回。
+    - 同一优先级内按调用方（api_key）轮流放行，一个调用方的大量请求不会饿死其他调用方。
+    """
+    PRIORITY_SUMMARIZE = 0
+    PRIORITY_ANALYSE = 1
+
+    def __init__(
+            self,
+            max_concurrency: int = 16,
+            requests_per_minute: float = 0,
+            provider_limits: Optional[dict[str, tuple[int, float]]] = None,
+    ):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency 值不能小于等于 0")
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        # 按 base_url 单独配置的 (并发数, 每分钟请求数)
+        self.provider_limits = {
+            self._normalize(base_url): limits for base_url, limits in (provider_limits or {}).items()}
+        self._providers: dict[str, _Provider] = {}
+        # 不支持 n 参数（一次请求返回多个采样）的 (base_url, 模型)
+        self._single_choice_models: set[tuple[str, str]] = set()
+
+    @staticmethod
+    def _normalize(base_url: str) -> str:
+        return str(base_url).strip().rstrip("/")
+
+    # 服务商的模型是否支持 n 参数，没有被记录为不支持时视为支持
+    def supports_n(self, base_url: str, model: str) -> bool:
+        return (self._normalize(base_url), model) not in self._single_choice_models
+
+    # 记录服务商的模型不支持 n 参数，之后的多采样请求直接并发单次调用
+    def mark_single_choice(self, base_url: str, model: str):
+        self._single_choice_models.add((self._normalize(base_url), model))
+
+    # 获取调用名额，上下文结束时归还
+    @asynccontextmanager
+    async def slot(self, base_url: str, api_key: str, priority: int = PRIORITY_ANALYSE) -> AsyncIterator[None]:
+        provider = self._provider(base_url)
+        caller = hashlib.sha256(str(api_key).encode()).hexdigest()[:16]
+        waiter = asyncio.get_running_loop().create_future()
+        callers = provider.queues.setdefault(priority, OrderedDict())
+        callers.setdefault(caller, deque()).append(waiter)
+        provider.queued += 1
+        provider.max_queued = max(provider.max_queued, provider.queued)
+        queued_at = time.perf_counter()
+        self._dispatch(provider)
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已经放行但调用方被取消，归还名额
+                self._release(provider)
+            else:
+                self._remove(provider, priority, caller, waiter)
+            raise
+
+        wait = time.perf_counter() - queued_at
+        provider.wait_seconds += wait
+        provider.max_wait_seconds = max(provider.max_wait_seconds, wait)
+        try:
+            yield
+        finally:
+            self._release(provider)
+
+    def _provider(self, base_url: str) -> _Provider:
+        base_url = self._normalize(base_url)
+        provider = self._providers.get(base_url)
+        if provider is None:
+            max_concurrency, requests_per_minute = self.provider_limits.get(
+                base_url, (self.max_concurrency, self.requests_per_minute))
+            provider = _Provider(int(max_concurrency), requests_per_minute)
+            self._providers[base_url] = provider
+        return provider
+
+    # 在并发数和令牌允许的范围内放行等待中的调用
+    def _dispatch(self, provider: _Provider):
+        while provider.queued > 0 and provider.active < provider.max_concurrency:
+            provider.refill()
+            if provider.rate > 0 and provider.tokens < 1:
+                # 令牌不足，等到下一个令牌补充后再放行
+                if provider.timer is None:
+                    delay = (1 - provider.tokens) / provider.rate
+                    provider.timer = asyncio.get_running_loop().call_later(delay, self._on_timer, provider)
+                return
+            waiter = self._pop(provider)
+            provider.queued -= 1
+            if waiter.done():
+                # 调用方已取消，但还没来得及从队列中移除
+                provider.cancelled += 1
+                continue
+            provider.active += 1
+            provider.granted += 1
+            if provider.rate > 0:
+                provider.tokens -= 1
+            waiter.set_result(None)
+
+    def _on_timer(self, provider: _Provider):
+        provider.timer = None
+        self._dispatch(provider)
+
+    # 取出优先级最高的调用，同一优先级内轮流取各调用方的调用
+    @staticmethod
+    def _pop(provider: _Provider) -> asyncio.Future:
+        for priority in sorted(provider.queues):
+            callers = provider.queues[priority]
+            if not callers:
+                continue
+            caller, waiters = next(iter(callers.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                callers.move_to_end(caller)
+            else:
+                del callers[caller]
+            return waiter
+        raise RuntimeError("没有排队中的调用")
+
+    # 移除排队中被取消的调用
+    def _remove(self, provider: _Provider, priority: int, caller: str, waiter: asyncio.Future):
+        waiters = provider.queues[priority].get(caller)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del provider.queues[priority][caller]
+            provider.queued -= 1
+            provider.cancelled += 1
+
+    def _release(self, provider: _Provider):
+        provider.active -= 1
+        provider.completed += 1
+        self._dispatch(provider)
+
+    # 调度统计，按服务商分组
+    def stats(self) -> dict[str, Any]:
+        providers = {}
+        for base_url, provider in self._providers.items():
+            providers[base_url] = {
+                "max_concurrency": provider.max_concurrency,
+                "requests_per_minute": provider.requests_per_minute,
+                "active": provider.active,
+                "queued": provider.queued,
+                "queued_by_priority": {
+                    priority: sum(len(waiters) for waiters in callers.values())
+                    for priority, callers in provider.queues.items()
+                },
+                "callers": len({caller for callers in provider.queues.values() for caller in callers}),
+                "max_queued": provider.max_queued,
+                "granted": provider.granted,
+                "completed": provider.completed,
+                "cancelled": provider.cancelled,
+                "avg_wait_ms": provider.wait_seconds / provider.granted * 1000 if provider.granted > 0 else 0.0,
+                "max_wait_ms": provider.max_wait_seconds * 1000,
+            }
+        return {"providers": providers}
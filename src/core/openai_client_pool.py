@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import importlib.util
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from openai._base_client import DEFAULT_CONNECTION_LIMITS
+
+
+class _PooledClient:
+    __slots__ = ("client", "in_use", "last_used")
+
+    def __init__(self, client: AsyncOpenAI):
+        self.client = client
+        self.in_use = 0  # 正在使用该客户端的请求数
+        self.last_used = time.monotonic()
+
+
+class OpenaiClientPool:
+    """
+    AsyncOpenAI 客户端池，按 (base_url, api_key 哈希) 复用客户端及其 httpx 连接池。
+
+    - 同一个服务商的连续请求复用已建立的 TCP/TLS 连接（keep-alive），安装了 h2 时使用 HTTP/2。
+    - 空闲超过 idle_seconds 的客户端会被关闭：start() 启动后台任务定期检查，归还客户端时也会检查；
+      客户端数超过 max_clients 时关闭最久未使用的空闲客户端。
+    - 通过 client() 上下文使用，请求结束或抛出异常时都会归还；close() 停止后台任务并关闭所有客户端。
+    """
+
+    def __init__(self, max_clients: int = 32, idle_seconds: float = 600, keepalive_seconds: float = 60):
+        if max_clients <= 0:
+            raise ValueError("max_clients 值不能小于等于 0")
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.http2 = importlib.util.find_spec("h2") is not None
+        self._entries: OrderedDict[tuple[str, str], _PooledClient] = OrderedDict()
+        self._reaper: Optional[asyncio.Task] = None
+        self.created = 0  # 创建的客户端数
+        self.reused = 0  # 复用已有客户端的次数
+        self.evicted = 0  # 因空闲或超出数量被关闭的客户端数
+
+    # 启动定期关闭空闲客户端的后台任务，interval 默认为 idle_seconds 的一半（1 ~ 60 秒）
+    def start(self, interval: Optional[float] = None):
+        if interval is None:
+            interval = max(1.0, min(self.idle_seconds / 2, 60.0))
+        if interval <= 0:
+            raise ValueError("interval 值不能小于等于 0")
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap(interval))
+
+    async def _reap(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self._evict()
+
+    # 获取客户端，上下文结束时归还
+    @asynccontextmanager
+    async def client(self, base_url: str, api_key: str) -> AsyncIterator[AsyncOpenAI]:
+        entry = self._acquire(base_url, api_key)
+        try:
+            yield entry.client
+        finally:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            await self._evict()
+
+    def _acquire(self, base_url: str, api_key: str) -> _PooledClient:
+        base_url = base_url.strip().rstrip("/")
+        # 不在 key 中保存明文 api_key
+        key = (base_url, hashlib.sha256(api_key.encode()).hexdigest())
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _PooledClient(openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=openai.DefaultAsyncHttpxClient(
+                    http2=self.http2,
+                    limits=httpx.Limits(
+                        max_connections=DEFAULT_CONNECTION_LIMITS.max_connections,
+                        max_keepalive_connections=DEFAULT_CONNECTION_LIMITS.max_keepalive_connections,
+                        keepalive_expiry=self.keepalive_seconds,
+                    ),
+                ),
+            ))
+            self._entries[key] = entry
+            self.created += 1
+        else:
+            self.reused += 1
+        self._entries.move_to_end(key)
+        entry.in_use += 1
+        entry.last_used = time.monotonic()
+        return entry
+
+    # 关闭空闲超时的客户端，以及超出 max_clients 的最久未使用的空闲客户端；使用中的客户端不会被关闭
+    async def _evict(self):
+        # 先同步选出并移除要关闭的客户端，中间没有 await：并发执行的 _evict 不会重复处理同一个客户端，
+        # 关闭期间再次获取同一个服务商的客户端时会创建新的客户端，不会拿到正在关闭的客户端
+        now = time.monotonic()
+        overflow = len(self._entries) - self.max_clients
+        evicted = []
+        for key in list(self._entries):
+            entry = self._entries.get(key)
+            if entry is None or entry.in_use > 0:
+                continue
+            if overflow > 0 or now - entry.last_used >= self.idle_seconds:
+                evicted.append(self._entries.pop(key))
+                overflow -= 1
+        self.evicted += len(evicted)
+        # 关闭失败不影响已经完成的请求和后台任务
+        await asyncio.gather(*[entry.client.close() for entry in evicted], return_exceptions=True)
+
+    # 停止后台任务并关闭所有客户端
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            await entry.client.close()
+
+    # 客户端池统计
+    def stats(self) -> dict[str, Any]:
+        return {
+            "clients": len(self._entries),
+            "in_use": sum(entry.in_use for entry in self._entries.values()),
+            "max_clients": self.max_clients,
+            "http2": self.http2,
+            "created": self.created,
+            "reused": self.reused,
+            "evicted": self.evicted,
+        }
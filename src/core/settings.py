@@ -15,6 +15,57 @@ class Settings(BaseSettings):
     OKX_API_KEY: str = Field(..., env="OKX_API_KEY")
     OKX_SECRET: str = Field(..., env="OKX_SECRET")
 
+    # k线缓存
+    OHLCV_CACHE_ENABLED: bool = True
+    OHLCV_CACHE_MAX_TTL: int = 60  # 未收盘k线最长缓存秒数，实际为 min(k线周期/60, OHLCV_CACHE_MAX_TTL)
+
+    # 最新价缓存秒数
+    TICKER_CACHE_TTL: float = 2
+
+    # 实时k线，LIVE_WATCHLIST 为空时不启动；多个值用逗号分隔，例如：BTC/USDT:USDT,ETH/USDT:USDT
+    LIVE_WATCHLIST: str = ""
+    LIVE_TIMEFRAMES: str = "5m,15m,1h"
+    LIVE_BUFFER_SIZE: int = 500  # 每个 (symbol, timeframe) 保留的k线数量
+    LIVE_STALE_SECONDS: int = 30  # 超过该秒数未更新视为过期，回退到 REST 请求
+
+    # CPU 密集任务（指标计算、提示词构建）执行器；thread 模式可以复用指标缓存，process 模式可以利用多核
+    CPU_EXECUTOR_KIND: str = "thread"  # thread 或 process
+    CPU_EXECUTOR_WORKERS: int = 4
+    CPU_EXECUTOR_MAX_QUEUE: int = 1000  # 排队任务数上限，超过时返回 429
+
+    # OpenAI 客户端池：按 (base_url, api_key) 复用客户端和连接
+    OPENAI_POOL_MAX_CLIENTS: int = 32
+    OPENAI_POOL_IDLE_SECONDS: int = 600  # 客户端空闲超过该秒数后关闭
+    OPENAI_POOL_KEEPALIVE_SECONDS: int = 60  # 空闲连接保持秒数
+
+    # 大模型调用调度：每个服务商（base_url）的并发数和每分钟请求数（0 表示不限速）
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_REQUESTS_PER_MINUTE: float = 0
+    # 按 base_url 单独配置 [并发数, 每分钟请求数]，JSON 格式，例如：{"https://api.deepseek.com": [32, 600]}
+    LLM_PROVIDER_LIMITS: dict[str, tuple[int, float]] = {}
+
+    # 技术指标提示词缓存条数，方向分析与止盈止损分析共享
+    PROMPT_CACHE_SIZE: int = 256
+
+    # 技术指标提示词编码：PROMPT_COMPACT 开启紧凑编码（价格换算为相对最新收盘价的百分比，k线逐根差分编码，按有效数字保留精度）
+    PROMPT_COMPACT: bool = False
+    PROMPT_DIGITS: int = 4  # 紧凑编码保留的有效数字位数
+    # 按指标设置展示条数，JSON 格式，例如：{"kline": 30, "ma200": 5}，未设置的指标展示 60 条
+    PROMPT_DEPTH: dict[str, int] = {}
+
+    # 大模型分析结果缓存，默认关闭；开启后同一根k线周期内相同参数的分析复用结果，对比分析不使用缓存
+    LLM_RESULT_CACHE_ENABLED: bool = False
+    LLM_RESULT_CACHE_SIZE: int = 1024
+
+    # 上传k线文件（CSV/Parquet）的最大行数
+    KLINE_FILE_MAX_ROWS: int = 5_000_000
+
+    # 异步分析任务：SQLite 数据库路径、并发执行的任务数
+    JOB_DB_PATH: str = "data/jobs.db"
+    JOB_WORKERS: int = 4
+    JOB_DEDUP_SECONDS: int = 60  # 该秒数内参数相同且已成功的任务直接返回已有结果
+    JOB_RETENTION_SECONDS: int = 86400  # 完成超过该秒数的任务被删除
+
     model_config = {
         "extra": "ignore",
         "env_file": ".env",
@@ -0,0 +1,75 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Hashable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 当前请求作用域内已发起的调用（key -> task）
+_request_scope: ContextVar[Optional[dict[Hashable, asyncio.Future]]] = ContextVar("single_flight_scope", default=None)
+
+
+class SingleFlight:
+    """
+    合并相同 key 的并发调用：同一时刻同一个 key 只会有一个在途的 awaitable，其余调用方共享它的结果。
+
+    - 进程级：只合并在途调用，调用结束后立即释放，不缓存结果。
+    - 请求级：在 scope() 内，同一 key 的结果在整个请求生命周期内复用（包括已完成的调用）。
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0  # 实际发起的调用次数
+        self.hits = 0  # 合并到在途调用的次数
+        self.scope_hits = 0  # 命中请求作用域的次数
+
+    # 请求作用域，嵌套使用时复用最外层的作用域
+    @staticmethod
+    @contextmanager
+    def scope() -> Iterator[None]:
+        if _request_scope.get() is not None:
+            yield
+            return
+        token = _request_scope.set({})
+        try:
+            yield
+        finally:
+            _request_scope.reset(token)
+
+    # 执行调用，相同 key 共享同一个结果
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        scope = _request_scope.get()
+        if scope is not None and key in scope:
+            self.scope_hits += 1
+            return await asyncio.shield(scope[key])
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.hits += 1
+        else:
+            self.calls += 1
+            future = asyncio.ensure_future(fn())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda f: self._on_done(key, f))
+
+        if scope is not None:
+            scope[key] = future
+        # shield：某个调用方被取消时不影响其他共享该结果的调用方
+        return await asyncio.shield(future)
+
+    def _on_done(self, key: Hashable, future: asyncio.Future):
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        # 标记异常已读取，避免所有调用方都取消时出现 "exception was never retrieved"
+        if not future.cancelled():
+            future.exception()
+
+    # 统计信息
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "scope_hits": self.scope_hits,
+            "saved": self.hits + self.scope_hits,
+            "in_flight": len(self._in_flight),
+        }
@@ -5,7 +5,8 @@ from ccxt.async_support import okx
 from injector import Injector, Module, singleton, provider
 from openai import AsyncOpenAI
 
-from src.core import settings
+from src.analyst import PromptCache, LlmResultCache, IndicatorsPrompt
+from src.core import CpuExecutor, OpenaiClientPool, LlmScheduler, JobStore, settings
 
 
 class OpenaiClientProvider(Module):
@@ -18,6 +19,28 @@ class OpenaiClientProvider(Module):
         )
 
 
+class OpenaiClientPoolProvider(Module):
+    @singleton
+    @provider
+    def provide(self) -> OpenaiClientPool:
+        return OpenaiClientPool(
+            settings.OPENAI_POOL_MAX_CLIENTS,
+            settings.OPENAI_POOL_IDLE_SECONDS,
+            settings.OPENAI_POOL_KEEPALIVE_SECONDS,
+        )
+
+
+class LlmSchedulerProvider(Module):
+    @singleton
+    @provider
+    def provide(self) -> LlmScheduler:
+        return LlmScheduler(
+            settings.LLM_MAX_CONCURRENCY,
+            settings.LLM_REQUESTS_PER_MINUTE,
+            settings.LLM_PROVIDER_LIMITS,
+        )
+
+
 class OkxExchangeProvider(Module):
     @singleton
     @provider
@@ -29,5 +52,54 @@ class OkxExchangeProvider(Module):
         })
 
 
+class CpuExecutorProvider(Module):
+    @singleton
+    @provider
+    def provide(self) -> CpuExecutor:
+        return CpuExecutor(
+            settings.CPU_EXECUTOR_KIND,
+            settings.CPU_EXECUTOR_WORKERS,
+            settings.CPU_EXECUTOR_MAX_QUEUE,
+        )
+
+
+class PromptCacheProvider(Module):
+    @singleton
+    @provider
+    def provide(self) -> PromptCache:
+        return PromptCache(settings.PROMPT_CACHE_SIZE)
+
+
+class IndicatorsPromptProvider(Module):
+    @singleton
+    @provider
+    def provide(self) -> IndicatorsPrompt:
+        return IndicatorsPrompt(settings.PROMPT_COMPACT, settings.PROMPT_DIGITS, settings.PROMPT_DEPTH)
+
+
+class LlmResultCacheProvider(Module):
+    @singleton
+    @provider
+    def provide(self) -> LlmResultCache:
+        return LlmResultCache(settings.LLM_RESULT_CACHE_ENABLED, settings.LLM_RESULT_CACHE_SIZE)
+
+
+class JobStoreProvider(Module):
+    @singleton
+    @provider
+    def provide(self) -> JobStore:
+        return JobStore(settings.JOB_DB_PATH)
+
+
 # 创建 Injector 实例并注入依赖
-di = Injector([OpenaiClientProvider(), OkxExchangeProvider()])
+di = Injector([
+    OpenaiClientProvider(),
+    OpenaiClientPoolProvider(),
+    LlmSchedulerProvider(),
+    OkxExchangeProvider(),
+    CpuExecutorProvider(),
+    PromptCacheProvider(),
+    IndicatorsPromptProvider(),
+    LlmResultCacheProvider(),
+    JobStoreProvider(),
+])
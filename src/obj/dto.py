@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
 from pydantic import BaseModel, Field
 
@@ -37,6 +37,168 @@ class IndicatorsDto(BaseModel):
     ma200: Optional[list[Optional[float]]] = Field(default=None)
 
 
+class IndicatorsColumnsDto(BaseModel):
+    """
+    v2 列式格式：每个指标是一组平行数组（多字段指标为 {字段: 数组}），与 timestamp 一一对应，最新的k线在前。
+    只包含请求中选择的指标。
+    """
+    timestamp: list[int] = Field(...)
+    rsi: Optional[list[Optional[float]]] = Field(default=None)
+    stoch: Optional[dict[str, list[Optional[float]]]] = Field(default=None, description="k, d")
+    stoch_rsi: Optional[dict[str, list[Optional[float]]]] = Field(default=None, description="k, d")
+    macd: Optional[dict[str, list[Optional[float]]]] = Field(default=None, description="macd, signal, hist")
+    adx: Optional[list[Optional[float]]] = Field(default=None)
+    williams_r: Optional[list[Optional[float]]] = Field(default=None)
+    cci: Optional[list[Optional[float]]] = Field(default=None)
+    atr: Optional[list[Optional[float]]] = Field(default=None)
+    highs_lows: Optional[dict[str, list[Optional[float]]]] = Field(default=None, description="high, low")
+    ultimate_oscillator: Optional[list[Optional[float]]] = Field(default=None)
+    roc: Optional[list[Optional[float]]] = Field(default=None)
+    bull_bear_power: Optional[list[Optional[float]]] = Field(default=None)
+    bollinger_bands: Optional[dict[str, list[Optional[float]]]] = Field(
+        default=None, description="upper_band, middle_band, lower_band")
+    ma5: Optional[list[Optional[float]]] = Field(default=None)
+    ma10: Optional[list[Optional[float]]] = Field(default=None)
+    ma20: Optional[list[Optional[float]]] = Field(default=None)
+    ma50: Optional[list[Optional[float]]] = Field(default=None)
+    ma100: Optional[list[Optional[float]]] = Field(default=None)
+    ma200: Optional[list[Optional[float]]] = Field(default=None)
+
+
+class BatchIndicatorsItemDto(BaseModel):
+    name: str = Field(..., description="序列名称")
+    indicators: Optional[IndicatorsDto] = Field(default=None, description="指标结果，计算失败时为空")
+    error: Optional[str] = Field(default=None, description="计算失败的原因")
+
+
+class BatchIndicatorsDto(BaseModel):
+    results: list[BatchIndicatorsItemDto] = Field(..., description="与请求顺序一致的每个序列的结果")
+
+
 class SwapDirectionDto(BaseModel):
     directions: list[TimeFramesDirection]
     conclusion_direction: Direction
+
+
+class SingleFlightStatsDto(BaseModel):
+    calls: int = Field(..., description="实际发起的交易所调用次数")
+    hits: int = Field(..., description="合并到在途调用的次数")
+    scope_hits: int = Field(..., description="命中请求作用域的次数")
+    saved: int = Field(..., description="节省的交易所调用次数")
+    in_flight: int = Field(..., description="当前在途的调用数")
+
+
+class CandleCacheStatsDto(BaseModel):
+    hits: int = Field(..., description="直接命中缓存的次数")
+    delta_fetches: int = Field(..., description="增量拉取次数")
+    full_fetches: int = Field(..., description="全量拉取次数")
+    entries: int = Field(..., description="缓存的 (symbol, timeframe) 数量")
+
+
+class ExchangeStatsDto(BaseModel):
+    fetch_ohlcv: SingleFlightStatsDto = Field(..., description="k线请求合并统计")
+    ohlcv_cache: CandleCacheStatsDto = Field(..., description="k线缓存统计")
+    fetch_ticker: SingleFlightStatsDto = Field(..., description="最新价请求合并统计")
+    ticker_cache_hits: int = Field(..., description="最新价命中缓存的次数")
+    live_ohlcv_hits: int = Field(..., description="k线命中实时存储的次数")
+    live_ticker_hits: int = Field(..., description="最新价命中实时存储的次数")
+
+
+class CpuExecutorStatsDto(BaseModel):
+    kind: str = Field(..., description="执行器类型，thread 或 process")
+    workers: int = Field(..., description="最大并发执行的任务数")
+    max_queue: int = Field(..., description="排队任务数上限")
+    queued: int = Field(..., description="当前排队的任务数")
+    active: int = Field(..., description="当前执行中的任务数")
+    max_queued: int = Field(..., description="排队任务数峰值")
+    submitted: int = Field(..., description="提交的任务数")
+    completed: int = Field(..., description="执行完成的任务数")
+    rejected: int = Field(..., description="因队列已满被拒绝的任务数")
+    avg_wait_ms: float = Field(..., description="平均排队毫秒数")
+    max_wait_ms: float = Field(..., description="最长排队毫秒数")
+    avg_run_ms: float = Field(..., description="平均执行毫秒数")
+
+
+class OpenaiClientPoolStatsDto(BaseModel):
+    clients: int = Field(..., description="池中的客户端数")
+    in_use: int = Field(..., description="使用中的客户端引用数")
+    max_clients: int = Field(..., description="最大客户端数")
+    http2: bool = Field(..., description="是否使用 HTTP/2")
+    created: int = Field(..., description="创建的客户端数")
+    reused: int = Field(..., description="复用已有客户端的次数")
+    evicted: int = Field(..., description="因空闲或超出数量被关闭的客户端数")
+
+
+class LlmProviderStatsDto(BaseModel):
+    max_concurrency: int = Field(..., description="最大并发调用数")
+    requests_per_minute: float = Field(..., description="每分钟请求数上限，0 表示不限速")
+    active: int = Field(..., description="执行中的调用数")
+    queued: int = Field(..., description="排队中的调用数")
+    queued_by_priority: dict[int, int] = Field(..., description="各优先级排队中的调用数，0 为总结调用，1 为单周期分析调用")
+    callers: int = Field(..., description="有调用在排队的调用方数")
+    max_queued: int = Field(..., description="排队调用数峰值")
+    granted: int = Field(..., description="放行的调用数")
+    completed: int = Field(..., description="执行完成的调用数")
+    cancelled: int = Field(..., description="排队中被取消的调用数")
+    avg_wait_ms: float = Field(..., description="平均排队毫秒数")
+    max_wait_ms: float = Field(..., description="最长排队毫秒数")
+
+
+class LlmSchedulerStatsDto(BaseModel):
+    providers: dict[str, LlmProviderStatsDto] = Field(..., description="按服务商（base_url）分组的调度统计")
+
+
+class PromptCacheStatsDto(BaseModel):
+    size: int = Field(..., description="当前缓存的提示词数量")
+    maxsize: int = Field(..., description="最大缓存数量")
+    lookups: int = Field(..., description="查询次数")
+    hits: int = Field(..., description="直接命中缓存的次数")
+    coalesced: int = Field(..., description="合并到在途构建的次数")
+    builds: int = Field(..., description="实际构建提示词的次数")
+    evictions: int = Field(..., description="因超出容量被淘汰的次数")
+    hit_ratio: float = Field(..., description="命中率，1 - builds / lookups")
+
+
+class PromptSectionSizeDto(BaseModel):
+    chars: int = Field(..., description="字符数")
+    tokens: int = Field(..., description="token 数")
+
+
+class PromptSizeDto(BaseModel):
+    tokenizer: str = Field(..., description="计数方式，tiktoken:<encoding> 为精确计数，estimate 为估算")
+    chars: int = Field(..., description="提示词字符数")
+    tokens: int = Field(..., description="提示词 token 数")
+    sections: dict[str, PromptSectionSizeDto] = Field(..., description="各指标段的大小")
+
+
+class LlmResultCacheStatsDto(BaseModel):
+    enabled: bool = Field(..., description="是否开启")
+    size: int = Field(..., description="当前缓存的结果数量")
+    maxsize: int = Field(..., description="最大缓存数量")
+    lookups: int = Field(..., description="查询次数")
+    hits: int = Field(..., description="直接命中缓存的次数")
+    coalesced: int = Field(..., description="合并到在途调用的次数")
+    calls: int = Field(..., description="实际调用大模型的次数")
+    expired: int = Field(..., description="命中已过期条目的次数")
+    bypassed: int = Field(..., description="绕过缓存的调用次数（关闭、对比分析或k线已过期）")
+    hit_ratio: float = Field(..., description="命中率，1 - calls / lookups")
+
+
+class JobDto(BaseModel):
+    id: str = Field(..., description="任务 id")
+    kind: str = Field(..., description="任务类型，direction：多空信号；stop_loss_profit：止损止盈价格")
+    status: str = Field(..., description="状态，queued / running / succeeded / failed / cancelled")
+    params: dict[str, Any] = Field(..., description="任务参数")
+    result: Optional[dict[str, Any]] = Field(default=None, description="成功时的结果（Direction 或 StopLossProfit）")
+    error: Optional[str] = Field(default=None, description="失败的原因")
+    created_at: datetime = Field(..., description="提交时间")
+    started_at: Optional[datetime] = Field(default=None, description="开始执行时间")
+    finished_at: Optional[datetime] = Field(default=None, description="完成时间")
+
+
+class JobStatsDto(BaseModel):
+    workers: int = Field(..., description="并发执行的任务数")
+    running: int = Field(..., description="本进程执行中的任务数")
+    submitted: int = Field(..., description="新建的任务数")
+    deduplicated: int = Field(..., description="提交时复用已有任务的次数")
+    statuses: dict[str, int] = Field(..., description="数据库中各状态的任务数")
@@ -1,12 +1,114 @@
-from typing import Optional
+from typing import Annotated, Any, ClassVar, Literal, Optional
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, Field, PlainValidator, WithJsonSchema, field_validator, model_validator
 
+from src.analyst import Stoch, StochRSI, MACD, HighsLows, BollingerBands, KlineSeries
 from src.obj.dto import KlineDto
 
+# 可以按字段投影的多字段指标
+PROJECTABLE_INDICATORS = {
+    "stoch": Stoch,
+    "stoch_rsi": StochRSI,
+    "macd": MACD,
+    "highs_lows": HighsLows,
+    "bollinger_bands": BollingerBands,
+}
 
-class CalculateIndicatorsRequest(BaseModel):
-    kline_list: list[KlineDto] = Field(..., max_length=300)
+
+OHLCV_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+def _as_float_array(value: Any) -> np.ndarray:
+    try:
+        return np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise ValueError("k线数据必须都是数字") from e
+
+
+# 整体校验紧凑格式的k线并转换为 KlineSeries，不为每根k线创建对象；sort 为 True 时先按 timestamp 升序排列
+def to_kline_series(value: Any, *, sort: bool = False) -> KlineSeries:
+    if isinstance(value, KlineSeries):
+        return value
+    if isinstance(value, dict):
+        # 列式：{"timestamp": [...], "open": [...], ...}
+        missing = [name for name in OHLCV_COLUMNS if name not in value]
+        if missing:
+            raise ValueError(f"缺少列：{', '.join(missing)}")
+        columns = [_as_float_array(value[name]) for name in OHLCV_COLUMNS]
+        if any(column.ndim != 1 or len(column) != len(columns[0]) for column in columns):
+            raise ValueError("各列必须是长度相同的一维数组")
+        values = np.stack(columns)
+    else:
+        # ccxt ohlcv：[[timestamp, open, high, low, close, volume], ...]
+        values = _as_float_array(value)
+        if values.size == 0:
+            values = values.reshape(0, 6)
+        if values.ndim != 2 or values.shape[1] != 6:
+            raise ValueError("ohlcv 必须是 [[timestamp, open, high, low, close, volume], ...] 格式")
+        values = values.T
+
+    # 向量化校验
+    if not np.isfinite(values).all():
+        raise ValueError("k线数据不能包含 NaN 或无穷大")
+    if sort and np.any(np.diff(values[0]) < 0):
+        values = values[:, np.argsort(values[0], kind="stable")]
+    timestamp = values[0]
+    if np.any(timestamp != np.floor(timestamp)):
+        raise ValueError("timestamp 必须是整数")
+    if np.any(np.diff(timestamp) <= 0):
+        raise ValueError("timestamp 必须严格递增")
+    return KlineSeries(*values)
+
+
+# 紧凑格式的k线输入，校验后为 KlineSeries
+OhlcvSeries = Annotated[
+    KlineSeries,
+    PlainValidator(to_kline_series),
+    WithJsonSchema({
+        "anyOf": [
+            {
+                "type": "array",
+                "items": {"type": "array", "items": {"type": "number"}, "minItems": 6, "maxItems": 6},
+                "description": "ccxt ohlcv：[[timestamp, open, high, low, close, volume], ...]",
+            },
+            {
+                "type": "object",
+                "properties": {name: {"type": "array", "items": {"type": "number"}} for name in OHLCV_COLUMNS},
+                "required": list(OHLCV_COLUMNS),
+                "description": "列式：{\"timestamp\": [...], \"open\": [...], ...}",
+            },
+        ],
+    }),
+]
+
+
+class KlineInput(BaseModel):
+    """
+    k线输入，kline_list 与 ohlcv 二选一。
+    ohlcv 为紧凑格式（ccxt 二维数组或列式），整体转换为 numpy 数组并校验，解析开销远小于 kline_list。
+    """
+    MAX_KLINES: ClassVar[int] = 300
+
+    kline_list: Optional[list[KlineDto]] = Field(default=None, max_length=300)
+    ohlcv: Optional[OhlcvSeries] = Field(default=None, description="紧凑格式的k线，按时间升序")
+
+    @model_validator(mode="after")
+    def _check_klines(self) -> "KlineInput":
+        if (self.kline_list is None) == (self.ohlcv is None):
+            raise ValueError("kline_list 与 ohlcv 必须且只能传入一个")
+        if self.ohlcv is not None and len(self.ohlcv) > self.MAX_KLINES:
+            raise ValueError(f"k线数量不能大于 {self.MAX_KLINES} 个")
+        return self
+
+    # 转换为 KlineSeries
+    def kline_series(self) -> KlineSeries:
+        if self.ohlcv is not None:
+            return self.ohlcv
+        return KlineSeries.from_klines(self.kline_list)
+
+
+class IndicatorsSelection(BaseModel):
     is_rsi: Optional[bool] = Field(default=None)
     is_stoch: Optional[bool] = Field(default=None)
     is_stoch_rsi: Optional[bool] = Field(default=None)
@@ -26,3 +128,59 @@ class CalculateIndicatorsRequest(BaseModel):
     is_ma50: Optional[bool] = Field(default=None)
     is_ma100: Optional[bool] = Field(default=None)
     is_ma200: Optional[bool] = Field(default=None)
+    last_n: Optional[int] = Field(default=None, ge=1, description="只返回最新的 n 个值，为空时返回全部")
+    fields: Optional[dict[str, list[str]]] = Field(
+        default=None,
+        description="多字段指标只返回指定的字段，例如：{\"macd\": [\"hist\"], \"bollinger_bands\": [\"upper_band\", \"lower_band\"]}",
+    )
+
+    @field_validator("fields")
+    @classmethod
+    def _check_fields(cls, fields: Optional[dict[str, list[str]]]) -> Optional[dict[str, list[str]]]:
+        for name, names in (fields or {}).items():
+            model = PROJECTABLE_INDICATORS.get(name)
+            if model is None:
+                raise ValueError(f"指标 {name} 不支持字段投影，支持：{', '.join(PROJECTABLE_INDICATORS)}")
+            unknown = [n for n in names if n not in model.model_fields]
+            if unknown:
+                raise ValueError(f"指标 {name} 没有字段：{', '.join(unknown)}")
+        return fields
+
+    # 只保留指标选项，不包含k线等其他字段
+    def selection(self) -> "IndicatorsSelection":
+        return IndicatorsSelection.model_validate(self.model_dump(include=set(IndicatorsSelection.model_fields)))
+
+
+class CalculateIndicatorsRequest(IndicatorsSelection, KlineInput):
+    pass
+
+
+class BatchIndicatorsSeriesRequest(CalculateIndicatorsRequest):
+    name: str = Field(..., description="序列名称，例如：BTC/USDT:USDT 5m")
+
+
+class BatchCalculateIndicatorsRequest(BaseModel):
+    series: list[BatchIndicatorsSeriesRequest] = Field(..., min_length=1, max_length=1000)
+
+
+class PromptSizeRequest(KlineInput):
+    compact: bool = Field(default=False, description="紧凑编码：价格换算为相对最新收盘价的百分比，按有效数字保留精度")
+    digits: int = Field(default=4, ge=1, le=12, description="紧凑编码保留的有效数字位数")
+    depth: dict[str, int] = Field(default={}, description="按指标设置展示条数，例如：{\"kline\": 30, \"ma200\": 5}")
+
+
+class DirectionJobRequest(BaseModel):
+    symbol: str = Field(default="BTC/USDT:USDT", min_length=1, description="合约标识，例如：BTC/USDT:USDT")
+    leverage: int = Field(default=1, ge=1, description="杠杆倍数")
+    timeframes: list[str] = Field(default=["5m", "15m", "1h"], min_length=1, description="检查的k线周期")
+    compare: int = Field(default=3, ge=1, le=10, description="对比次数")
+    quorum: Optional[float] = Field(default=None, gt=0, le=1, description="信心加权的提前结束比例")
+    batch: bool = Field(default=False, description="批量采样对比")
+
+
+class StopLossProfitJobRequest(BaseModel):
+    symbol: str = Field(default="BTC/USDT:USDT", min_length=1, description="合约标识，例如：BTC/USDT:USDT")
+    leverage: int = Field(default=1, ge=1, description="杠杆倍数")
+    direction: Literal['long', 'short'] = Field(..., description="开仓方向, long: 做多；short：做空")
+    timeframes: list[str] = Field(default=["5m", "15m", "1h"], min_length=1, description="检查的k线周期")
+    entry_price: Optional[float] = Field(default=None, description="已经持仓时的开仓均价")
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from typing import Any
+
+from injector import inject, singleton
+from pydantic import BaseModel
+
+from src.core import JobStore, OpenaiClientPool, NotFound, settings
+from src.core import job_store
+from src.obj import DirectionJobRequest, StopLossProfitJobRequest, JobDto
+from .analyse_okx_service import AnalyseByOkxDirectionService, AnalyseByOkxStopLossProfitService
+
+DIRECTION = "direction"
+STOP_LOSS_PROFIT = "stop_loss_profit"
+
+# 清理过期任务的间隔秒数
+PURGE_INTERVAL = 3600
+
+
+@singleton
+class AnalyseJobService:
+    """
+    异步分析任务：提交后立即返回任务，由后台的 worker 执行分析，客户端轮询结果或取消任务，
+    接口耗时与分析耗时无关。
+
+    - 任务参数、状态和结果保存在 SQLite（JobStore）中，相同参数的任务按 key 去重。
+    - api_key 只保存在内存中；服务重启后，使用服务端配置的 api_key 提交的未完成任务重新排队，其余的任务标记为失败。
+    """
+
+    @inject
+    def __init__(
+            self,
+            store: JobStore,
+            client_pool: OpenaiClientPool,
+            direction_service: AnalyseByOkxDirectionService,
+            stop_loss_profit_service: AnalyseByOkxStopLossProfitService,
+    ):
+        self._store = store
+        self._client_pool = client_pool
+        self._direction_service = direction_service
+        self._stop_loss_profit_service = stop_loss_profit_service
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._api_keys: dict[str, str] = {}  # 任务 id -> 还未执行的任务的 api_key
+        self._running: dict[str, asyncio.Task] = {}
+        self._workers: list[asyncio.Task] = []
+        self._purged_at = 0.0
+        self.submitted = 0  # 新建的任务数
+        self.deduplicated = 0  # 提交时复用已有任务的次数
+
+    @staticmethod
+    def _hash(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()
+
+    # 打开任务存储，恢复未完成的任务并启动 worker
+    async def start(self, workers: int = 4):
+        if workers <= 0:
+            raise ValueError("workers 值不能小于等于 0")
+        if self._workers:
+            raise RuntimeError("异步任务已经在运行")
+        await self._store.open()
+        await self._purge()
+
+        server_key_hash = self._hash(settings.OPENAI_API_KEY)
+        for job in await self._store.unfinished():
+            if job["api_key_hash"] != server_key_hash:
+                await self._store.fail(job["id"], "服务重启后任务凭据已失效，请重新提交任务")
+                continue
+            if job["status"] == job_store.RUNNING:
+                await self._store.requeue(job["id"])
+            self._api_keys[job["id"]] = settings.OPENAI_API_KEY
+            self._queue.put_nowait(job["id"])
+
+        self._workers = [asyncio.create_task(self._work()) for _ in range(workers)]
+
+    # 删除完成超过 JOB_RETENTION_SECONDS 的任务
+    async def _purge(self):
+        self._purged_at = time.time()
+        await self._store.purge(self._purged_at - settings.JOB_RETENTION_SECONDS)
+
+    # 停止 worker，执行中的任务在下次启动时重新排队或标记为失败
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self._store.close()
+
+    # 提交方向分析任务
+    async def submit_direction(
+            self, request: DirectionJobRequest, openai_base_url: str, openai_api_key: str, openai_model: str) -> JobDto:
+        return await self._submit(DIRECTION, request, openai_base_url, openai_api_key, openai_model)
+
+    # 提交止损止盈分析任务
+    async def submit_stop_loss_profit(
+            self, request: StopLossProfitJobRequest, openai_base_url: str, openai_api_key: str,
+            openai_model: str) -> JobDto:
+        return await self._submit(STOP_LOSS_PROFIT, request, openai_base_url, openai_api_key, openai_model)
+
+    async def _submit(
+            self, kind: str, request: BaseModel, openai_base_url: str, openai_api_key: str, openai_model: str) -> JobDto:
+        params = json.dumps({
+            **request.model_dump(),
+            "openai_base_url": openai_base_url.strip().rstrip("/"),
+            "openai_model": openai_model,
+        }, ensure_ascii=False, sort_keys=True)
+        api_key_hash = self._hash(openai_api_key)
+        key = hashlib.sha256(f"{kind}\n{params}\n{api_key_hash}".encode()).hexdigest()
+        job, created = await self._store.submit(key, kind, params, api_key_hash, settings.JOB_DEDUP_SECONDS)
+        if time.time() - self._purged_at >= PURGE_INTERVAL:
+            await self._purge()
+        if created:
+            self.submitted += 1
+            self._api_keys[job["id"]] = openai_api_key
+            self._queue.put_nowait(job["id"])
+        else:
+            self.deduplicated += 1
+        return self._to_dto(job)
+
+    # 查询提交者（api_key 相同）的任务
+    async def get(self, job_id: str, openai_api_key: str) -> JobDto:
+        return self._to_dto(await self._owned(job_id, openai_api_key))
+
+    # 取消提交者的排队或执行中的任务，已完成的任务保持原状态
+    async def cancel(self, job_id: str, openai_api_key: str) -> JobDto:
+        await self._owned(job_id, openai_api_key)
+        job = await self._store.cancel(job_id)
+        if job is None:
+            raise NotFound("任务不存在")
+        self._api_keys.pop(job_id, None)
+        task = self._running.get(job_id)
+        if task is not None and job["status"] == job_store.CANCELLED:
+            task.cancel()
+        return self._to_dto(job)
+
+    # api_key 与提交任务时不同也视为任务不存在，不暴露其他调用方的任务
+    async def _owned(self, job_id: str, openai_api_key: str) -> dict[str, Any]:
+        job = await self._store.get(job_id)
+        if job is None or not hmac.compare_digest(job["api_key_hash"], self._hash(openai_api_key)):
+            raise NotFound("任务不存在")
+        return job
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            api_key = self._api_keys.pop(job_id, None)
+            job = await self._store.claim(job_id)
+            if job is None or api_key is None:
+                # 已被取消
+                continue
+
+            task = asyncio.ensure_future(self._run(job, api_key))
+            self._running[job_id] = task
+            try:
+                # wait 不会因为任务被取消而抛出异常，worker 自身被取消时才抛出
+                await asyncio.wait([task])
+            except asyncio.CancelledError:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise
+            finally:
+                del self._running[job_id]
+
+            if task.cancelled():
+                continue
+            error = task.exception()
+            if error is not None:
+                await self._store.finish(job_id, job_store.FAILED, error=str(error) or type(error).__name__)
+            else:
+                await self._store.finish(job_id, job_store.SUCCEEDED, result=task.result().model_dump_json())
+
+    async def _run(self, job: dict[str, Any], api_key: str) -> BaseModel:
+        params = json.loads(job["params"])
+        async with self._client_pool.client(params["openai_base_url"], api_key) as async_openai:
+            if job["kind"] == DIRECTION:
+                request = DirectionJobRequest.model_validate(params)
+                return await self._direction_service.compare_analyses_by_symbol(
+                    request.symbol,
+                    request.timeframes,
+                    async_openai,
+                    params["openai_model"],
+                    leverage=request.leverage,
+                    compare=request.compare,
+                    quorum=request.quorum,
+                    batch=request.batch,
+                )
+            request = StopLossProfitJobRequest.model_validate(params)
+            return await self._stop_loss_profit_service.analyses_by_symbol(
+                request.symbol,
+                request.direction,
+                request.timeframes,
+                async_openai,
+                params["openai_model"],
+                leverage=request.leverage,
+                entry_price=request.entry_price,
+            )
+
+    @staticmethod
+    def _to_dto(job: dict[str, Any]) -> JobDto:
+        return JobDto(
+            id=job["id"],
+            kind=job["kind"],
+            status=job["status"],
+            params=json.loads(job["params"]),
+            result=json.loads(job["result"]) if job["result"] is not None else None,
+            error=job["error"],
+            created_at=job["created_at"],
+            started_at=job["started_at"],
+            finished_at=job["finished_at"],
+        )
+
+    # 任务统计
+    async def stats(self) -> dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "statuses": await self._store.counts(),
+        }
@@ -1,30 +1,22 @@
 import asyncio
 import traceback
-from typing import Optional, Literal, Any, Coroutine
+from functools import partial
+from typing import Optional, Literal, Any, Callable, Coroutine, Union
 
-from ccxt.async_support import okx
 from injector import inject
 from openai import AsyncOpenAI
 
-from src.analyst import Kline, TimeFramesDirection, DirectionAnalyst, Direction, StopLossProfitAnalyst, StopLossProfit, \
-    TimeFramesStopLossProfit
-from src.core import settings
+from src.analyst import Kline, KlineSeries, TimeFramesDirection, DirectionAnalyst, Direction, StopLossProfitAnalyst, \
+    StopLossProfit, TimeFramesStopLossProfit, PromptCache, LlmResultCache, IndicatorsPrompt
+from src.core import CpuExecutor, LlmScheduler, settings
 from src.obj import KlineDto, SwapDirectionDto
+from .majority_vote import MajorityVote
+from .okx_market_service import OkxMarketService
 
 
 # 转换ohlcv
-def transition_ohlcv(ohlcv: list[list]) -> list[Kline]:
-    kline_list: list[Kline] = []
-    for item in ohlcv:
-        kline_list.append(Kline(
-            timestamp=item[0],
-            open=item[1],
-            high=item[2],
-            low=item[3],
-            close=item[4],
-            volume=item[5],
-        ))
-    return kline_list
+def transition_ohlcv(ohlcv: list[list]) -> KlineSeries:
+    return KlineSeries.from_ohlcv(ohlcv)
 
 
 # 并发执行异步
@@ -59,13 +51,20 @@ async def run_coroutines(tasks: list[Coroutine[Any, Any, Any]], return_exception
 
 
 class AnalyseDirection:
-    def __init__(self):
-        self._direction_analyst = DirectionAnalyst()
+    def __init__(
+            self,
+            executor: Optional[CpuExecutor] = None,
+            prompt_cache: Optional[PromptCache] = None,
+            result_cache: Optional[LlmResultCache] = None,
+            scheduler: Optional[LlmScheduler] = None,
+            indicators_prompt: Optional[IndicatorsPrompt] = None,
+    ):
+        self._direction_analyst = DirectionAnalyst(executor, prompt_cache, result_cache, scheduler, indicators_prompt)
 
     # 分析
     async def analyse(
             self,
-            kline_list: list[Kline],
+            kline_list: Union[KlineSeries, list[Kline]],
             current_price: float,
             async_openai: AsyncOpenAI,
             openai_model: str,
@@ -83,6 +82,29 @@ class AnalyseDirection:
             leverage=leverage,
         )
 
+    # 一次请求获取多个独立采样的分析结果
+    async def analyse_samples(
+            self,
+            kline_list: Union[KlineSeries, list[Kline]],
+            current_price: float,
+            async_openai: AsyncOpenAI,
+            openai_model: str,
+            *,
+            leverage: int = 1,
+            n: int = 1,
+    ) -> list[Direction]:
+        if leverage <= 0:
+            raise ValueError("leverage参数不能传入小于等于0的值")
+
+        return await self._direction_analyst.analyse_samples(
+            kline_list,
+            current_price,
+            async_openai,
+            openai_model,
+            leverage=leverage,
+            n=n,
+        )
+
     # 分析多k线
     async def analyses(
             self,
@@ -114,35 +136,56 @@ class AnalyseDirection:
     # 比较分析多k线
     @staticmethod
     async def compare_analyses(directions: list[Direction]) -> Direction:
-        buy_result_list: list[Direction] = []
-        sell_result_list: list[Direction] = []
-        hold_result_list: list[Direction] = []
-        for result in directions:
-            if result.signal == "buy":
-                buy_result_list.append(result)
-            elif result.signal == "sell":
-                sell_result_list.append(result)
-            else:
-                hold_result_list.append(result)
-
         # 返回数量最多的结果方向
-        max_length = max(len(buy_result_list), len(sell_result_list), len(hold_result_list))
-        if max_length == len(buy_result_list):
-            return buy_result_list[0]
-        elif max_length == len(sell_result_list):
-            return sell_result_list[0]
-        else:
-            return hold_result_list[0]
+        vote = MajorityVote(len(directions))
+        for direction in directions:
+            vote.add(direction)
+        return vote.result()
+
+    # 增量投票比较分析：按完成顺序统计结果，胜出信号已经确定时取消还未完成的分析
+    @staticmethod
+    async def vote_analyses(
+            tasks: list[Coroutine[Any, Any, Direction]],
+            *,
+            quorum: Optional[float] = None,
+            on_vote: Optional[Callable[[MajorityVote], Any]] = None,
+    ) -> Direction:
+        vote = MajorityVote(len(tasks), quorum=quorum)
+        futures = [asyncio.ensure_future(task) for task in tasks]
+        pending = set(futures)
+        try:
+            while pending and not vote.decided():
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # 同时完成的结果按提交顺序计票
+                for future in futures:
+                    if future in done:
+                        vote.add(future.result())
+                if on_vote is not None:
+                    on_vote(vote)
+        finally:
+            for future in pending:
+                future.cancel()
+            # 等待取消完成，并取出所有异常，避免未读取的 task 异常告警
+            await asyncio.gather(*futures, return_exceptions=True)
+        return vote.result()
 
 
 class AnalyseStopLossProfit:
-    def __init__(self):
-        self._stop_loss_profit_analyst = StopLossProfitAnalyst()
+    def __init__(
+            self,
+            executor: Optional[CpuExecutor] = None,
+            prompt_cache: Optional[PromptCache] = None,
+            result_cache: Optional[LlmResultCache] = None,
+            scheduler: Optional[LlmScheduler] = None,
+            indicators_prompt: Optional[IndicatorsPrompt] = None,
+    ):
+        self._stop_loss_profit_analyst = StopLossProfitAnalyst(
+            executor, prompt_cache, result_cache, scheduler, indicators_prompt)
 
     # 分析
     async def analyse(
             self,
-            kline_list: list[Kline],
+            kline_list: Union[KlineSeries, list[Kline]],
             direction: Literal['long', 'short'],
             current_price: float,
             async_openai: AsyncOpenAI,
@@ -199,9 +242,17 @@ class AnalyseStopLossProfit:
 
 class AnalyseByOkxDirectionService(AnalyseDirection):
     @inject
-    def __init__(self, exchange: okx):
-        super().__init__()
-        self._exchange = exchange
+    def __init__(
+            self,
+            market: OkxMarketService,
+            executor: CpuExecutor,
+            prompt_cache: PromptCache,
+            result_cache: LlmResultCache,
+            scheduler: LlmScheduler,
+            indicators_prompt: IndicatorsPrompt,
+    ):
+        super().__init__(executor, prompt_cache, result_cache, scheduler, indicators_prompt)
+        self._market = market
 
     async def analyse_by_symbol(
             self,
@@ -222,15 +273,41 @@ class AnalyseByOkxDirectionService(AnalyseDirection):
         if len(timeframe) <= 0:
             raise ValueError("timeframe值不能为空")
 
-        ohlcv = await self._exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=300)
-        kline_list = transition_ohlcv(ohlcv)
+        kline_list = await self._market.fetch_klines(symbol, timeframe, limit=300)
 
         if current_price is None:
-            ticker = await self._exchange.fetch_ticker(symbol)
-            current_price = float(ticker["last"])
+            current_price = await self._market.fetch_last_price(symbol)
 
         return await self.analyse(kline_list, current_price, async_openai, openai_model, leverage=leverage)
 
+    async def analyse_samples_by_symbol(
+            self,
+            symbol: str,
+            timeframe: str,
+            async_openai: AsyncOpenAI,
+            openai_model: str,
+            *,
+            leverage: int = 1,
+            n: int = 1,
+            current_price: Optional[float] = None,
+    ) -> list[Direction]:
+        symbol = symbol.strip()
+        timeframe = timeframe.strip()
+        if len(symbol) <= 0:
+            raise ValueError("symbol值不能为空")
+        if leverage <= 0:
+            raise ValueError("leverage值不能小于等于0")
+        if len(timeframe) <= 0:
+            raise ValueError("timeframe值不能为空")
+
+        kline_list = await self._market.fetch_klines(symbol, timeframe, limit=300)
+
+        if current_price is None:
+            current_price = await self._market.fetch_last_price(symbol)
+
+        return await self.analyse_samples(kline_list, current_price, async_openai, openai_model, leverage=leverage,
+                                          n=n)
+
     async def analyses_by_symbol(
             self,
             symbol: str,
@@ -240,6 +317,7 @@ class AnalyseByOkxDirectionService(AnalyseDirection):
             *,
             leverage: int = 1,
             current_price: Optional[float] = None,
+            on_result: Optional[Callable[[TimeFramesDirection], Any]] = None,
     ) -> Direction:
         symbol = symbol.strip()
         if len(symbol) <= 0:
@@ -249,22 +327,28 @@ class AnalyseByOkxDirectionService(AnalyseDirection):
         if timeframes is None or len(timeframes) <= 0:
             raise ValueError("timeframes值不能为空")
 
+        # 整个分析过程使用同一个价格快照
+        if current_price is None:
+            current_price = await self._market.fetch_last_price(symbol)
+
         async def task_wrapper(timeframe: str) -> TimeFramesDirection:
-            r = await self.analyse_by_symbol(symbol, timeframe, async_openai, openai_model, leverage=leverage)
-            return TimeFramesDirection.model_validate({
+            r = await self.analyse_by_symbol(symbol, timeframe, async_openai, openai_model, leverage=leverage,
+                                             current_price=current_price)
+            result = TimeFramesDirection.model_validate({
                 **r.model_dump(),
                 "timeframe": timeframe,
             })
+            if on_result is not None:
+                on_result(result)
+            return result
 
         analytics: list[TimeFramesDirection] = await run_coroutines([
             task_wrapper(timeframe) for timeframe in timeframes])
 
-        if current_price is None:
-            ticker = await self._exchange.fetch_ticker(symbol)
-            current_price = float(ticker["last"])
-
         return await self.analyses(analytics, current_price, async_openai, openai_model, leverage=leverage)
 
+    # 多次对比分析，on_result(第几次对比, 单周期分析结果) 在每个单周期分析完成时调用，
+    # on_vote(投票) 在每次计票后调用，用于流式返回分析进度
     async def compare_analyses_by_symbol(
             self,
             symbol: str,
@@ -274,6 +358,10 @@ class AnalyseByOkxDirectionService(AnalyseDirection):
             *,
             leverage: int = 1,
             compare: int = 3,
+            quorum: Optional[float] = None,
+            batch: bool = False,
+            on_result: Optional[Callable[[int, TimeFramesDirection], Any]] = None,
+            on_vote: Optional[Callable[[MajorityVote], Any]] = None,
     ) -> Direction:
         symbol = symbol.strip()
         if len(symbol) <= 0:
@@ -285,25 +373,74 @@ class AnalyseByOkxDirectionService(AnalyseDirection):
         if timeframes is None or len(timeframes) <= 0:
             raise ValueError("timeframes值不能为空")
 
-        # 获取 symbol 当前价格
-        ticker = await self._exchange.fetch_ticker(symbol)
-        current_price = float(ticker["last"])
-
-        # 并发获取分析结果
-        analytics: list[Direction] = await run_coroutines([
-            self.analyses_by_symbol(symbol, timeframes, async_openai, openai_model, leverage=leverage,
-                                    current_price=current_price)
-            for _ in range(compare)
-        ])
+        # 请求作用域内多次对比共享同一份k线；每次对比都是独立采样，不使用结果缓存
+        with self._market.request_scope(), LlmResultCache.bypass():
+            # 获取 symbol 当前价格
+            current_price = await self._market.fetch_last_price(symbol)
+
+            if batch:
+                return await self._batch_compare_analyses_by_symbol(
+                    symbol, timeframes, async_openai, openai_model, current_price,
+                    leverage=leverage, compare=compare, quorum=quorum, on_result=on_result, on_vote=on_vote)
+
+            # 并发获取分析结果，多数结果一致后不再等待其余的分析
+            return await self.vote_analyses([
+                self.analyses_by_symbol(symbol, timeframes, async_openai, openai_model, leverage=leverage,
+                                        current_price=current_price,
+                                        on_result=partial(on_result, i) if on_result is not None else None)
+                for i in range(compare)
+            ], quorum=quorum, on_vote=on_vote)
+
+    # 批量采样对比：每个k线周期只发送一次指标提示词，一次请求取得 compare 个采样，
+    # 第 i 次对比使用各周期的第 i 个采样做总结，再对各次对比的结果投票
+    async def _batch_compare_analyses_by_symbol(
+            self,
+            symbol: str,
+            timeframes: list[str],
+            async_openai: AsyncOpenAI,
+            openai_model: str,
+            current_price: float,
+            *,
+            leverage: int,
+            compare: int,
+            quorum: Optional[float],
+            on_result: Optional[Callable[[int, TimeFramesDirection], Any]],
+            on_vote: Optional[Callable[[MajorityVote], Any]],
+    ) -> Direction:
+        async def task_wrapper(timeframe: str) -> list[TimeFramesDirection]:
+            samples = await self.analyse_samples_by_symbol(
+                symbol, timeframe, async_openai, openai_model, leverage=leverage, n=compare,
+                current_price=current_price)
+            results = [
+                TimeFramesDirection.model_validate({**r.model_dump(), "timeframe": timeframe}) for r in samples]
+            if on_result is not None:
+                for i, result in enumerate(results):
+                    on_result(i, result)
+            return results
+
+        samples: list[list[TimeFramesDirection]] = await run_coroutines([
+            task_wrapper(timeframe) for timeframe in timeframes])
 
-        return await self.compare_analyses(analytics)
+        return await self.vote_analyses([
+            self.analyses([timeframe_samples[i] for timeframe_samples in samples], current_price, async_openai,
+                          openai_model, leverage=leverage)
+            for i in range(compare)
+        ], quorum=quorum, on_vote=on_vote)
 
 
 class AnalyseByOkxStopLossProfitService(AnalyseStopLossProfit):
     @inject
-    def __init__(self, exchange: okx):
-        super().__init__()
-        self._exchange = exchange
+    def __init__(
+            self,
+            market: OkxMarketService,
+            executor: CpuExecutor,
+            prompt_cache: PromptCache,
+            result_cache: LlmResultCache,
+            scheduler: LlmScheduler,
+            indicators_prompt: IndicatorsPrompt,
+    ):
+        super().__init__(executor, prompt_cache, result_cache, scheduler, indicators_prompt)
+        self._market = market
 
     async def analyse_by_symbol(
             self,
@@ -326,12 +463,10 @@ class AnalyseByOkxStopLossProfitService(AnalyseStopLossProfit):
         if len(timeframe) <= 0:
             raise ValueError("timeframe值不能为空")
 
-        ohlcv = await self._exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=300)
-        kline_list = transition_ohlcv(ohlcv)
+        kline_list = await self._market.fetch_klines(symbol, timeframe, limit=300)
 
         if current_price is None:
-            ticker = await self._exchange.fetch_ticker(symbol)
-            current_price = float(ticker["last"])
+            current_price = await self._market.fetch_last_price(symbol)
 
         return await self.analyse(kline_list, direction, current_price, async_openai, openai_model, leverage=leverage,
                                   entry_price=entry_price)
@@ -347,6 +482,7 @@ class AnalyseByOkxStopLossProfitService(AnalyseStopLossProfit):
             leverage: int = 1,
             current_price: Optional[float] = None,
             entry_price: Optional[float] = None,
+            on_result: Optional[Callable[[TimeFramesStopLossProfit], Any]] = None,
     ) -> StopLossProfit:
         symbol = symbol.strip()
         if len(symbol) <= 0:
@@ -356,19 +492,23 @@ class AnalyseByOkxStopLossProfitService(AnalyseStopLossProfit):
         if timeframes is None or len(timeframes) <= 0:
             raise ValueError("timeframes值不能为空")
 
+        # 整个分析过程使用同一个价格快照
+        if current_price is None:
+            current_price = await self._market.fetch_last_price(symbol)
+
         async def task_wrapper(timeframe: str) -> TimeFramesStopLossProfit:
             r = await self.analyse_by_symbol(symbol, direction, timeframe, async_openai, openai_model,
-                                             leverage=leverage, entry_price=entry_price)
-            return TimeFramesStopLossProfit.model_validate({
+                                             leverage=leverage, current_price=current_price, entry_price=entry_price)
+            result = TimeFramesStopLossProfit.model_validate({
                 **r.model_dump(),
                 "timeframe": timeframe,
             })
+            if on_result is not None:
+                on_result(result)
+            return result
 
         analytics: list[TimeFramesStopLossProfit] = await run_coroutines([
             task_wrapper(timeframe) for timeframe in timeframes])
 
-        if current_price is None:
-            ticker = await self._exchange.fetch_ticker(symbol)
-            current_price = float(ticker["last"])
         return await self.analyses(analytics, direction, current_price, async_openai, openai_model, leverage=leverage,
                                    entry_price=entry_price)
@@ -0,0 +1,73 @@
+from typing import Optional
+
+
+# 单个 (symbol, timeframe) 的k线缓存
+class CandleCache:
+    """
+    保存已收盘的k线和最新一根未收盘的k线（ccxt ohlcv 格式：[timestamp, open, high, low, close, volume]）。
+
+    - 已收盘的k线不会再变化，只需要通过 since 增量拉取最新一根之后的数据。
+    - 未收盘的k线在 ttl 内有效，超过 ttl 或该k线收盘后需要重新拉取。
+    """
+
+    def __init__(self, timeframe_ms: int, ttl_ms: int, capacity: int):
+        self.timeframe_ms = timeframe_ms
+        self.ttl_ms = ttl_ms
+        self.capacity = capacity
+        self._candles: list[list] = []
+        self._fetched_at = 0
+
+    def __len__(self) -> int:
+        return len(self._candles)
+
+    # 最新一根k线的时间戳
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return self._candles[-1][0] if self._candles else None
+
+    # 缓存是否可以直接返回 limit 根k线
+    def is_fresh(self, now: int, limit: int) -> bool:
+        if len(self._candles) < limit:
+            return False
+        # 最新一根k线已收盘，需要拉取新开的k线
+        if now >= self.last_timestamp + self.timeframe_ms:
+            return False
+        return now - self._fetched_at < self.ttl_ms
+
+    # 增量拉取需要的k线数量，返回 None 表示缺口过大需要全量拉取
+    def delta_limit(self, now: int, limit: int) -> Optional[int]:
+        if len(self._candles) < limit:
+            return None
+        missing = (now - self.last_timestamp) // self.timeframe_ms + 1
+        if missing >= limit:
+            return None
+        return missing
+
+    # 合并新拉取的k线，按时间戳去重，新数据覆盖旧数据
+    def merge(self, ohlcv: list[list], now: int):
+        if ohlcv:
+            since = ohlcv[0][0]
+            # 新数据从 since 开始是完整的，直接截断旧数据中 >= since 的部分
+            idx = len(self._candles)
+            while idx > 0 and self._candles[idx - 1][0] >= since:
+                idx -= 1
+            merged = self._candles[:idx]
+            last = merged[-1][0] if merged else None
+            for item in sorted(ohlcv, key=lambda k: k[0]):
+                if last is not None and item[0] <= last:
+                    if item[0] == last:
+                        merged[-1] = item
+                    continue
+                merged.append(item)
+                last = item[0]
+            self._candles = merged[-self.capacity:]
+        self._fetched_at = now
+
+    # 替换全部k线
+    def replace(self, ohlcv: list[list], now: int):
+        self._candles = []
+        self.merge(ohlcv, now)
+
+    # 最新的 limit 根k线
+    def tail(self, limit: int) -> list[list]:
+        return self._candles[-limit:]
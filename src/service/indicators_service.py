@@ -1,50 +1,308 @@
+import asyncio
+import math
+from collections import deque
+from typing import Any, AsyncIterator, BinaryIO, Callable, Optional
+
+import numpy as np
 from injector import inject
 
-from src.analyst import Indicators, Kline
-from src.obj import IndicatorsDto, CalculateIndicatorsRequest
+from src.analyst import Indicators, IndicatorsPrompt, KlineSeries, prompt_size
+from src.core import CpuExecutor, columnar, settings
+from src.obj import IndicatorsDto, CalculateIndicatorsRequest, BatchCalculateIndicatorsRequest, BatchIndicatorsItemDto, \
+    IndicatorsSelection, PROJECTABLE_INDICATORS, PromptSizeRequest, PromptSizeDto
+from . import kline_file
+
+
+# 大序列分块计算时每块向前多取的k线数量：滚动窗口类指标（最长 MA200）完全一致，
+# EMA/Wilder 平滑类指标的初始值影响按 (1 - 1/周期)^1000 衰减，结果与整段计算在浮点误差内一致
+STREAM_WARMUP = 1000
+
+
+# 数组转换为数字文本，float 的 repr 即为合法的 JSON/CSV 数字，非有限值输出为 null
+def _format_numbers(arr: np.ndarray, null: str = "null") -> list[str]:
+    return [repr(v) if finite else null for v, finite in zip(arr.tolist(), np.isfinite(arr).tolist())]
+
+
+# 将序列按 chunk_size 切分为k线块（视图，不复制数据）
+async def _slices(series: KlineSeries, chunk_size: int) -> AsyncIterator[KlineSeries]:
+    for start in range(0, len(series), chunk_size):
+        yield series.take(slice(start, start + chunk_size))
+
+
+# 读完所有k线块，只保留最新的 n 根
+async def _tail(chunks: AsyncIterator[KlineSeries], n: int) -> KlineSeries:
+    kept: deque[KlineSeries] = deque()
+    size = 0
+    async for chunk in chunks:
+        kept.append(chunk)
+        size += len(chunk)
+        while size - len(kept[0]) >= n:
+            size -= len(kept.popleft())
+    return KlineSeries.concat(kept).tail(n)
 
 
 class IndicatorsService:
     @inject
-    def __init__(self):
-        pass
+    def __init__(self, executor: CpuExecutor):
+        self._executor = executor
 
     # 计算k线指标
     @staticmethod
     def calculate_indicators(request: CalculateIndicatorsRequest) -> IndicatorsDto:
-        if len(request.kline_list) > 300:
+        series = request.kline_series()
+        if len(series) > 300:
             raise ValueError("计算的 K 线长度不能大于 300 个")
 
-        indicators = Indicators([
-            Kline(
-                open=item.open,
-                high=item.high,
-                low=item.low,
-                close=item.close,
-                volume=item.volume,
-                timestamp=item.timestamp,
-            )
-            for item in request.kline_list
+        return IndicatorsService._calculate(series, request)
+
+    # 计算k线指标并序列化为 JSON（投影掉的字段不会输出）
+    @staticmethod
+    def calculate_indicators_json(request: CalculateIndicatorsRequest) -> bytes:
+        return IndicatorsService.calculate_indicators(request).model_dump_json().encode()
+
+    # 按 is_* 选项计算指标，last_n 和 fields 在转换为 list 和 pydantic 对象之前生效
+    @staticmethod
+    def _calculate(series: KlineSeries, selection: IndicatorsSelection) -> IndicatorsDto:
+        values: dict[str, Any] = {}
+        columns = IndicatorsService._raw_columns(Indicators(series), selection, last_n=selection.last_n)
+        for name, result in columns.items():
+            if isinstance(result, dict):
+                names = list(result.keys())
+                rows = zip(*[Indicators._to_list_with_none(arr) for arr in result.values()])
+                # 投影掉的字段不设置，序列化时不会输出
+                values[name] = [PROJECTABLE_INDICATORS[name].model_construct(**dict(zip(names, row))) for row in rows]
+            else:
+                values[name] = Indicators._to_list_with_none(result)
+        # 数据已是 float/None，跳过校验
+        return IndicatorsDto.model_construct(**values)
+
+    # 批量计算k线指标，返回 BatchIndicatorsDto 的 JSON
+    async def calculate_indicators_batch(self, request: BatchCalculateIndicatorsRequest) -> str:
+        """
+        序列分块后在执行器中并行计算，单个序列失败只影响它自己的结果。
+        只把列式k线和指标选项发送给执行器，执行器直接返回每个序列结果的 JSON，
+        避免在事件循环中序列化大量的 pydantic 对象（process 模式下也避免了 pickle 大对象）。
+        """
+        items = [
+            (series.name, series.kline_series(), series.selection())
+            for series in request.series
+        ]
+        chunk_size = math.ceil(len(items) / self._executor.workers)
+        results = await asyncio.gather(*[
+            self._executor.run(IndicatorsService._calculate_chunk, items[i:i + chunk_size])
+            for i in range(0, len(items), chunk_size)
         ])
+        return '{"results":[' + ",".join(item for chunk in results for item in chunk) + "]}"
+
+    @staticmethod
+    def _calculate_chunk(chunk: list[tuple[str, KlineSeries, IndicatorsSelection]]) -> list[str]:
+        items = []
+        for name, series, request in chunk:
+            try:
+                item = BatchIndicatorsItemDto(name=name, indicators=IndicatorsService._calculate(series, request))
+            except Exception as e:
+                item = BatchIndicatorsItemDto(name=name, error=str(e))
+            items.append(item.model_dump_json())
+        return items
+
+    # 统计这组k线生成的指标提示词大小，用于比较不同编码选项的 token 数
+    async def prompt_size(self, request: PromptSizeRequest) -> PromptSizeDto:
+        indicators_prompt = IndicatorsPrompt(request.compact, request.digits, request.depth)
+        size = await self._executor.run(prompt_size, indicators_prompt, request.kline_series())
+        return PromptSizeDto.model_validate(size)
+
+    # 计算k线指标（v2 列式格式），返回指定格式编码后的内容
+    async def calculate_indicators_columns(self, request: CalculateIndicatorsRequest, media_type: str) -> bytes:
+        series = request.kline_series()
+        if len(series) > 300:
+            raise ValueError("计算的 K 线长度不能大于 300 个")
+        return await self._executor.run(IndicatorsService._encode_columns, series, request.selection(), media_type)
+
+    # 按 is_* 选项计算指标并编码，每个指标为一组平行数组，顺序与 v1 一致（最新的k线在前）
+    @staticmethod
+    def _encode_columns(series: KlineSeries, selection: IndicatorsSelection, media_type: str) -> bytes:
+        columns = {"timestamp": series.timestamp[::-1][:selection.last_n]}
+        columns.update(IndicatorsService._raw_columns(Indicators(series), selection, last_n=selection.last_n))
+        return columnar.encode_columns(columns, media_type)
+
+    # 大序列指标计算：边读取 NDJSON 请求体（每行一根 ccxt 格式的k线）边计算，按时间升序逐块输出 NDJSON（每行一根k线的指标）
+    def calculate_indicators_stream(
+            self, body: AsyncIterator[bytes], selection: IndicatorsSelection, chunk_size: int) -> AsyncIterator[bytes]:
+        return self._stream(self._read_ndjson(body, chunk_size), selection, chunk_size, IndicatorsService._encode_chunk)
+
+    # 逐块解析 NDJSON k线，解析在执行器中进行，同时只有一块原始行和一块 KlineSeries 在内存中
+    async def _read_ndjson(self, body: AsyncIterator[bytes], chunk_size: int) -> AsyncIterator[KlineSeries]:
+        last_timestamp = None
+        async for lines in kline_file.read_ndjson_lines(body, chunk_size, settings.KLINE_FILE_MAX_ROWS):
+            chunk = await self._executor.run(kline_file.parse_ndjson_lines, lines)
+            # 块内的顺序在解析时校验，这里校验块之间的顺序
+            if last_timestamp is not None and chunk.timestamp[0] <= last_timestamp:
+                raise ValueError("timestamp 必须严格递增")
+            last_timestamp = chunk.timestamp[-1]
+            yield chunk
+
+    # 读取上传的 CSV/Parquet k线文件，在线程中分块解析（文件对象不能发送到进程池）
+    @staticmethod
+    async def read_kline_file(file: BinaryIO, kind: str) -> KlineSeries:
+        return await asyncio.to_thread(kline_file.read_klines, file, kind, settings.KLINE_FILE_MAX_ROWS)
+
+    # 计算k线文件的指标，按时间升序逐块输出 CSV（每个多字段指标的字段展开为 指标_字段 列）
+    def calculate_indicators_csv(
+            self, series: KlineSeries, selection: IndicatorsSelection, chunk_size: int) -> AsyncIterator[bytes]:
+        return self._stream(_slices(series, chunk_size), selection, chunk_size, IndicatorsService._encode_csv_chunk)
+
+    # 计算k线文件的指标，返回 Parquet 文件内容，列与 CSV 相同
+    async def calculate_indicators_parquet(self, series: KlineSeries, selection: IndicatorsSelection) -> bytes:
+        return await self._executor.run(IndicatorsService._encode_parquet, series, selection)
+
+    # 按时间升序逐块计算并编码指标
+    def _stream(
+            self,
+            chunks: AsyncIterator[KlineSeries],
+            selection: IndicatorsSelection,
+            chunk_size: int,
+            encode: Callable[[KlineSeries, IndicatorsSelection, int, bool], bytes],
+    ) -> AsyncIterator[bytes]:
+        """
+        chunks 为按时间升序的k线块，每块连同之前的 STREAM_WARMUP 根k线一起计算，只输出本块的结果。
+        内存占用只与块大小有关，不会为整段序列构建指标对象；同时最多有两块在计算/输出中。
+        encode(k线, 指标选项, 跳过的预热k线数, 是否第一块) 在执行器中调用。
+        """
+
+        async def generate() -> AsyncIterator[bytes]:
+            source = chunks
+            history = KlineSeries.empty()  # 上一块末尾的预热k线
+            if selection.last_n:
+                # 只输出最新的 n 根k线：读完所有块，只保留最新的 n 根和它们之前的预热k线
+                buffered = await _tail(chunks, selection.last_n + STREAM_WARMUP)
+                history = buffered.take(slice(0, max(len(buffered) - selection.last_n, 0)))
+                source = _slices(buffered.tail(selection.last_n), chunk_size)
+
+            pending = None
+            first = True
+            try:
+                async for chunk in source:
+                    if len(chunk) == 0:
+                        continue
+                    # 提前提交下一块，输出当前块的同时计算下一块
+                    series = KlineSeries.concat([history, chunk])
+                    task = asyncio.ensure_future(self._executor.run(encode, series, selection, len(history), first))
+                    first = False
+                    history = series.tail(STREAM_WARMUP)
+                    if pending is not None:
+                        yield await pending
+                    pending = task
+                if pending is not None:
+                    yield await pending
+            finally:
+                # 客户端断开或读取出错时取消还未输出的块
+                if pending is not None and not pending.done():
+                    pending.cancel()
+
+        return generate()
+
+    # 计算一块k线的指标并编码为 NDJSON，跳过前 skip 根预热k线（NDJSON 没有表头，忽略 first）
+    @staticmethod
+    def _encode_chunk(series: KlineSeries, selection: IndicatorsSelection, skip: int, first: bool = False) -> bytes:
+        # 按列转换为 JSON 文本，再用同一个行模板拼接，避免为每根k线构建 dict 和调用 json 编码
+        fields = ['"timestamp":%s']
+        columns = [[str(ts) for ts in series.timestamp[skip:].tolist()]]
+        for name, result in IndicatorsService._raw_columns(Indicators(series), selection, last_n=None).items():
+            if isinstance(result, dict):
+                fields.append(f'"{name}":{{' + ",".join(f'"{field}":%s' for field in result) + "}")
+                columns.extend(_format_numbers(arr[::-1][skip:]) for arr in result.values())
+            else:
+                fields.append(f'"{name}":%s')
+                columns.append(_format_numbers(result[::-1][skip:]))
+        template = "{" + ",".join(fields) + "}\n"
+        return "".join([template % row for row in zip(*columns)]).encode()
+
+    # 计算一块k线的指标并编码为 CSV，跳过前 skip 根预热k线，第一块带表头，空值为空单元格
+    @staticmethod
+    def _encode_csv_chunk(series: KlineSeries, selection: IndicatorsSelection, skip: int, first: bool) -> bytes:
+        columns = IndicatorsService._flat_columns(Indicators(series), selection, last_n=None)
+        lines = [",".join(["timestamp", *columns]) + "\n"] if first else []
+        values = [[str(ts) for ts in series.timestamp[skip:].tolist()]]
+        values.extend(_format_numbers(arr[::-1][skip:], null="") for arr in columns.values())
+        template = ",".join(["%s"] * len(values)) + "\n"
+        lines.extend([template % row for row in zip(*values)])
+        return "".join(lines).encode()
+
+    # 计算整段k线的指标并编码为 Parquet，按时间升序，空值为 null
+    @staticmethod
+    def _encode_parquet(series: KlineSeries, selection: IndicatorsSelection) -> bytes:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        last_n = selection.last_n
+        columns = {"timestamp": pa.array(series.timestamp[::-1][:last_n][::-1])}
+        for name, arr in IndicatorsService._flat_columns(Indicators(series), selection, last_n=last_n).items():
+            columns[name] = pa.array(arr[::-1], from_pandas=True)
+        sink = pa.BufferOutputStream()
+        pq.write_table(pa.table(columns), sink)
+        return sink.getvalue().to_pybytes()
+
+    # raw 模式的指标展开为单列（倒序），多字段指标的列名为 指标_字段
+    @staticmethod
+    def _flat_columns(
+            indicators: Indicators,
+            selection: IndicatorsSelection,
+            *,
+            last_n: Optional[int],
+    ) -> dict[str, np.ndarray]:
+        columns = {}
+        for name, result in IndicatorsService._raw_columns(indicators, selection, last_n=last_n).items():
+            if isinstance(result, dict):
+                columns.update((f"{name}_{field}", arr) for field, arr in result.items())
+            else:
+                columns[name] = result
+        return columns
+
+    # 按 is_* 选项计算 raw 模式的指标（倒序 numpy 视图），按 fields 投影字段，last_n 时只取最新的 n 个值
+    @staticmethod
+    def _raw_columns(
+            indicators: Indicators,
+            selection: IndicatorsSelection,
+            *,
+            last_n: Optional[int],
+    ) -> dict[str, Any]:
+        columns: dict[str, Any] = {}
+        if selection.is_rsi:
+            columns["rsi"] = indicators.rsi(raw=True)
+        if selection.is_stoch:
+            columns["stoch"] = indicators.stoch(raw=True)
+        if selection.is_stoch_rsi:
+            columns["stoch_rsi"] = indicators.stoch_rsi(raw=True)
+        if selection.is_macd:
+            columns["macd"] = indicators.macd(raw=True)
+        if selection.is_adx:
+            columns["adx"] = indicators.adx(raw=True)
+        if selection.is_williams_r:
+            columns["williams_r"] = indicators.williams_r(raw=True)
+        if selection.is_cci:
+            columns["cci"] = indicators.cci(raw=True)
+        if selection.is_atr:
+            columns["atr"] = indicators.atr(raw=True)
+        if selection.is_highs_lows:
+            columns["highs_lows"] = indicators.highs_lows(raw=True)
+        if selection.is_ultimate_oscillator:
+            columns["ultimate_oscillator"] = indicators.ultimate_oscillator(raw=True)
+        if selection.is_roc:
+            columns["roc"] = indicators.roc(raw=True)
+        if selection.is_bull_bear_power:
+            columns["bull_bear_power"] = indicators.bull_bear_power(raw=True)
+        if selection.is_bollinger_bands:
+            columns["bollinger_bands"] = indicators.bollinger_bands(raw=True)
+        for n in (5, 10, 20, 50, 100, 200):
+            if getattr(selection, f"is_ma{n}"):
+                columns[f"ma{n}"] = indicators.ma(n, raw=True)
 
-        return IndicatorsDto(
-            rsi=indicators.rsi() if request.is_rsi else None,
-            stoch=indicators.stoch() if request.is_stoch else None,
-            stoch_rsi=indicators.stoch_rsi() if request.is_stoch_rsi else None,
-            macd=indicators.macd() if request.is_macd else None,
-            adx=indicators.adx() if request.is_adx else None,
-            williams_r=indicators.williams_r() if request.is_williams_r else None,
-            cci=indicators.cci() if request.is_cci else None,
-            atr=indicators.atr() if request.is_atr else None,
-            highs_lows=indicators.highs_lows() if request.is_highs_lows else None,
-            ultimate_oscillator=indicators.ultimate_oscillator() if request.is_ultimate_oscillator else None,
-            roc=indicators.roc() if request.is_roc else None,
-            bull_bear_power=indicators.bull_bear_power() if request.is_bull_bear_power else None,
-            bollinger_bands=indicators.bollinger_bands() if request.is_bollinger_bands else None,
-            ma5=indicators.ma(5) if request.is_ma5 else None,
-            ma10=indicators.ma(10) if request.is_ma10 else None,
-            ma20=indicators.ma(20) if request.is_ma20 else None,
-            ma50=indicators.ma(50) if request.is_ma50 else None,
-            ma100=indicators.ma(100) if request.is_ma100 else None,
-            ma200=indicators.ma(200) if request.is_ma200 else None,
-        )
+        fields = selection.fields or {}
+        for name, result in columns.items():
+            if isinstance(result, dict):
+                keep = fields.get(name)
+                columns[name] = {
+                    field: arr[:last_n] for field, arr in result.items() if keep is None or field in keep}
+            else:
+                columns[name] = result[:last_n]
+        return columns
@@ -0,0 +1,181 @@
+import json
+import os
+from typing import Any, AsyncIterator, BinaryIO, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.analyst import KlineSeries
+from src.core.exceptions import UnsupportedMediaType
+from src.obj import OHLCV_COLUMNS, to_kline_series
+
+CSV = "csv"
+PARQUET = "parquet"
+
+# 文件扩展名 / Content-Type -> 文件格式，扩展名优先（浏览器上传 parquet 时通常是 application/octet-stream）
+_EXTENSIONS = {
+    ".csv": CSV,
+    ".parquet": PARQUET,
+    ".pq": PARQUET,
+}
+_CONTENT_TYPES = {
+    "text/csv": CSV,
+    "application/csv": CSV,
+    "application/vnd.apache.parquet": PARQUET,
+    "application/x-parquet": PARQUET,
+}
+MEDIA_TYPES = {
+    CSV: "text/csv",
+    PARQUET: "application/vnd.apache.parquet",
+}
+
+# 常见导出文件中的列名别名
+_ALIASES = {
+    "time": "timestamp",
+    "date": "timestamp",
+    "datetime": "timestamp",
+    "open_time": "timestamp",
+    "vol": "volume",
+}
+
+# 每次解析的行数，内存中只保留列式数组，不会一次性构建整个 DataFrame
+CHUNK_ROWS = 100_000
+
+# NDJSON k线单行的最大字节数，超过时视为格式错误，避免没有换行的请求体占满内存
+MAX_LINE_BYTES = 4096
+
+
+# 根据文件名和 Content-Type 判断文件格式，parquet 需要安装 pyarrow
+def file_kind(filename: Optional[str], content_type: Optional[str]) -> str:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    kind = _EXTENSIONS.get(os.path.splitext(filename or "")[1].lower()) or _CONTENT_TYPES.get(media_type)
+    if kind is None:
+        raise UnsupportedMediaType(media_type or filename or "")
+    if kind == PARQUET:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise UnsupportedMediaType(MEDIA_TYPES[PARQUET])
+    return kind
+
+
+# 分块读取 CSV/Parquet 文件中的k线，按时间升序返回 KlineSeries；超过 max_rows 行时在读完之前报错
+def read_klines(file: BinaryIO, kind: str, max_rows: int) -> KlineSeries:
+    chunks: dict[str, list[np.ndarray]] = {name: [] for name in OHLCV_COLUMNS}
+    batches = _read_parquet(file, max_rows) if kind == PARQUET else _read_csv(file)
+    rows = 0
+    for batch in batches:
+        rows += len(batch["timestamp"])
+        if rows > max_rows:
+            raise ValueError(f"k线数量不能大于 {max_rows} 个")
+        for name in OHLCV_COLUMNS:
+            chunks[name].append(batch[name])
+    if rows == 0:
+        raise ValueError("文件中没有k线")
+    # 导出的k线可能是倒序的，排序后再整体校验
+    return to_kline_series({name: np.concatenate(values) for name, values in chunks.items()}, sort=True)
+
+
+# 逐块读取 NDJSON 请求体，每行一根 ccxt 格式的k线，每 chunk_rows 行返回一次原始行，不会缓存整个请求体
+async def read_ndjson_lines(body: AsyncIterator[bytes], chunk_rows: int, max_rows: int) -> AsyncIterator[list[bytes]]:
+    buffer = b""
+    lines: list[bytes] = []
+    rows = 0
+    async for data in body:
+        buffer += data
+        *complete, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f"k线单行不能大于 {MAX_LINE_BYTES} 字节")
+        for line in complete:
+            if not line.strip():
+                continue
+            lines.append(line)
+            rows += 1
+            if rows > max_rows:
+                raise ValueError(f"k线数量不能大于 {max_rows} 个")
+            if len(lines) == chunk_rows:
+                yield lines
+                lines = []
+    if buffer.strip():
+        rows += 1
+        if rows > max_rows:
+            raise ValueError(f"k线数量不能大于 {max_rows} 个")
+        lines.append(buffer)
+    if lines:
+        yield lines
+
+
+# 整体解析一块 NDJSON k线行：拼接为一个 JSON 数组后只调用一次 json.loads，再整体校验
+def parse_ndjson_lines(lines: list[bytes]) -> KlineSeries:
+    try:
+        ohlcv = json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError as e:
+        raise ValueError("每行必须是 [timestamp, open, high, low, close, volume] 格式的 JSON") from e
+    return to_kline_series(ohlcv)
+
+
+def _column_name(name: Any) -> str:
+    name = str(name).strip().lower()
+    return _ALIASES.get(name, name)
+
+
+# 找到 OHLCV 列对应的原始列名
+def _find_columns(names: list[Any]) -> dict[str, Any]:
+    columns = {}
+    for name in names:
+        column = _column_name(name)
+        if column in OHLCV_COLUMNS:
+            if column in columns:
+                raise ValueError(f"列重复：{columns[column]}、{name}")
+            columns[column] = name
+    missing = [name for name in OHLCV_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"缺少列：{', '.join(missing)}")
+    return columns
+
+
+def _read_csv(file: BinaryIO):
+    header = pd.read_csv(file, nrows=0).columns.tolist()
+    file.seek(0)
+    columns = _find_columns(header)
+    reader = pd.read_csv(file, usecols=list(columns.values()), chunksize=CHUNK_ROWS, float_precision="round_trip")
+    for frame in reader:
+        batch = {name: frame[column].to_numpy() for name, column in columns.items()}
+        if not pd.api.types.is_numeric_dtype(frame[columns["timestamp"]]):
+            batch["timestamp"] = _datetime_ms(frame[columns["timestamp"]])
+        yield batch
+
+
+def _read_parquet(file: BinaryIO, max_rows: int):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(file)
+    # parquet 的行数在元数据中，不用读取数据就可以拒绝过大的文件
+    if parquet.metadata.num_rows > max_rows:
+        raise ValueError(f"k线数量不能大于 {max_rows} 个")
+    columns = _find_columns(parquet.schema_arrow.names)
+    for record_batch in parquet.iter_batches(batch_size=CHUNK_ROWS, columns=list(columns.values())):
+        batch = {}
+        for name, source in columns.items():
+            column = record_batch.column(source)
+            if name == "timestamp" and (pa.types.is_timestamp(column.type) or pa.types.is_date(column.type)):
+                tz = column.type.tz if pa.types.is_timestamp(column.type) else None
+                column = pc.cast(pc.cast(column, pa.timestamp("ms", tz=tz), safe=False), pa.int64())
+            elif name == "timestamp" and pa.types.is_string(column.type):
+                batch[name] = _datetime_ms(column.to_pandas())
+                continue
+            batch[name] = column.to_numpy(zero_copy_only=False)
+        yield batch
+
+
+# 日期时间文本转换为毫秒时间戳，没有时区时视为 UTC
+def _datetime_ms(values: pd.Series) -> np.ndarray:
+    try:
+        values = pd.to_datetime(values, utc=True)
+    except (ValueError, TypeError) as e:
+        raise ValueError("timestamp 必须是毫秒时间戳或日期时间") from e
+    if values.isna().any():
+        raise ValueError("timestamp 不能为空")
+    return values.dt.tz_convert(None).to_numpy().astype("datetime64[ms]").astype(np.int64)
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import time
+import traceback
+from typing import Any, AsyncIterator, Iterable, Optional
+
+import numpy as np
+from ccxt.pro import okx as okx_pro
+from injector import singleton
+
+from src.core import settings
+
+
+# 固定长度的k线环形缓冲区
+class CandleRingBuffer:
+    def __init__(self, size: int):
+        self.size = size
+        self._timestamps = np.zeros(size, dtype=np.int64)
+        self._values = np.zeros((size, 5), dtype=np.float64)  # open, high, low, close, volume
+        self._start = 0
+        self._count = 0
+        self.updated_at = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    # 最新一根k线的时间戳
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        if self._count == 0:
+            return None
+        return int(self._timestamps[(self._start + self._count - 1) % self.size])
+
+    # 写入k线，时间戳相同则覆盖（未收盘k线的更新），更新的时间戳则追加
+    def upsert(self, ohlcv: list):
+        timestamp = int(ohlcv[0])
+        last_timestamp = self.last_timestamp
+        if last_timestamp is None or timestamp > last_timestamp:
+            if self._count < self.size:
+                idx = (self._start + self._count) % self.size
+                self._count += 1
+            else:
+                idx = self._start
+                self._start = (self._start + 1) % self.size
+        else:
+            # 修订历史k线，只处理缓冲区内已存在的时间戳
+            order = (self._start + np.arange(self._count)) % self.size
+            pos = int(np.searchsorted(self._timestamps[order], timestamp))
+            if pos >= self._count or self._timestamps[order[pos]] != timestamp:
+                return
+            idx = int(order[pos])
+        self._timestamps[idx] = timestamp
+        self._values[idx] = ohlcv[1:6]
+        self.updated_at = time.time()
+
+    # 按时间升序返回最新的 limit 根k线
+    def tail(self, limit: int) -> tuple[np.ndarray, np.ndarray]:
+        limit = min(limit, self._count)
+        order = (self._start + np.arange(self._count - limit, self._count)) % self.size
+        return self._timestamps[order], self._values[order]
+
+
+# 本地回放数据源，用于测试或离线复现
+class ReplayStreamSource:
+    """
+    events 中每一项为一个事件：
+        {"type": "ohlcv", "symbol": "BTC/USDT:USDT", "timeframe": "5m", "data": [[timestamp, o, h, l, c, v], ...]}
+        {"type": "ticker", "symbol": "BTC/USDT:USDT", "last": 100000.0}
+    """
+
+    def __init__(self, events: Iterable[dict[str, Any]], delay: float = 0):
+        self._events = events
+        self._delay = delay
+
+    # 从 jsonl 文件读取事件
+    @classmethod
+    def from_file(cls, path: str, delay: float = 0) -> "ReplayStreamSource":
+        with open(path, encoding="utf-8") as f:
+            return cls([json.loads(line) for line in f if line.strip()], delay)
+
+    async def events(self) -> AsyncIterator[dict[str, Any]]:
+        for event in self._events:
+            yield event
+            await asyncio.sleep(self._delay)
+
+    async def close(self):
+        pass
+
+
+# okx WebSocket 数据源，订阅 k线 和 ticker 频道
+class OkxStreamSource:
+    def __init__(self, exchange: okx_pro, symbols: list[str], timeframes: list[str], history: int = 300):
+        self._exchange = exchange
+        self._symbols = symbols
+        self._timeframes = timeframes
+        self._history = history
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    async def events(self) -> AsyncIterator[dict[str, Any]]:
+        for symbol in self._symbols:
+            self._tasks.append(asyncio.create_task(self._watch_ticker(symbol)))
+            for timeframe in self._timeframes:
+                self._tasks.append(asyncio.create_task(self._watch_ohlcv(symbol, timeframe)))
+        while True:
+            yield await self._queue.get()
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._exchange.close()
+
+    async def _watch_ohlcv(self, symbol: str, timeframe: str):
+        seeded = False
+        while True:
+            try:
+                # 订阅前先通过 REST 补齐历史k线，断线重连时也重新补齐
+                if not seeded:
+                    data = await self._exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=self._history)
+                    self._queue.put_nowait({"type": "ohlcv", "symbol": symbol, "timeframe": timeframe, "data": data})
+                    seeded = True
+                data = await self._exchange.watch_ohlcv(symbol, timeframe)
+                self._queue.put_nowait({"type": "ohlcv", "symbol": symbol, "timeframe": timeframe, "data": data})
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                seeded = False
+                await asyncio.sleep(5)
+
+    async def _watch_ticker(self, symbol: str):
+        while True:
+            try:
+                ticker = await self._exchange.watch_ticker(symbol)
+                self._queue.put_nowait({"type": "ticker", "symbol": symbol, "last": ticker["last"]})
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                await asyncio.sleep(5)
+
+
+# 实时k线存储，由后台数据流持续更新，读取时无需网络请求
+@singleton
+class LiveCandleStore:
+    def __init__(self):
+        self._buffers: dict[tuple[str, str], CandleRingBuffer] = {}
+        self._last_prices: dict[str, tuple[float, float]] = {}
+        self._source = None
+        self._task: Optional[asyncio.Task] = None
+
+    # 是否在运行
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # 根据配置的关注列表启动 okx 数据流，未配置关注列表时不启动
+    async def start_from_settings(self):
+        symbols = [s.strip() for s in settings.LIVE_WATCHLIST.split(",") if s.strip()]
+        timeframes = [t.strip() for t in settings.LIVE_TIMEFRAMES.split(",") if t.strip()]
+        if len(symbols) <= 0 or len(timeframes) <= 0:
+            return
+        exchange = okx_pro({
+            'apiKey': settings.OKX_API_KEY,
+            'secret': settings.OKX_SECRET,
+            'aiohttp_trust_env': True,
+        })
+        self.start(OkxStreamSource(exchange, symbols, timeframes, min(settings.LIVE_BUFFER_SIZE, 300)))
+
+    # 启动后台任务消费数据源
+    def start(self, source):
+        if self.running:
+            raise RuntimeError("实时k线存储已经在运行")
+        self._source = source
+        self._task = asyncio.create_task(self.consume(source))
+
+    # 停止后台任务
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._source is not None:
+            await self._source.close()
+            self._source = None
+
+    # 消费数据源直到结束
+    async def consume(self, source):
+        async for event in source.events():
+            self.apply(event)
+
+    # 应用一个数据事件
+    def apply(self, event: dict[str, Any]):
+        if event["type"] == "ohlcv":
+            key = (event["symbol"], event["timeframe"])
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = CandleRingBuffer(settings.LIVE_BUFFER_SIZE)
+                self._buffers[key] = buffer
+            for item in sorted(event["data"], key=lambda k: k[0]):
+                buffer.upsert(item)
+        elif event["type"] == "ticker":
+            if event.get("last") is not None:
+                self._last_prices[event["symbol"]] = (float(event["last"]), time.time())
+
+    # 读取k线（ccxt ohlcv 格式），数据不足或已过期时返回 None
+    def get_ohlcv(self, symbol: str, timeframe: str, limit: int) -> Optional[list[list]]:
+        buffer = self._buffers.get((symbol, timeframe))
+        if buffer is None or len(buffer) < limit or self._is_stale(buffer.updated_at):
+            return None
+        timestamps, values = buffer.tail(limit)
+        return [[ts, *row] for ts, row in zip(timestamps.tolist(), values.tolist())]
+
+    # 读取最新价，没有或已过期时返回 None
+    def get_last_price(self, symbol: str) -> Optional[float]:
+        cached = self._last_prices.get(symbol)
+        if cached is None or self._is_stale(cached[1]):
+            return None
+        return cached[0]
+
+    @staticmethod
+    def _is_stale(updated_at: float) -> bool:
+        return time.time() - updated_at > settings.LIVE_STALE_SECONDS
@@ -0,0 +1,80 @@
+from typing import Any, Optional
+
+from src.analyst import Direction
+
+# 票数相同时按此顺序选择信号
+SIGNALS = ("buy", "sell", "hold")
+
+# 信心加权投票时每个结果的票数
+CONFIDENCE_WEIGHTS = {"high": 1.0, "medium": 2 / 3, "low": 1 / 3}
+
+
+class MajorityVote:
+    """
+    多次分析结果的增量投票，票数最多的信号胜出，票数相同时按 buy、sell、hold 的顺序选择，
+    返回胜出信号中最先得到的结果。
+
+    - 不传 quorum 时每个结果 1 票，剩余结果全部投给任一其他信号都无法改变胜出信号时即可确定结果，
+      与等待全部结果的结论相同。
+    - 传入 quorum（0~1）时按信心加权（high 1 票、medium 2/3 票、low 1/3 票），
+      胜出信号的票数达到 quorum * total 时也提前确定结果。
+    """
+
+    def __init__(self, total: int, quorum: Optional[float] = None):
+        if total <= 0:
+            raise ValueError("total 值不能小于等于 0")
+        if quorum is not None and not 0 < quorum <= 1:
+            raise ValueError("quorum 值必须在 0 到 1 之间")
+        self.total = total
+        self.quorum = quorum
+        self.count = 0
+        self._votes = {signal: 0.0 for signal in SIGNALS}
+        self._first: dict[str, Direction] = {}
+
+    # 加入一个分析结果
+    def add(self, direction: Direction):
+        signal = direction.signal if direction.signal in self._votes else "hold"
+        weight = CONFIDENCE_WEIGHTS.get(direction.confidence, 1.0) if self.quorum is not None else 1.0
+        self._votes[signal] += weight
+        self._first.setdefault(signal, direction)
+        self.count += 1
+
+    # 当前领先的信号
+    def leader(self) -> str:
+        return max(SIGNALS, key=lambda signal: (self._votes[signal], -SIGNALS.index(signal)))
+
+    # 结果是否已经确定，剩余的分析不会改变胜出信号
+    def decided(self) -> bool:
+        if self.count == 0:
+            return False
+        if self.count >= self.total:
+            return True
+        leader = self.leader()
+        if self.quorum is not None and self._votes[leader] >= self.quorum * self.total:
+            return True
+        # 剩余结果每个最多 1 票
+        remaining = self.total - self.count
+        for signal in SIGNALS:
+            if signal == leader:
+                continue
+            best = self._votes[signal] + remaining
+            if best > self._votes[leader] or (
+                    best == self._votes[leader] and SIGNALS.index(signal) < SIGNALS.index(leader)):
+                return False
+        return True
+
+    # 胜出信号中最先得到的结果
+    def result(self) -> Direction:
+        if self.count == 0:
+            raise ValueError("没有可以投票的分析结果")
+        return self._first[self.leader()]
+
+    # 投票进度
+    def progress(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "votes": {signal: round(votes, 4) for signal, votes in self._votes.items()},
+            "leader": self.leader() if self.count > 0 else None,
+            "decided": self.decided(),
+        }
@@ -0,0 +1,129 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from ccxt.async_support import okx
+from injector import inject, singleton
+
+from src.analyst import KlineSeries
+from src.core import SingleFlight, settings
+from src.obj import ExchangeStatsDto, SingleFlightStatsDto, CandleCacheStatsDto
+from .candle_cache import CandleCache
+from .live_candle_store import LiveCandleStore
+
+
+# okx 行情数据，所有对交易所行情接口的调用都经过这里
+@singleton
+class OkxMarketService:
+    @inject
+    def __init__(self, exchange: okx, live_store: LiveCandleStore):
+        self._exchange = exchange
+        self._live_store = live_store
+        self._ohlcv_flight = SingleFlight()
+        self._candle_caches: dict[tuple[str, str], CandleCache] = {}
+        self._series: dict[tuple[str, str, int], tuple[tuple, KlineSeries]] = {}
+        self._cache_hits = 0
+        self._delta_fetches = 0
+        self._full_fetches = 0
+        self._ticker_flight = SingleFlight()
+        self._last_prices: dict[str, tuple[float, int]] = {}
+        self._ticker_cache_hits = 0
+        self._live_ohlcv_hits = 0
+        self._live_ticker_hits = 0
+
+    # 请求作用域，作用域内相同的行情请求只会调用一次交易所接口
+    @staticmethod
+    @contextmanager
+    def request_scope() -> Iterator[None]:
+        with SingleFlight.scope():
+            yield
+
+    # 获取k线，并发的相同 (symbol, timeframe, limit) 请求共享同一次调用
+    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 300) -> list[list]:
+        # 优先读取实时k线存储
+        ohlcv = self._live_store.get_ohlcv(symbol, timeframe, limit)
+        if ohlcv is not None:
+            self._live_ohlcv_hits += 1
+            return ohlcv
+        return await self._ohlcv_flight.do(
+            ("fetch_ohlcv", symbol, timeframe, limit),
+            lambda: self._fetch_ohlcv(symbol, timeframe, limit),
+        )
+
+    # 获取列式k线，k线没有变化时返回同一个 KlineSeries，使其上的指标缓存可以跨请求复用
+    async def fetch_klines(self, symbol: str, timeframe: str, limit: int = 300) -> KlineSeries:
+        ohlcv = await self.fetch_ohlcv(symbol, timeframe, limit)
+        # 除最新一根外的k线都已收盘，数量、首尾时间戳和最新一根k线相同即视为相同
+        fingerprint = (len(ohlcv), ohlcv[0][0], tuple(ohlcv[-1])) if ohlcv else ()
+        cached = self._series.get((symbol, timeframe, limit))
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        series = KlineSeries.from_ohlcv(ohlcv)
+        self._series[(symbol, timeframe, limit)] = (fingerprint, series)
+        return series
+
+    async def _fetch_ohlcv(self, symbol: str, timeframe: str, limit: int) -> list[list]:
+        if not settings.OHLCV_CACHE_ENABLED:
+            return await self._exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+
+        cache = self._candle_cache(symbol, timeframe, limit)
+        now = self._exchange.milliseconds()
+        if cache.is_fresh(now, limit):
+            self._cache_hits += 1
+            return cache.tail(limit)
+
+        delta_limit = cache.delta_limit(now, limit)
+        if delta_limit is None:
+            self._full_fetches += 1
+            ohlcv = await self._exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+            cache.replace(ohlcv, now)
+        else:
+            # 从最新一根k线（可能未收盘）开始增量拉取
+            self._delta_fetches += 1
+            ohlcv = await self._exchange.fetch_ohlcv(
+                symbol, timeframe=timeframe, since=cache.last_timestamp, limit=delta_limit + 1)
+            cache.merge(ohlcv, now)
+        return cache.tail(limit)
+
+    # 获取最新价，短时间内的重复请求共享同一个价格快照
+    async def fetch_last_price(self, symbol: str) -> float:
+        price = self._live_store.get_last_price(symbol)
+        if price is not None:
+            self._live_ticker_hits += 1
+            return price
+        cached = self._last_prices.get(symbol)
+        if cached is not None and self._exchange.milliseconds() - cached[1] < settings.TICKER_CACHE_TTL * 1000:
+            self._ticker_cache_hits += 1
+            return cached[0]
+        return await self._ticker_flight.do(("fetch_ticker", symbol), lambda: self._fetch_last_price(symbol))
+
+    async def _fetch_last_price(self, symbol: str) -> float:
+        ticker = await self._exchange.fetch_ticker(symbol)
+        price = float(ticker["last"])
+        self._last_prices[symbol] = (price, self._exchange.milliseconds())
+        return price
+
+    def _candle_cache(self, symbol: str, timeframe: str, limit: int) -> CandleCache:
+        cache = self._candle_caches.get((symbol, timeframe))
+        if cache is None:
+            timeframe_seconds = self._exchange.parse_timeframe(timeframe)
+            ttl_seconds = max(1, min(timeframe_seconds // 60, settings.OHLCV_CACHE_MAX_TTL))
+            cache = CandleCache(timeframe_seconds * 1000, ttl_seconds * 1000, limit)
+            self._candle_caches[(symbol, timeframe)] = cache
+        cache.capacity = max(cache.capacity, limit)
+        return cache
+
+    # 请求合并与缓存统计
+    def stats(self) -> ExchangeStatsDto:
+        return ExchangeStatsDto(
+            fetch_ohlcv=SingleFlightStatsDto(**self._ohlcv_flight.stats()),
+            ohlcv_cache=CandleCacheStatsDto(
+                hits=self._cache_hits,
+                delta_fetches=self._delta_fetches,
+                full_fetches=self._full_fetches,
+                entries=len(self._candle_caches),
+            ),
+            fetch_ticker=SingleFlightStatsDto(**self._ticker_flight.stats()),
+            ticker_cache_hits=self._ticker_cache_hits,
+            live_ohlcv_hits=self._live_ohlcv_hits,
+            live_ticker_hits=self._live_ticker_hits,
+        )
@@ -0,0 +1,46 @@
+import time
+
+from src.analyst.indicators import Indicators
+from test.fixtures import random_series
+
+# 参与测试的指标：名称 -> 调用参数
+INDICATORS = {
+    "rsi": (14,),
+    "stoch": (9, 1),
+    "stoch_rsi": (14, 5, 3, 3),
+    "macd": (12, 26, 9),
+    "adx": (14,),
+    "williams_r": (14,),
+    "cci": (14,),
+    "atr": (14,),
+    "highs_lows": (14,),
+    "ultimate_oscillator": (),
+    "roc": (9,),
+    "bull_bear_power": (13,),
+    "bollinger_bands": (20, 2, 2),
+}
+
+
+# 单次调用耗时（毫秒），取多次运行的最小值
+def per_call_ms(fn, budget: float = 0.5) -> float:
+    best = float("inf")
+    deadline = time.perf_counter() + budget
+    runs = 0
+    while runs < 3 or (time.perf_counter() < deadline and runs < 1000):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+        runs += 1
+    return best * 1000
+
+
+if __name__ == '__main__':
+    for size in (300, 10_000, 1_000_000):
+        indicators = Indicators(random_series(size))
+        print("=" * 25, f"{size} 根k线（单次调用耗时 ms）", "=" * 25)
+        print(f"{'indicator':<22}{'list':>12}{'raw':>12}{'speedup':>10}")
+        for name, args in INDICATORS.items():
+            method = getattr(indicators, name)
+            list_ms = per_call_ms(lambda: method(*args))
+            raw_ms = per_call_ms(lambda: method(*args, raw=True))
+            print(f"{name:<22}{list_ms:>12.3f}{raw_ms:>12.3f}{list_ms / raw_ms:>9.1f}x")
@@ -0,0 +1,34 @@
+import json
+from typing import ClassVar, Optional
+
+from pydantic import Field
+
+from src.obj import CalculateIndicatorsRequest, KlineDto
+from test.benchmark_indicators import per_call_ms
+from test.fixtures import request_bodies
+
+
+# 不限制k线数量的请求模型，用于比较大序列下各格式的解析耗时
+class LargeRequest(CalculateIndicatorsRequest):
+    MAX_KLINES: ClassVar[int] = 1_000_000
+
+    kline_list: Optional[list[KlineDto]] = Field(default=None, max_length=1_000_000)
+
+
+# 与 FastAPI 解析请求体的过程一致：json.loads -> 校验请求模型 -> 转换为 KlineSeries
+def parse(body: bytes):
+    return LargeRequest.model_validate(json.loads(body)).kline_series()
+
+
+if __name__ == '__main__':
+    for size in (300, 10_000, 100_000):
+        bodies = request_bodies(size)
+        print("=" * 20, f"{size} 根k线（请求解析耗时 ms）", "=" * 20)
+        print(f"{'format':<14}{'bytes':>12}{'json':>10}{'validate':>10}{'total':>10}{'speedup':>10}")
+        base_ms = None
+        for name, body in bodies.items():
+            json_ms = per_call_ms(lambda: json.loads(body))
+            parse_ms = per_call_ms(lambda: parse(body))
+            base_ms = base_ms or parse_ms
+            print(f"{name:<14}{len(body):>12}{json_ms:>10.3f}{parse_ms - json_ms:>10.3f}{parse_ms:>10.3f}"
+                  f"{base_ms / parse_ms:>9.1f}x")
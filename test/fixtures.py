@@ -0,0 +1,87 @@
+import asyncio
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+from openai import BadRequestError
+
+from src.analyst.indicators import KlineSeries
+
+
+# 随机游走生成k线
+def random_series(size: int, seed: int = 0) -> KlineSeries:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.003, size)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.003, size)))
+    volume = rng.uniform(0, 1000, size)
+    timestamp = 1700000000000 + np.arange(size, dtype=np.int64) * 60000
+    return KlineSeries(timestamp, open_, high, low, close, volume)
+
+
+# 三种请求格式的请求体
+def request_bodies(size: int) -> dict[str, bytes]:
+    series = random_series(size)
+    columns = {
+        "timestamp": series.timestamp.tolist(),
+        "open": series.open.tolist(),
+        "high": series.high.tolist(),
+        "low": series.low.tolist(),
+        "close": series.close.tolist(),
+        "volume": series.volume.tolist(),
+    }
+    rows = [list(row) for row in zip(*columns.values())]
+    klines = [dict(zip(columns.keys(), row)) for row in rows]
+    return {
+        "kline_list": json.dumps({"kline_list": klines, "is_rsi": True}).encode(),
+        "ohlcv": json.dumps({"ohlcv": rows, "is_rsi": True}).encode(),
+        "columns": json.dumps({"ohlcv": columns, "is_rsi": True}).encode(),
+    }
+
+
+SIGNALS = ["buy", "sell", "buy", "hold", "buy"]
+
+
+class FakeOpenAI:
+    def __init__(self, base_url: str, supports_n: bool = True, error: str = "n is not supported"):
+        self.base_url = base_url
+        self.api_key = "key"
+        self.supports_n = supports_n
+        self.error = error  # 不支持 n 参数时的错误信息
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        n = kwargs.get("n", 1)
+        if n > 1 and not self.supports_n:
+            request = httpx.Request("POST", f"{self.base_url}/chat/completions")
+            raise BadRequestError(self.error, response=httpx.Response(400, request=request), body=None)
+        await asyncio.sleep(0.001)
+        # 总结请求返回采样中的第一个，方便校验每次对比使用的采样
+        user = kwargs["messages"][1]["content"]
+        signals = [user[user.index("signal='") + 8:].split("'", 1)[0]] if "多时间框架" in user else SIGNALS
+        choices = [
+            SimpleNamespace(index=i, message=SimpleNamespace(content=json.dumps(
+                {"signal": signals[i % len(signals)], "reason": "test", "confidence": "high", "trend": "rising"})))
+            for i in reversed(range(n))
+        ]
+        return SimpleNamespace(choices=choices)
+
+
+class FakeMarket:
+    def __init__(self):
+        self.series = random_series(300)
+
+    @contextmanager
+    def request_scope(self):
+        yield
+
+    async def fetch_klines(self, symbol, timeframe, limit=300):
+        return self.series
+
+    async def fetch_last_price(self, symbol):
+        return 100.0
@@ -0,0 +1,184 @@
+import asyncio
+import json
+
+import pytest
+
+from src.analyst import Direction
+from src.core import JobStore, NotFound, OpenaiClientPool, settings
+from src.obj import DirectionJobRequest, StopLossProfitJobRequest
+from src.service.analyse_job_service import AnalyseJobService
+
+BASE_URL = "https://llm.example/v1"
+
+
+class FakeDirectionService:
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.calls = []
+        self.cancelled = 0
+
+    async def compare_analyses_by_symbol(self, symbol, timeframes, async_openai, openai_model, **kwargs):
+        self.calls.append((symbol, timeframes, openai_model, kwargs))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if symbol == "FAIL":
+            raise ValueError("symbol值不能为空")
+        return Direction(signal="buy", reason="test", confidence="high", trend="rising")
+
+
+def params(request) -> str:
+    return json.dumps({**request.model_dump(), "openai_base_url": BASE_URL, "openai_model": "model"})
+
+
+def job_service(path, direction_service) -> AnalyseJobService:
+    return AnalyseJobService(JobStore(str(path)), OpenaiClientPool(), direction_service, None)
+
+
+async def wait_done(svc: AnalyseJobService, job_id: str, api_key: str = "key"):
+    for _ in range(200):
+        job = await svc.get(job_id, api_key)
+        if job.status not in ("queued", "running"):
+            return job
+        await asyncio.sleep(0.01)
+    raise TimeoutError(job_id)
+
+
+def test_submit_poll_and_deduplicate(tmp_path):
+    direction = FakeDirectionService()
+    svc = job_service(tmp_path / "jobs.db", direction)
+
+    async def main():
+        await svc.start(2)
+        try:
+            request = DirectionJobRequest(symbol="BTC/USDT:USDT", timeframes=["5m", "1h"], compare=5)
+            first = await svc.submit_direction(request, BASE_URL, "key", "model")
+            # 排队或执行中的相同任务直接返回已有任务
+            same = await svc.submit_direction(request, BASE_URL + "/", "key", "model")
+            other_key = await svc.submit_direction(request, BASE_URL, "other", "model")
+            failed = await svc.submit_direction(DirectionJobRequest(symbol="FAIL"), BASE_URL, "key", "model")
+            done = await wait_done(svc, first.id)
+            # 刚完成的相同任务复用结果
+            again = await svc.submit_direction(request, BASE_URL, "key", "model")
+            return first, same, other_key, await wait_done(svc, failed.id), done, again, await svc.stats()
+        finally:
+            await svc.stop()
+
+    first, same, other_key, failed, done, again, stats = asyncio.run(main())
+    assert first.status == "queued"
+    assert same.id == first.id
+    assert other_key.id != first.id
+    assert done.status == "succeeded"
+    assert done.result["signal"] == "buy"
+    assert done.params["compare"] == 5
+    assert "key" not in str(done.params)
+    assert again.id == first.id
+    assert failed.status == "failed"
+    assert failed.error == "symbol值不能为空"
+    assert len(direction.calls) == 3
+    assert stats["submitted"] == 3
+    assert stats["deduplicated"] == 2
+    assert stats["statuses"]["succeeded"] == 2
+
+
+def test_cancel_running_job(tmp_path):
+    direction = FakeDirectionService(delay=10)
+    svc = job_service(tmp_path / "jobs.db", direction)
+
+    async def main():
+        await svc.start(1)
+        try:
+            running = await svc.submit_direction(DirectionJobRequest(), BASE_URL, "key", "model")
+            queued = await svc.submit_direction(DirectionJobRequest(compare=1), BASE_URL, "key", "model")
+            while not direction.calls:
+                await asyncio.sleep(0.01)
+            cancelled = [await svc.cancel(queued.id, "key"), await svc.cancel(running.id, "key")]
+            await asyncio.sleep(0.05)
+            return cancelled, await svc.get(running.id, "key")
+        finally:
+            await svc.stop()
+
+    cancelled, running = asyncio.run(main())
+    assert [job.status for job in cancelled] == ["cancelled", "cancelled"]
+    assert running.status == "cancelled"
+    assert direction.cancelled == 1
+    assert len(direction.calls) == 1
+
+
+def test_restart_recovers_jobs(tmp_path):
+    path = tmp_path / "jobs.db"
+
+    async def interrupted():
+        store = JobStore(str(path))
+        await store.open()
+        server, _ = await store.submit(
+            "a", "direction", params(DirectionJobRequest()), AnalyseJobService._hash(settings.OPENAI_API_KEY),
+            60)
+        await store.claim(server["id"])
+        client, _ = await store.submit(
+            "b", "stop_loss_profit", params(StopLossProfitJobRequest(direction="long")),
+            AnalyseJobService._hash("client"), 60)
+        await store.close()
+        return server["id"], client["id"]
+
+    server_id, client_id = asyncio.run(interrupted())
+    direction = FakeDirectionService()
+    svc = job_service(path, direction)
+
+    async def main():
+        await svc.start(1)
+        try:
+            return await wait_done(svc, server_id, settings.OPENAI_API_KEY), await svc.get(client_id, "client")
+        finally:
+            await svc.stop()
+
+    server, client = asyncio.run(main())
+    assert server.status == "succeeded"
+    assert client.status == "failed"
+
+
+def test_other_api_key_cannot_access_job(tmp_path):
+    direction = FakeDirectionService(delay=10)
+    svc = job_service(tmp_path / "jobs.db", direction)
+
+    async def main():
+        await svc.start(1)
+        try:
+            job = await svc.submit_direction(DirectionJobRequest(), BASE_URL, "key", "model")
+            # 其他 api_key 查询或取消时视为任务不存在
+            for action in (svc.get, svc.cancel):
+                with pytest.raises(NotFound):
+                    await action(job.id, "other")
+            return await svc.get(job.id, "key")
+        finally:
+            await svc.stop()
+
+    assert asyncio.run(main()).status in ("queued", "running")
+    assert JobStore(":memory:")._job._meta.table_name == "analyse_job"
+
+
+def test_migrate_legacy_table(tmp_path):
+    path = str(tmp_path / "jobs.db")
+
+    async def main():
+        store = JobStore(path)
+        await store.open()
+        job, _ = await store.submit("a", "direction", params(DirectionJobRequest()), "hash", 60)
+        await store.close()
+        # 模拟之前的版本：任务保存在 job 表中
+        store._db.connect()
+        store._db.execute_sql('ALTER TABLE "analyse_job" RENAME TO "job"')
+        store._db.close()
+
+        store = JobStore(path)
+        await store.open()
+        try:
+            return job, await store.get(job["id"]), store._db.table_exists("job")
+        finally:
+            await store.close()
+
+    job, migrated, legacy_exists = asyncio.run(main())
+    assert migrated == job
+    assert not legacy_exists
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from openai import BadRequestError
+
+from src.analyst import DirectionAnalyst
+from src.core import LlmScheduler
+from src.service.analyse_okx_service import AnalyseByOkxDirectionService
+from test.fixtures import SIGNALS, FakeMarket, FakeOpenAI, random_series
+
+
+def test_one_request_for_n_samples():
+    client = FakeOpenAI("https://n.example/v1")
+    samples = asyncio.run(DirectionAnalyst().analyse_samples(random_series(300), 100, client, "model", n=5))
+    assert [r.signal for r in samples] == SIGNALS
+    assert len(client.requests) == 1
+    assert client.requests[0]["n"] == 5
+
+
+def test_fallback_to_single_calls():
+    client = FakeOpenAI("https://no-n.example/v1", supports_n=False)
+    scheduler = LlmScheduler()
+
+    async def main():
+        analyst = DirectionAnalyst(scheduler=scheduler)
+        first = await analyst.analyse_samples(random_series(300), 100, client, "model", n=3)
+        # 已知不支持 n 参数的模型直接并发单次调用
+        second = await analyst.analyse_samples(random_series(300), 100, client, "model", n=3)
+        # 同一个服务商的其他模型不受影响
+        other = await analyst.analyse_samples(random_series(300), 100, client, "other", n=2)
+        return first, second, other
+
+    first, second, other = asyncio.run(main())
+    assert len(first) == len(second) == 3
+    assert len(other) == 2
+    assert [r.get("n", 1) for r in client.requests] == [3, 1, 1, 1, 1, 1, 1, 2, 1, 1]
+    assert not scheduler.supports_n("https://no-n.example/v1/", "model")
+    assert scheduler.supports_n("https://other.example/v1", "model")
+
+
+def test_other_bad_requests_are_raised():
+    # 模型名称错误等与 n 参数无关的 400 错误直接抛出，不会关闭该服务商的多采样
+    client = FakeOpenAI("https://typo.example/v1", supports_n=False, error="The model `gtp-4o` does not exist")
+    scheduler = LlmScheduler()
+    with pytest.raises(BadRequestError):
+        asyncio.run(DirectionAnalyst(scheduler=scheduler).analyse_samples(
+            random_series(300), 100, client, "gtp-4o", n=3))
+    assert len(client.requests) == 1
+    assert scheduler.supports_n("https://typo.example/v1", "gtp-4o")
+
+
+def test_batch_compare_sends_indicator_prompt_once_per_timeframe():
+    client = FakeOpenAI("https://batch.example/v1")
+    svc = AnalyseByOkxDirectionService(FakeMarket(), None, None, None, None, None)
+    result = asyncio.run(svc.compare_analyses_by_symbol(
+        "BTC/USDT:USDT", ["5m", "1h"], client, "model", compare=5, batch=True))
+    assert result.signal == "buy"
+    analyse_requests = [r for r in client.requests if r.get("n") == 5]
+    assert len(analyse_requests) == 2
+    # 第 i 次对比总结各周期的第 i 个采样
+    summaries = [r["messages"][1]["content"] for r in client.requests if "n" not in r]
+    assert [user[user.index("signal='") + 8:].split("'", 1)[0] for user in summaries] == SIGNALS
@@ -0,0 +1,31 @@
+from src.service.candle_cache import CandleCache
+
+MINUTE = 60 * 1000
+
+
+def _candles(start: int, count: int, close: float = 1.0) -> list[list]:
+    return [[start + i * MINUTE, 1.0, 2.0, 0.5, close, 10.0] for i in range(count)]
+
+
+def test_fresh_until_forming_candle_closes():
+    cache = CandleCache(MINUTE, 5000, 3)
+    cache.replace(_candles(0, 3), now=2 * MINUTE + 1000)
+    assert cache.is_fresh(2 * MINUTE + 2000, 3)
+    assert not cache.is_fresh(2 * MINUTE + 7000, 3)
+    assert not cache.is_fresh(3 * MINUTE, 3)
+    assert not cache.is_fresh(2 * MINUTE + 2000, 4)
+
+
+def test_merge_replaces_forming_candle_and_appends():
+    cache = CandleCache(MINUTE, 5000, 3)
+    cache.replace(_candles(0, 3), now=2 * MINUTE + 1000)
+    assert cache.delta_limit(3 * MINUTE + 1000, 3) == 2
+    cache.merge(_candles(2 * MINUTE, 2, close=5.0), now=3 * MINUTE + 1000)
+    assert [k[0] for k in cache.tail(3)] == [MINUTE, 2 * MINUTE, 3 * MINUTE]
+    assert [k[4] for k in cache.tail(3)] == [1.0, 5.0, 5.0]
+
+
+def test_large_gap_requires_full_fetch():
+    cache = CandleCache(MINUTE, 5000, 3)
+    cache.replace(_candles(0, 3), now=2 * MINUTE + 1000)
+    assert cache.delta_limit(10 * MINUTE, 3) is None
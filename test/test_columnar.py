@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.core import columnar, NotAcceptable
+
+COLUMNS = {
+    "timestamp": np.array([3, 2, 1], dtype=np.int64),
+    "rsi": np.array([55.5, np.nan, np.nan]),
+    "macd": {"macd": np.array([1.0, 2.0, np.nan]), "signal": np.array([0.5, np.nan, np.nan])},
+}
+EXPECTED = {
+    "timestamp": [3, 2, 1],
+    "rsi": [55.5, None, None],
+    "macd": {"macd": [1.0, 2.0, None], "signal": [0.5, None, None]},
+}
+
+
+def test_negotiate():
+    assert columnar.negotiate("") == columnar.JSON
+    assert columnar.negotiate("*/*") == columnar.JSON
+    assert columnar.negotiate("text/csv, application/x-msgpack;q=0.9, application/json;q=0.5") == columnar.MSGPACK
+    with pytest.raises(NotAcceptable):
+        columnar.negotiate("text/csv")
+
+
+def test_encode_json():
+    assert json.loads(columnar.encode_columns(COLUMNS, columnar.JSON)) == EXPECTED
+
+
+def test_encode_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+    assert msgpack.unpackb(columnar.encode_columns(COLUMNS, columnar.MSGPACK)) == EXPECTED
+
+
+def test_encode_arrow():
+    pa = pytest.importorskip("pyarrow")
+    table = pa.ipc.open_stream(columnar.encode_columns(COLUMNS, columnar.ARROW)).read_all()
+    assert table.column("timestamp").type == pa.int64()
+    assert table.to_pylist()[0] == {"timestamp": 3, "rsi": 55.5, "macd": {"macd": 1.0, "signal": 0.5}}
+    assert table.column("rsi").to_pylist() == EXPECTED["rsi"]
@@ -0,0 +1,48 @@
+import asyncio
+import pickle
+import time
+
+import pytest
+
+from src.analyst import IndicatorsPrompt
+from src.core import CpuExecutor, Throttled
+from test.fixtures import random_series
+
+
+def test_bounded_queue_and_stats():
+    async def main():
+        executor = CpuExecutor("thread", workers=2, max_queue=3)
+        # 2 个执行中 + 3 个排队，第 6 个被拒绝
+        tasks = [asyncio.create_task(executor.run(time.sleep, 0.05)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        queued, active = executor.queued, executor.active
+        with pytest.raises(Throttled):
+            await executor.run(time.sleep, 0)
+        await asyncio.gather(*tasks)
+        executor.shutdown()
+        return executor.stats(), queued, active
+
+    stats, queued, active = asyncio.run(main())
+    assert (queued, active) == (3, 2)
+    assert stats["submitted"] == stats["completed"] == 5
+    assert stats["rejected"] == 1
+    assert stats["max_queued"] == 3
+    assert stats["queued"] == stats["active"] == 0
+    assert stats["max_wait_ms"] >= 40
+
+
+def test_process_pool_builds_same_prompt():
+    series = random_series(300)
+    prompt = IndicatorsPrompt()
+    expected = prompt.all_indicators_prompt(series)
+    # 计算缓存不会随序列一起发送到进程池
+    assert series.memo and pickle.loads(pickle.dumps(series)).memo == {}
+
+    async def main():
+        executor = CpuExecutor("process", workers=1)
+        try:
+            return await executor.run(prompt.all_indicators_prompt, series)
+        finally:
+            executor.shutdown()
+
+    assert asyncio.run(main()) == expected
@@ -0,0 +1,42 @@
+import asyncio
+
+from src.core import CpuExecutor
+from src.obj import BatchCalculateIndicatorsRequest, BatchIndicatorsDto, BatchIndicatorsSeriesRequest, KlineDto
+from src.service import IndicatorsService
+from test.fixtures import random_series
+
+
+def kline_dtos(n: int, seed: int) -> list[KlineDto]:
+    return [KlineDto(**k.model_dump()) for k in random_series(n, seed=seed).to_klines()]
+
+
+def test_batch_keeps_order_and_isolates_errors(monkeypatch):
+    series = [
+        BatchIndicatorsSeriesRequest(name=f"s{i}", kline_list=kline_dtos(100, i), is_rsi=True, is_macd=i % 2 == 0)
+        for i in range(5)
+    ]
+    # 计算失败的序列只影响自己的结果
+    series.insert(2, BatchIndicatorsSeriesRequest(name="bad", kline_list=kline_dtos(7, 9), is_rsi=True))
+    calculate = IndicatorsService._calculate
+
+    def failing_calculate(kline_series, request):
+        if len(kline_series) == 7:
+            raise ValueError("bad series")
+        return calculate(kline_series, request)
+
+    monkeypatch.setattr(IndicatorsService, "_calculate", staticmethod(failing_calculate))
+    request = BatchCalculateIndicatorsRequest(series=series)
+
+    async def main():
+        executor = CpuExecutor("thread", workers=2)
+        try:
+            return await IndicatorsService(executor).calculate_indicators_batch(request)
+        finally:
+            executor.shutdown()
+
+    results = BatchIndicatorsDto.model_validate_json(asyncio.run(main())).results
+    assert [r.name for r in results] == ["s0", "s1", "bad", "s2", "s3", "s4"]
+    assert results[2].indicators is None and results[2].error == "bad series"
+    for item, req in zip(results[:2] + results[3:], series[:2] + series[3:]):
+        assert item.error is None
+        assert item.indicators == IndicatorsService.calculate_indicators(req)
@@ -0,0 +1,23 @@
+import numpy as np
+import talib
+
+from src.analyst.indicators import Indicators
+from test.fixtures import random_series
+
+
+def test_same_series_shares_instance_and_intermediates():
+    series = random_series(300)
+    indicators = Indicators.of(series)
+    assert Indicators.of(series) is indicators
+    assert Indicators.of(indicators) is indicators
+
+    indicators.stoch_rsi(14, 5, 3, 3)
+    assert indicators.rsi(14, raw=True).base is indicators._rsi(14)
+
+
+def test_williams_r_from_shared_highs_lows_matches_talib():
+    series = random_series(1000)
+    series.high[100:120] = series.low[100:120] = series.close[100:120] = 100.0
+    expected = talib.WILLR(series.high, series.low, series.close, timeperiod=14)
+    actual = Indicators(series).williams_r(14, raw=True)[::-1]
+    assert np.array_equal(actual, expected, equal_nan=True)
@@ -0,0 +1,83 @@
+import importlib.util
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.analyst import Indicators
+from src.api.controller import indicators_controller
+from src.service import kline_file
+from test.fixtures import random_series
+
+SERIES = random_series(2500, seed=11)
+FRAME = pd.DataFrame({
+    "Timestamp": SERIES.timestamp,
+    "Open": SERIES.open,
+    "High": SERIES.high,
+    "Low": SERIES.low,
+    "Close": SERIES.close,
+    "Volume": SERIES.volume,
+})
+SELECTION = json.dumps({"is_rsi": True, "is_macd": True, "fields": {"macd": ["hist"]}})
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(indicators_controller, prefix="/api/v1/indicators")
+    return TestClient(app)
+
+
+def _assert_matches(result: pd.DataFrame, last_n: int = None):
+    indicators = Indicators(SERIES)
+    expected_ts = SERIES.timestamp[-last_n:] if last_n else SERIES.timestamp
+    assert list(result.columns) == ["timestamp", "rsi", "macd_hist"]
+    assert result["timestamp"].tolist() == expected_ts.tolist()
+    np.testing.assert_allclose(
+        result["rsi"].to_numpy(), indicators.rsi(raw=True)[::-1][-len(result):], rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(
+        result["macd_hist"].to_numpy(), indicators.macd(raw=True)["hist"][::-1][-len(result):],
+        rtol=1e-9, equal_nan=True)
+
+
+def test_csv_upload():
+    body = FRAME.to_csv(index=False).encode()
+    response = _client().post(
+        "/api/v1/indicators/calculate/file",
+        files={"file": ("klines.csv", body, "text/csv")},
+        data={"selection": SELECTION, "chunk_size": "700"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    _assert_matches(pd.read_csv(io.BytesIO(response.content)))
+
+
+def test_read_csv_datetime_and_descending():
+    frame = FRAME.rename(columns={"Timestamp": "date"})
+    frame["date"] = pd.to_datetime(frame["date"], unit="ms").dt.strftime("%Y-%m-%d %H:%M:%S")
+    body = frame.iloc[::-1].to_csv(index=False).encode()
+    series = kline_file.read_klines(io.BytesIO(body), kline_file.CSV, max_rows=10_000)
+    assert series.timestamp.tolist() == SERIES.timestamp.tolist()
+    np.testing.assert_array_equal(series.close, SERIES.close)
+
+    with pytest.raises(ValueError):
+        kline_file.read_klines(io.BytesIO(body), kline_file.CSV, max_rows=1000)
+    with pytest.raises(ValueError):
+        kline_file.read_klines(io.BytesIO(FRAME.drop(columns="Volume").to_csv().encode()), kline_file.CSV, 10_000)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("pyarrow") is None, reason="pyarrow 未安装")
+def test_parquet_upload():
+    body = io.BytesIO()
+    FRAME.to_parquet(body, index=False)
+    selection = json.dumps({**json.loads(SELECTION), "last_n": 100})
+    response = _client().post(
+        "/api/v1/indicators/calculate/file",
+        files={"file": ("klines.parquet", body.getvalue(), "application/octet-stream")},
+        data={"selection": selection},
+    )
+    assert response.status_code == 200
+    _assert_matches(pd.read_parquet(io.BytesIO(response.content)), last_n=100)
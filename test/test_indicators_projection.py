@@ -0,0 +1,46 @@
+import importlib.util
+import json
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from src.api.middlewares import CompressionMiddleware
+from src.obj import CalculateIndicatorsRequest, KlineDto
+from src.service import IndicatorsService
+from test.fixtures import random_series
+
+KLINES = [KlineDto(**k.model_dump()) for k in random_series(300).to_klines()]
+
+
+def test_last_n_and_fields():
+    flags = {"is_rsi": True, "is_macd": True, "is_bollinger_bands": True}
+    full = IndicatorsService.calculate_indicators(CalculateIndicatorsRequest(kline_list=KLINES, **flags))
+    request = CalculateIndicatorsRequest(
+        kline_list=KLINES, last_n=3, fields={"macd": ["hist"], "bollinger_bands": ["upper_band"]}, **flags)
+    result = json.loads(IndicatorsService.calculate_indicators_json(request))
+
+    assert result["rsi"] == full.rsi[:3]
+    assert result["macd"] == [{"hist": m.hist} for m in full.macd[:3]]
+    assert result["bollinger_bands"] == [{"upper_band": b.upper_band} for b in full.bollinger_bands[:3]]
+    assert result["stoch"] is None
+
+
+def test_compression_middleware():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    body = json.dumps(list(range(1000))).encode()
+
+    @app.get("/data")
+    async def data():
+        return Response(content=body, media_type="application/json")
+
+    client = TestClient(app)
+    # brotli 为可选依赖
+    encodings = ["gzip"] + (["br"] if importlib.util.find_spec("brotli") else [])
+    for encoding in encodings:
+        response = client.get("/data", headers={"Accept-Encoding": encoding})
+        assert response.headers["content-encoding"] == encoding
+        assert response.num_bytes_downloaded < len(body)
+        assert response.content == body
+    response = client.get("/data", headers={"Accept-Encoding": "br;q=0, identity"})
+    assert "content-encoding" not in response.headers
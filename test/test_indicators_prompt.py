@@ -0,0 +1,82 @@
+import pytest
+
+from src.analyst import Indicators, IndicatorsPrompt, KlineSeries, PromptCache, TokenCounter, prompt_size
+from test.fixtures import random_series
+
+
+def test_format_prompt_renders_only_referenced_sections():
+    prompt = IndicatorsPrompt()
+    indicators = Indicators(random_series(300))
+    result = prompt.format_prompt("{{rsi}}\n涨幅 5% {{symbol}}\n{{rsi}}", indicators)
+
+    rsi = prompt.rsi_prompt(indicators.rsi(14, raw=True), 14)
+    assert result == f"{rsi}\n涨幅 5% {{{{symbol}}}}\n{rsi}"
+    # 未引用的指标不会计算
+    assert set(indicators._memo) == {("rsi", 14)}
+
+
+def test_raw_sections_match_list_sections():
+    prompt = IndicatorsPrompt()
+    indicators = Indicators(random_series(300, seed=3))
+    assert prompt.rsi_prompt(indicators.rsi(raw=True), 14) == prompt.rsi_prompt(indicators.rsi(), 14)
+    assert prompt.macd_prompt(indicators.macd(raw=True), 12, 26, 9) == prompt.macd_prompt(indicators.macd(), 12, 26, 9)
+    assert prompt.kline_prompt(indicators.series) == prompt.kline_prompt(indicators.series.to_klines()[::-1])
+
+
+
+
+def test_compact_prompt_is_relative_to_latest_close():
+    series = random_series(300)
+    # 价格量级相差 10000 倍的币种，紧凑编码除基准价外完全一致
+    small = KlineSeries(series.timestamp, series.open * 1e-4, series.high * 1e-4, series.low * 1e-4,
+                        series.close * 1e-4, series.volume)
+    prompt = IndicatorsPrompt(compact=True, depth={"kline": 3})
+    template = "{{kline}}\n{{ma20}}\n{{atr}}\n{{rsi}}"
+    lines = prompt.format_prompt(template, Indicators(series)).split("\n")
+    small_lines = prompt.format_prompt(template, Indicators(small)).split("\n")
+    assert lines[1].startswith(f"基准价 P={series.close[-1]:.6g}")
+    assert "相邻k线间隔 60 秒" in lines[1]
+    assert "单位为 P 的 0.001%" in lines[2]
+    assert [line for i, line in enumerate(lines) if i != 1] == [line for i, line in enumerate(small_lines) if i != 1]
+
+    # 从最新收盘价 P 开始逐根还原k线，误差在一个单位以内
+    rows = [[float(v) for v in line.split(",")] for line in lines[4:7]]
+    assert len(lines[4:lines.index("k 线数据是从上到下排列，上边的是最新数据。")]) == 3
+    unit = series.close[-1] * 1e-5
+    close = series.close[-1]
+    for i, (gap, body, upper, lower, _) in enumerate(rows):
+        open_ = close - body * unit
+        expected = series.take(-1 - i)
+        assert abs(open_ - expected.open) <= 2 * unit
+        assert abs(max(open_, close) + upper * unit - expected.high) <= 3 * unit
+        assert abs(min(open_, close) - lower * unit - expected.low) <= 3 * unit
+        close = open_ - gap * unit
+        assert abs(close - series.close[-2 - i]) <= 3 * unit
+
+
+def test_depth_and_options():
+    indicators = Indicators(random_series(300))
+    prompt = IndicatorsPrompt(depth={"ma200": 5})
+    assert prompt.format_prompt("{{ma200}}", indicators).split("\n")[1].count(",") == 4
+    assert prompt.format_prompt("{{ma5}}", indicators).split("\n")[1].count(",") == 59
+    # 不同编码选项生成的提示词分别缓存
+    series = indicators.series
+    keys = {PromptCache.key(series, "{{ma5}}", p.options)
+            for p in (prompt, IndicatorsPrompt(), IndicatorsPrompt(compact=True), IndicatorsPrompt(compact=True, digits=3))}
+    assert len(keys) == 4
+    with pytest.raises(ValueError):
+        IndicatorsPrompt(depth={"ma7": 5})
+    with pytest.raises(ValueError):
+        IndicatorsPrompt(depth={"kline": 0})
+
+
+def test_prompt_size():
+    series = random_series(300)
+    default = prompt_size(IndicatorsPrompt(), series)
+    compact = prompt_size(IndicatorsPrompt(compact=True, digits=3), series)
+    assert default["tokenizer"] == TokenCounter().name
+    assert compact["tokens"] < default["tokens"]
+    assert set(default["sections"]) == set(compact["sections"])
+    # 各段之和不超过整个提示词（模板中还有段落之间的文字）
+    assert sum(section["chars"] for section in default["sections"].values()) <= default["chars"]
+    assert default["sections"]["kline"]["tokens"] > compact["sections"]["kline"]["tokens"]
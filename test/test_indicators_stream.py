@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.analyst import Indicators, KlineSeries
+from src.api.controller import indicators_controller
+from src.api.middlewares import exception_handler
+from src.core import CpuExecutor
+from src.obj import IndicatorsSelection
+from src.service import IndicatorsService
+from test.fixtures import random_series
+
+
+# NDJSON 请求体，按 piece 字节切分，模拟逐块到达的请求体（切分点可能在一行的中间）
+async def ndjson_body(series: KlineSeries, piece: int = 4096):
+    rows = zip(series.timestamp.tolist(), series.open.tolist(), series.high.tolist(),
+               series.low.tolist(), series.close.tolist(), series.volume.tolist())
+    body = "".join(json.dumps(list(row)) + "\n" for row in rows).encode()
+    for start in range(0, len(body), piece):
+        yield body[start:start + piece]
+
+
+async def collect(body) -> list[bytes]:
+    return [chunk async for chunk in body]
+
+
+def stream(body, selection: IndicatorsSelection, chunk_size: int) -> list[bytes]:
+    async def main():
+        executor = CpuExecutor("thread", workers=2)
+        try:
+            generator = IndicatorsService(executor).calculate_indicators_stream(body, selection, chunk_size)
+            return [chunk async for chunk in generator]
+        finally:
+            executor.shutdown()
+
+    return asyncio.run(main())
+
+
+def test_stream_chunks_match_whole_series():
+    series = random_series(3000, seed=5)
+    selection = IndicatorsSelection(is_rsi=True, is_macd=True, is_adx=True, is_ma200=True)
+    chunks = stream(ndjson_body(series, piece=1000), selection, 700)
+    assert len(chunks) == 5
+    rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert [row["timestamp"] for row in rows] == series.timestamp.tolist()
+    assert set(rows[0]) == {"timestamp", "rsi", "macd", "adx", "ma200"}
+
+    indicators = Indicators(series)
+    expected = {
+        "rsi": indicators.rsi(raw=True)[::-1],
+        "adx": indicators.adx(raw=True)[::-1],
+        "signal": indicators.macd(raw=True)["signal"][::-1],
+        "ma200": indicators.ma(200, raw=True)[::-1],
+    }
+    actual = {
+        "rsi": [row["rsi"] for row in rows],
+        "adx": [row["adx"] for row in rows],
+        "signal": [row["macd"]["signal"] for row in rows],
+        "ma200": [row["ma200"] for row in rows],
+    }
+    for name, values in actual.items():
+        values = np.array([np.nan if v is None else v for v in values])
+        np.testing.assert_allclose(values, expected[name], rtol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_stream_last_n():
+    series = random_series(3000, seed=5)
+    chunks = stream(ndjson_body(series), IndicatorsSelection(is_ma200=True, last_n=1500), 700)
+    rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert [row["timestamp"] for row in rows] == series.timestamp[-1500:].tolist()
+    expected = Indicators(series).ma(200, raw=True)[::-1][-1500:]
+    np.testing.assert_allclose([row["ma200"] for row in rows], expected, rtol=1e-9)
+
+
+def test_stream_rejects_unordered_chunks():
+    series = random_series(20)
+    unordered = series.take(np.r_[10:20, 0:10])
+    with pytest.raises(ValueError, match="严格递增"):
+        stream(ndjson_body(unordered), IndicatorsSelection(is_rsi=True), 10)
+
+    async def invalid():
+        yield b"[1, 1, 1, 1, 1, 1]\n{"
+
+    with pytest.raises(ValueError, match="格式"):
+        stream(invalid(), IndicatorsSelection(is_rsi=True), 10)
+
+
+def test_stream_endpoint_errors():
+    app = FastAPI()
+    app.include_router(indicators_controller, prefix="/api/v1/indicators")
+    app.add_exception_handler(Exception, exception_handler)
+    client = TestClient(app, raise_server_exceptions=False)
+    url = "/api/v1/indicators/calculate/stream"
+    params = {"selection": json.dumps({"is_rsi": True}), "chunk_size": 10}
+
+    # 第一块输出之前出错时返回错误响应
+    response = client.post(url, params=params, content=b"[2, 1, 1, 1, 1, 1]\n[1, 1, 1, 1, 1, 1]\n")
+    assert response.status_code == 417
+    assert "严格递增" in response.json()["message"]
+
+    # 已经开始输出后出错时，错误为最后一行，之前输出的行不受影响
+    series = random_series(30)
+    body = b"".join(asyncio.run(collect(ndjson_body(series)))) + b"[1, 1, 1, 1, 1, 1]\n"
+    response = client.post(url, params=params, content=body)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) > 1
+    assert [line["timestamp"] for line in lines[:-1]] == series.timestamp[:len(lines) - 1].tolist()
+    assert lines[-1]["code"] == 417
@@ -0,0 +1,18 @@
+from src.analyst.indicators import KlineSeries, Kline
+
+
+def test_from_ohlcv_builds_contiguous_columns():
+    series = KlineSeries.from_ohlcv([[2000, 1, 2, 0.5, 1.5, 10], [1000, 1.1, 2.1, 0.6, 1.6, 11]])
+    assert series.timestamp.dtype.name == "int64"
+    assert series.close.dtype.name == "float64"
+    assert series.close.flags["C_CONTIGUOUS"]
+
+    ordered = series.sorted()
+    assert ordered.timestamp.tolist() == [1000, 2000]
+    assert ordered.close.tolist() == [1.6, 1.5]
+    assert ordered.tail(1).timestamp.tolist() == [2000]
+
+
+def test_from_klines_round_trip():
+    klines = [Kline(timestamp=1000 * i, open=i, high=i + 1, low=i - 1, close=i + 0.5, volume=10) for i in range(3)]
+    assert KlineSeries.from_klines(klines).to_klines() == klines
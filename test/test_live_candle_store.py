@@ -0,0 +1,44 @@
+import asyncio
+
+from src.service.live_candle_store import LiveCandleStore, ReplayStreamSource, CandleRingBuffer
+
+MINUTE = 60 * 1000
+
+
+def _candle(i: int, close: float) -> list:
+    return [i * MINUTE, close, close + 1, close - 1, close, 10.0]
+
+
+def test_ring_buffer_wraps_and_revises():
+    buffer = CandleRingBuffer(3)
+    for i in range(5):
+        buffer.upsert(_candle(i, float(i)))
+    buffer.upsert(_candle(4, 40.0))
+    buffer.upsert(_candle(3, 30.0))
+    buffer.upsert(_candle(0, 99.0))
+    timestamps, values = buffer.tail(3)
+    assert timestamps.tolist() == [2 * MINUTE, 3 * MINUTE, 4 * MINUTE]
+    assert values[:, 3].tolist() == [2.0, 30.0, 40.0]
+
+
+def test_store_reads_replayed_stream():
+    events = [
+        {"type": "ohlcv", "symbol": "BTC/USDT:USDT", "timeframe": "1m", "data": [_candle(i, 1.0) for i in range(3)]},
+        {"type": "ohlcv", "symbol": "BTC/USDT:USDT", "timeframe": "1m", "data": [_candle(2, 2.0), _candle(3, 3.0)]},
+        {"type": "ticker", "symbol": "BTC/USDT:USDT", "last": 3.5},
+    ]
+
+    async def main():
+        store = LiveCandleStore()
+        store.start(ReplayStreamSource(events))
+        await asyncio.sleep(0.05)
+        await store.stop()
+        return store
+
+    store = asyncio.run(main())
+    ohlcv = store.get_ohlcv("BTC/USDT:USDT", "1m", 3)
+    assert [k[0] for k in ohlcv] == [MINUTE, 2 * MINUTE, 3 * MINUTE]
+    assert [k[4] for k in ohlcv] == [1.0, 2.0, 3.0]
+    assert store.get_ohlcv("BTC/USDT:USDT", "1m", 10) is None
+    assert store.get_ohlcv("BTC/USDT:USDT", "5m", 3) is None
+    assert store.get_last_price("BTC/USDT:USDT") == 3.5
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.analyst import DirectionAnalyst, KlineSeries, LlmResultCache, StopLossProfitAnalyst
+from test.fixtures import random_series
+
+DIRECTION = {"signal": "buy", "reason": "test", "confidence": "high", "trend": "rising"}
+STOP_LOSS_PROFIT = {"stop_loss": 95, "take_profit": 110, "reason": "test", "confidence": "high"}
+
+
+class FakeOpenAI:
+    def __init__(self, base_url: str = "https://llm.example/v1", api_key: str = "key", content: dict = None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.content = content or DIRECTION
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        message = SimpleNamespace(content=json.dumps(self.content))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+# 最新一根k线还未收盘的 1h k线
+def live_series(size: int = 300) -> KlineSeries:
+    series = random_series(size)
+    hour = 3_600_000
+    last = int(time.time() * 1000) // hour * hour
+    timestamp = last - np.arange(size - 1, -1, -1, dtype=np.int64) * hour
+    return KlineSeries(timestamp, series.open, series.high, series.low, series.close, series.volume)
+
+
+def test_same_candle_reuses_result():
+    cache = LlmResultCache(enabled=True)
+    analyst = DirectionAnalyst(result_cache=cache)
+    client = FakeOpenAI()
+    series = live_series()
+    # 未收盘k线变化、同一价格分档内的新价格不影响缓存
+    close = series.close.copy()
+    close[-1] *= 1.01
+    moved = KlineSeries(series.timestamp, series.open, series.high, series.low, close, series.volume)
+
+    async def main():
+        first = await asyncio.gather(*[analyst.analyse(series, 100, client, "model") for _ in range(3)])
+        second = await analyst.analyse(moved, 99.98, client, "model")
+        other_leverage = await analyst.analyse(series, 100, client, "model", leverage=3)
+        with LlmResultCache.bypass():
+            await asyncio.gather(*[analyst.analyse(series, 100, client, "model") for _ in range(2)])
+        return first, second, other_leverage
+
+    first, second, other_leverage = asyncio.run(main())
+    assert all(r.signal == "buy" for r in [*first, second, other_leverage])
+    assert client.calls == 1 + 1 + 2
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["coalesced"] == 2
+    assert stats["bypassed"] == 2
+
+
+def test_disabled_or_closed_candles_are_not_cached():
+    client = FakeOpenAI()
+
+    async def main():
+        analyst = DirectionAnalyst(result_cache=LlmResultCache(enabled=False))
+        await analyst.analyse(live_series(), 100, client, "model")
+        await analyst.analyse(live_series(), 100, client, "model")
+        # 历史k线的最新一根早已收盘，不缓存
+        analyst = DirectionAnalyst(result_cache=LlmResultCache(enabled=True))
+        await analyst.analyse(random_series(300), 100, client, "model")
+        await analyst.analyse(random_series(300), 100, client, "model")
+
+    asyncio.run(main())
+    assert client.calls == 4
+
+
+def test_direction_prices_in_other_buckets_are_not_shared():
+    analyst = DirectionAnalyst(result_cache=LlmResultCache(enabled=True))
+    client = FakeOpenAI()
+    series = live_series()
+    assert LlmResultCache.price_bucket(100) != LlmResultCache.price_bucket(101)
+
+    async def main():
+        for price in (100, 101, 100):
+            await analyst.analyse(series, price, client, "model")
+
+    asyncio.run(main())
+    assert client.calls == 2
+
+
+def test_callers_and_prices_are_not_shared():
+    cache = LlmResultCache(enabled=True)
+    direction = DirectionAnalyst(result_cache=cache)
+    stop_loss_profit = StopLossProfitAnalyst(result_cache=cache)
+    series = live_series()
+    client = FakeOpenAI()
+    # 同一个模型名称，不同服务商或不同 api_key 的调用方不共享结果
+    others = [FakeOpenAI(base_url="https://other.example/v1"), FakeOpenAI(api_key="other")]
+    sl_client = FakeOpenAI(content=STOP_LOSS_PROFIT)
+
+    async def main():
+        await direction.analyse(series, 100, client, "model")
+        # 同一个服务商和 api_key 的另一个客户端实例命中缓存
+        await direction.analyse(series, 100, FakeOpenAI(base_url="https://llm.example/v1/"), "model")
+        for other in others:
+            await direction.analyse(series, 100, other, "model")
+        # 没有开仓均价时，当前价格相差超过一档重新分析
+        for price in (100.98, 101, 102):
+            await stop_loss_profit.analyse(series, "long", price, sl_client, "model")
+        for price in (100, 101):
+            await stop_loss_profit.analyse(series, "long", price, sl_client, "model", entry_price=98)
+
+    asyncio.run(main())
+    assert client.calls == 1
+    assert [other.calls for other in others] == [1, 1]
+    assert sl_client.calls == 2 + 1
@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+from src.core import LlmScheduler
+
+BASE_URL = "https://llm.example/v1"
+
+
+def test_concurrency_cap_priority_and_fair_queuing():
+    scheduler = LlmScheduler(max_concurrency=1)
+    order = []
+
+    async def call(caller: str, name: str, priority: int = LlmScheduler.PRIORITY_ANALYSE):
+        async with scheduler.slot(BASE_URL, caller, priority):
+            order.append(name)
+            await asyncio.sleep(0.001)
+
+    async def main():
+        # 先占用唯一的名额，其余调用都进入队列
+        blocker = asyncio.create_task(call("a", "blocker"))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(call("a", f"a{i}")) for i in range(3)]
+        tasks += [asyncio.create_task(call("b", f"b{i}")) for i in range(2)]
+        tasks.append(asyncio.create_task(call("b", "summary", LlmScheduler.PRIORITY_SUMMARIZE)))
+        await asyncio.sleep(0)
+        stats = scheduler.stats()["providers"][BASE_URL]
+        assert stats["active"] == 1
+        assert stats["queued"] == 6
+        await asyncio.gather(blocker, *tasks)
+
+    asyncio.run(main())
+    assert order == ["blocker", "summary", "a0", "b0", "a1", "b1", "a2"]
+    stats = scheduler.stats()["providers"][BASE_URL]
+    assert stats["completed"] == 7
+    assert stats["queued"] == 0
+
+
+def test_rate_limit_and_cancel():
+    # 每秒 20 个请求，令牌桶容量等于并发数 2
+    scheduler = LlmScheduler(max_concurrency=2, requests_per_minute=1200)
+
+    async def call():
+        async with scheduler.slot(BASE_URL, "key"):
+            pass
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*[call() for _ in range(6)])
+        elapsed = time.perf_counter() - start
+
+        blocker = LlmScheduler(max_concurrency=1)
+        async with blocker.slot(BASE_URL, "key"):
+            waiting = asyncio.create_task(blocker.slot(BASE_URL, "key").__aenter__())
+            await asyncio.sleep(0)
+            waiting.cancel()
+            await asyncio.sleep(0)
+        stats = blocker.stats()["providers"][BASE_URL]
+        assert stats["cancelled"] == 1
+        assert stats["queued"] == 0
+        assert stats["active"] == 0
+        return elapsed
+
+    # 前 2 个立即执行，其余 4 个每 50ms 补充一个令牌
+    assert asyncio.run(main()) >= 0.18
@@ -0,0 +1,61 @@
+import asyncio
+
+from src.analyst import Direction
+from src.service.analyse_okx_service import AnalyseDirection
+from src.service.majority_vote import MajorityVote
+
+
+def direction(signal: str, confidence: str = "medium") -> Direction:
+    return Direction(signal=signal, reason=signal, confidence=confidence, trend="sideways")
+
+
+def test_decided_only_when_remaining_cannot_change_outcome():
+    vote = MajorityVote(5)
+    vote.add(direction("sell"))
+    vote.add(direction("sell"))
+    assert not vote.decided()
+    vote.add(direction("sell"))
+    assert vote.decided()
+    assert vote.result().signal == "sell"
+
+    # 票数相同时 buy 优先：2 sell + 1 buy 时剩余 1 个结果仍可能让 buy 胜出
+    vote = MajorityVote(4)
+    for signal in ("sell", "buy", "sell"):
+        vote.add(direction(signal))
+    assert not vote.decided()
+    vote.add(direction("buy"))
+    assert vote.result().signal == "buy"
+
+
+def test_weighted_quorum():
+    vote = MajorityVote(5, quorum=0.4)
+    vote.add(direction("buy", "high"))
+    assert not vote.decided()
+    vote.add(direction("buy", "high"))
+    assert vote.decided()
+
+
+def test_compare_analyses_matches_previous_rule():
+    directions = [direction(s) for s in ("hold", "sell", "buy", "sell", "hold")]
+    assert asyncio.run(AnalyseDirection.compare_analyses(directions)).signal == "sell"
+    assert asyncio.run(AnalyseDirection.compare_analyses([direction("hold")])).signal == "hold"
+
+
+def test_vote_analyses_cancels_outstanding_runs():
+    cancelled = []
+
+    async def run(signal: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(signal)
+            raise
+        return direction(signal)
+
+    async def main():
+        return await AnalyseDirection.vote_analyses([
+            run("buy", 0.01), run("buy", 0.02), run("sell", 10), run("buy", 0.03), run("hold", 10)])
+
+    result = asyncio.run(main())
+    assert result.signal == "buy"
+    assert sorted(cancelled) == ["hold", "sell"]
@@ -0,0 +1,33 @@
+import pytest
+from pydantic import ValidationError
+
+from src.obj import CalculateIndicatorsRequest
+from src.service import IndicatorsService
+from test.fixtures import request_bodies
+
+
+def test_compact_formats_match_kline_list():
+    results = [
+        IndicatorsService.calculate_indicators(CalculateIndicatorsRequest.model_validate_json(body))
+        for body in request_bodies(300).values()
+    ]
+    assert results[0].rsi is not None
+    assert results[0] == results[1] == results[2]
+
+
+@pytest.mark.parametrize("ohlcv, message", [
+    ([[2, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1]], "严格递增"),
+    ([[1, 1, 1, 1, 1, float("nan")]], "NaN"),
+    ([[1, 1, 1, 1, 1, "x"]], "数字"),
+    ([[1, 1, 1, 1, 1]], "格式"),
+    ({"timestamp": [1], "open": [1]}, "缺少列"),
+    ([[i, 1, 1, 1, 1, 1] for i in range(301)], "300"),
+])
+def test_invalid_ohlcv(ohlcv, message):
+    with pytest.raises(ValidationError, match=message):
+        CalculateIndicatorsRequest(ohlcv=ohlcv)
+
+
+def test_requires_exactly_one_input():
+    with pytest.raises(ValidationError, match="必须且只能"):
+        CalculateIndicatorsRequest()
@@ -0,0 +1,47 @@
+import asyncio
+
+from src.core import settings
+from src.service.live_candle_store import LiveCandleStore
+from src.service.okx_market_service import OkxMarketService
+
+
+class FakeExchange:
+    def __init__(self):
+        self.now = 1_700_000_000_000
+        self.tickers = 0
+
+    def milliseconds(self) -> int:
+        return self.now
+
+    async def fetch_ticker(self, symbol: str) -> dict:
+        self.tickers += 1
+        await asyncio.sleep(0.01)
+        return {"symbol": symbol, "last": 100.0 + self.tickers}
+
+
+def test_last_price_cached_within_ttl():
+    exchange = FakeExchange()
+    market = OkxMarketService(exchange, LiveCandleStore())
+
+    async def main():
+        # 并发的相同请求共享同一次调用
+        concurrent = await asyncio.gather(*[market.fetch_last_price("BTC/USDT:USDT") for _ in range(5)])
+        # TTL 内的重复请求直接返回缓存
+        exchange.now += settings.TICKER_CACHE_TTL * 1000 - 1
+        repeated = await market.fetch_last_price("BTC/USDT:USDT")
+        calls = exchange.tickers
+        # 过期后重新拉取
+        exchange.now += 1
+        expired = await market.fetch_last_price("BTC/USDT:USDT")
+        return concurrent, repeated, calls, expired
+
+    concurrent, repeated, calls, expired = asyncio.run(main())
+    assert concurrent == [101.0] * 5
+    assert repeated == 101.0
+    assert calls == 1
+    assert expired == 102.0
+    assert exchange.tickers == 2
+    stats = market.stats()
+    assert stats.ticker_cache_hits == 1
+    assert stats.fetch_ticker.calls == 2
+    assert stats.fetch_ticker.hits == 4
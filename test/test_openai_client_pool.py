@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from src.core import OpenaiClientPool
+
+
+def test_reuse_and_evict():
+    async def main():
+        pool = OpenaiClientPool(max_clients=2, idle_seconds=600)
+        async with pool.client("https://a.example/v1/", "key-a") as first:
+            pass
+        async with pool.client("https://a.example/v1", "key-a") as second:
+            assert second is first
+            # 使用中的客户端不会因超出数量被关闭，归还时关闭最久未使用的空闲客户端
+            async with pool.client("https://b.example/v1", "key-a") as other_url:
+                async with pool.client("https://a.example/v1", "key-b") as other_key:
+                    assert len({id(first), id(other_url), id(other_key)}) == 3
+        assert pool.stats()["clients"] == 2
+        assert pool.stats()["evicted"] == 1
+        assert other_key.is_closed()
+        assert not first.is_closed()
+
+        clients = [entry.client for entry in pool._entries.values()]
+        await pool.close()
+        assert all(client.is_closed() for client in clients)
+        return pool.stats()
+
+    stats = asyncio.run(main())
+    assert stats["created"] == 3
+    assert stats["reused"] == 1
+    assert stats["clients"] == 0
+
+
+def test_release_on_error_and_idle_eviction():
+    async def main():
+        pool = OpenaiClientPool(idle_seconds=0)
+        with pytest.raises(RuntimeError):
+            async with pool.client("https://a.example/v1", "key") as client:
+                raise RuntimeError("analysis failed")
+        assert client.is_closed()
+        assert pool.stats()["in_use"] == 0
+        assert pool.stats()["clients"] == 0
+
+    asyncio.run(main())
+
+
+def test_idle_clients_closed_in_background():
+    async def main():
+        pool = OpenaiClientPool(idle_seconds=0.05)
+        pool.start(interval=0.01)
+        async with pool.client("https://a.example/v1", "key") as client:
+            await asyncio.sleep(0.1)
+            # 使用中的客户端不会被关闭
+            assert not client.is_closed()
+        pool.idle_seconds = 600
+        async with pool.client("https://b.example/v1", "key") as idle:
+            pass
+        # 没有新的请求归还客户端，后台任务也会关闭空闲超时的客户端
+        pool.idle_seconds = 0.05
+        await asyncio.sleep(0.1)
+        assert idle.is_closed()
+        assert pool.stats()["clients"] == 0
+        await pool.close()
+        assert pool._reaper is None
+
+    asyncio.run(main())
+
+
+def test_concurrent_evictions_and_reacquire_during_close():
+    async def main():
+        pool = OpenaiClientPool(idle_seconds=600)
+        for url in ("https://a.example/v1", "https://b.example/v1"):
+            async with pool.client(url, "key"):
+                pass
+        old = next(iter(pool._entries.values())).client
+        closing = asyncio.Event()
+        release = asyncio.Event()
+        close = old.close
+
+        async def slow_close():
+            closing.set()
+            await release.wait()
+            await close()
+
+        old.close = slow_close
+        pool.idle_seconds = 0
+        # 两次回收并发执行，不会重复关闭或抛出 KeyError
+        evictions = [asyncio.ensure_future(pool._evict()), asyncio.ensure_future(pool._evict())]
+        await closing.wait()
+        # 关闭还没有完成时再次获取同一个服务商的客户端，得到新的客户端
+        pool.idle_seconds = 600
+        async with pool.client("https://a.example/v1", "key") as client:
+            assert client is not old
+            release.set()
+            await asyncio.gather(*evictions)
+            assert not client.is_closed()
+        assert old.is_closed()
+        assert pool.stats()["evicted"] == 2
+        assert pool.stats()["clients"] == 1
+        await pool.close()
+
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+import asyncio
+
+from src.analyst import IndicatorsPrompt, KlineSeries, PromptCache
+from src.analyst.utils import build_indicators_prompt
+from test.fixtures import random_series
+
+
+def test_same_klines_build_once():
+    series = random_series(300)
+    # 内容相同的另一份k线（例如另一个请求重新拉取的k线）
+    same = KlineSeries.from_klines(series.to_klines())
+    other = random_series(300, seed=1)
+    cache = PromptCache(maxsize=8)
+    prompt = IndicatorsPrompt()
+
+    async def main():
+        return await asyncio.gather(
+            *[build_indicators_prompt(prompt, data, None, cache) for data in (series, series, same, other)])
+
+    results = asyncio.run(main())
+    assert results[0] == results[1] == results[2] == prompt.all_indicators_prompt(series)
+    assert results[3] == prompt.all_indicators_prompt(other)
+    stats = cache.stats()
+    assert stats["lookups"] == 4
+    assert stats["builds"] == 2
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_lru_eviction():
+    cache = PromptCache(maxsize=2)
+
+    async def build(value: str):
+        return value
+
+    async def main():
+        await cache.get_or_build("a", lambda: build("a"))
+        await cache.get_or_build("b", lambda: build("b"))
+        await cache.get_or_build("a", lambda: build("a"))
+        await cache.get_or_build("c", lambda: build("c"))
+        return await cache.get_or_build("b", lambda: build("b2"))
+
+    assert asyncio.run(main()) == "b2"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["evictions"] == 2
+    assert stats["size"] == 2
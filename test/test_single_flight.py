@@ -0,0 +1,46 @@
+import asyncio
+
+from src.core import SingleFlight
+
+
+def test_concurrent_calls_share_one_flight():
+    async def main():
+        sf = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return [1, 2, 3]
+
+        results = await asyncio.gather(*[sf.do(("BTC", "5m", 300), fetch) for _ in range(5)])
+        return sf, calls, results
+
+    sf, calls, results = asyncio.run(main())
+    assert calls == 1
+    assert all(r == [1, 2, 3] for r in results)
+    assert sf.stats()["hits"] == 4
+    assert sf.stats()["in_flight"] == 0
+
+
+def test_request_scope_reuses_completed_calls():
+    async def main():
+        sf = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        with sf.scope():
+            first = await sf.do("ticker", fetch)
+            second = await sf.do("ticker", fetch)
+        third = await sf.do("ticker", fetch)
+        return sf, first, second, third
+
+    sf, first, second, third = asyncio.run(main())
+    assert first == second == 1
+    assert third == 2
+    assert sf.stats()["scope_hits"] == 1
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+from src.api import sse
+from src.service.analyse_okx_service import AnalyseByOkxDirectionService
+from test.fixtures import FakeMarket, FakeOpenAI
+
+
+def parse(chunks: list[bytes]) -> list[tuple[str, dict]]:
+    events = []
+    for chunk in chunks:
+        event, data = chunk.decode().strip().split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+async def collect(stream) -> list[bytes]:
+    return [chunk async for chunk in stream]
+
+
+def test_compare_events_in_order():
+    svc = AnalyseByOkxDirectionService(FakeMarket(), None, None, None, None, None)
+
+    async def run(emit: sse.Emit):
+        return await svc.compare_analyses_by_symbol(
+            "BTC/USDT:USDT", ["5m", "1h"], FakeOpenAI("https://sse.example/v1"), "model", compare=3,
+            on_result=lambda i, r: emit("timeframe", {**r.model_dump(), "compare": i}),
+            on_vote=lambda vote: emit("vote", vote.progress()))
+
+    events = parse(asyncio.run(collect(sse.event_stream(run))))
+    names = [name for name, _ in events]
+    assert names.count("timeframe") >= 2
+    assert names[-1] == "result"
+    # 每次对比的两个周期结果都先于该次对比的计票
+    first_vote = names.index("vote")
+    assert names[:first_vote].count("timeframe") >= 2
+    votes = [data for name, data in events if name == "vote"]
+    assert votes[-1]["decided"]
+    assert events[-1][1]["signal"] == votes[-1]["leader"]
+
+
+def test_error_event_and_cancel_on_disconnect():
+    async def failing(emit: sse.Emit):
+        emit("timeframe", {"timeframe": "5m"})
+        raise ValueError("symbol值不能为空")
+
+    events = parse(asyncio.run(collect(sse.event_stream(failing))))
+    assert events == [("timeframe", {"timeframe": "5m"}), ("error", {"code": 417, "message": "symbol值不能为空"})]
+
+    cancelled = []
+
+    async def slow(emit: sse.Emit):
+        emit("timeframe", {"timeframe": "5m"})
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def disconnect():
+        stream = sse.event_stream(slow)
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(disconnect())
+    assert cancelled == [True]
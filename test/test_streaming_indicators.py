@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from src.analyst.indicators import Indicators, StreamingIndicators
+from test.fixtures import random_series
+
+
+def batch_latest(series) -> dict:
+    ind = Indicators(series)
+    latest = {
+        "rsi": ind.rsi(14)[0],
+        "stoch": ind.stoch(9, 1, 6)[0].model_dump(),
+        "stoch_rsi": ind.stoch_rsi(14, 5, 3, 3)[0].model_dump(),
+        "macd": ind.macd(12, 26, 9)[0].model_dump(),
+        "adx": ind.adx(14)[0],
+        "williams_r": ind.williams_r(14)[0],
+        "cci": ind.cci(14)[0],
+        "atr": ind.atr(14)[0],
+        "highs_lows": ind.highs_lows(14)[0].model_dump(),
+        "ultimate_oscillator": ind.ultimate_oscillator()[0],
+        "roc": ind.roc(9)[0],
+        "bull_bear_power": ind.bull_bear_power(13)[0],
+        "bollinger_bands": ind.bollinger_bands(20, 2, 2)[0].model_dump(),
+    }
+    for n in StreamingIndicators.MA_PERIODS:
+        latest[f"ma{n}"] = ind.ma(n)[0]
+    return latest
+
+
+def flatten(d: dict, prefix: str = ""):
+    for key, value in d.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def assert_matches_batch(engine: StreamingIndicators, series):
+    expected = dict(flatten(batch_latest(series)))
+    actual = dict(flatten(engine.latest()))
+    assert expected.keys() == actual.keys()
+    for key, value in expected.items():
+        if value is None:
+            assert actual[key] is None, key
+        else:
+            assert math.isclose(actual[key], value, rel_tol=1e-9, abs_tol=1e-9), key
+
+
+def test_seed():
+    series = random_series(300, seed=1)
+    assert_matches_batch(StreamingIndicators.from_series(series), series)
+
+
+def test_warm_up():
+    series = random_series(40, seed=2)
+    assert_matches_batch(StreamingIndicators.from_series(series), series)
+
+
+def test_append_and_revise():
+    series = random_series(360, seed=3)
+    # 一段价格完全不变的k线，覆盖分母为 0 的分支
+    series.open[50:60] = series.high[50:60] = series.low[50:60] = series.close[50:60] = 100.0
+    engine = StreamingIndicators.from_series(series.take(slice(0, 300)))
+    for i in range(300, len(series)):
+        row = [series.timestamp[i], series.open[i], series.high[i], series.low[i], series.close[i], series.volume[i]]
+        revised = list(row)
+        revised[4] *= 1.01
+        revised[2] = max(revised[2], revised[4])
+        engine.update(revised)
+        engine.update(row)
+    assert engine.timestamp == int(series.timestamp[-1])
+    assert_matches_batch(engine, series)
+
+
+def test_reject_older_candle():
+    series = random_series(50, seed=4)
+    engine = StreamingIndicators.from_series(series)
+    with pytest.raises(ValueError):
+        engine.update([series.timestamp[-2], 1, 1, 1, 1, 1])